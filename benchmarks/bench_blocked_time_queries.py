@@ -0,0 +1,183 @@
+"""
+Latency of the blocked-time lookups /schedule makes, as a user's history grows.
+
+Usage (from the repo root, against a scratch postgres database):
+    DATABASE_URL=postgresql://... python benchmarks/bench_blocked_time_queries.py
+    python benchmarks/bench_blocked_time_queries.py --dsn postgresql://... --history 1000 10000 100000
+    python benchmarks/bench_blocked_time_queries.py -o benchmarks/results/blocked_time_queries.json
+
+Each history size fills session-local temporary tables named like the real occurrence tables (they
+shadow them for this connection only, nothing is written to the real ones) with one user's past
+occurrences, a few hundred upcoming ones and other users' rows. It then times three lookups:
+    unbounded: the old /schedule query, start_time < last OR end_time > now
+    bounded:   the overlap query now used by /schedule and /reschedule, without indexes
+    indexed:   the overlap query with the indexes of src/migrations/001_occurrence_time_indexes.sql
+
+-o saves the medians as JSON, with the server version and the machine they were measured on.
+benchmarks/results/blocked_time_queries.json is such a run with the defaults.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+
+TABLES = ["meeting_occurences", "assignment_occurences", "chore_occurences"]
+USER_ID = 1
+OTHER_USERS = 50
+UPCOMING = 300
+
+UNBOUNDED = "SELECT start_time, end_time FROM {table} WHERE user_id = $1 AND (start_time < $2 OR end_time > $3)"
+BOUNDED = "SELECT start_time, end_time FROM {table} WHERE user_id = $1 AND end_time > $2 AND start_time < $3"
+# Same definitions as the migration, built without CONCURRENTLY since the tables are private to this session
+INDEX = (
+    "CREATE INDEX {table}_user_end_start_idx ON {table} (user_id, end_time, start_time)"
+)
+
+
+async def fill(conn, history: int, now: datetime):
+    """Recreate the temporary tables with history past occurrences per table for USER_ID"""
+    for table in TABLES:
+        await conn.execute(f"DROP TABLE IF EXISTS pg_temp.{table}")
+        await conn.execute(
+            f"CREATE TEMP TABLE {table} ("
+            "occurence_id serial PRIMARY KEY, user_id int NOT NULL, "
+            "start_time timestamptz NOT NULL, end_time timestamptz NOT NULL)"
+        )
+        # An hour long occurrence every 3 hours going back in time, then UPCOMING ones going forward,
+        # and as much history again spread over other users
+        await conn.execute(
+            f"""
+            INSERT INTO {table} (user_id, start_time, end_time)
+            SELECT $1::int, $2::timestamptz - g * interval '3 hours',
+                   $2 - g * interval '3 hours' + interval '1 hour'
+            FROM generate_series(1, $3::int) AS g
+            UNION ALL
+            SELECT $1, $2 + g * interval '3 hours', $2 + g * interval '3 hours' + interval '1 hour'
+            FROM generate_series(0, $4::int - 1) AS g
+            UNION ALL
+            SELECT 2 + g % $5::int, $2 - g * interval '1 minute', $2 - g * interval '1 minute' + interval '1 hour'
+            FROM generate_series(1, $3) AS g
+            """,
+            USER_ID,
+            now,
+            history,
+            UPCOMING,
+            OTHER_USERS,
+        )
+        await conn.execute(f"ANALYZE {table}")
+
+
+async def time_lookup(conn, query: str, args: tuple, repeat: int) -> float:
+    """Median milliseconds to fetch the rows of all three tables"""
+    statements = [await conn.prepare(query.format(table=table)) for table in TABLES]
+    for statement in statements:
+        await statement.fetch(*args)  # warm up the plan and the buffer cache
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for statement in statements:
+            await statement.fetch(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(dsn: str, histories: list, repeat: int) -> dict:
+    now = datetime.now(timezone.utc)
+    first_time, last_time = now, now + timedelta(days=14)
+    conn = await asyncpg.connect(dsn)
+    results = []
+    try:
+        meta = {
+            "commit": git_commit(),
+            "timestamp": now.isoformat(),
+            "server_version": await conn.fetchval("SHOW server_version"),
+            "python": platform.python_version(),
+            "asyncpg": asyncpg.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "other_users": OTHER_USERS,
+            "upcoming": UPCOMING,
+        }
+        print(f"{'history':>10} {'unbounded':>12} {'bounded':>12} {'indexed':>12}")
+        for history in histories:
+            await fill(conn, history, now)
+            unbounded = await time_lookup(
+                conn, UNBOUNDED, (USER_ID, last_time, now), repeat
+            )
+            bounded = await time_lookup(
+                conn, BOUNDED, (USER_ID, first_time, last_time), repeat
+            )
+            for table in TABLES:
+                await conn.execute(INDEX.format(table=table))
+                await conn.execute(f"ANALYZE {table}")
+            indexed = await time_lookup(
+                conn, BOUNDED, (USER_ID, first_time, last_time), repeat
+            )
+            print(
+                f"{history:>10} {unbounded:>9.2f} ms {bounded:>9.2f} ms {indexed:>9.2f} ms",
+                flush=True,
+            )
+            results.append(
+                {
+                    "history": history,
+                    "unbounded_ms": unbounded,
+                    "bounded_ms": bounded,
+                    "indexed_ms": indexed,
+                }
+            )
+    finally:
+        await conn.close()
+    return {"meta": meta, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--dsn", default=os.getenv("DATABASE_URL"), help="defaults to $DATABASE_URL"
+    )
+    parser.add_argument(
+        "--history",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000, 1_000_000],
+        help="past occurrences per table of the benchmarked user",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="timed lookups per history size"
+    )
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("no database, pass --dsn or set DATABASE_URL")
+    current = asyncio.run(run(args.dsn, args.history, args.repeat))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
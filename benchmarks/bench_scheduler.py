@@ -0,0 +1,336 @@
+"""
+Benchmarks for the scheduler on synthetic workloads.
+
+Usage (from the repo root):
+    python benchmarks/bench_scheduler.py                       # quick suite, prints a table
+    python benchmarks/bench_scheduler.py --suite full -o before.json
+    python benchmarks/bench_scheduler.py --suite full -o after.json --compare before.json
+
+Every benchmark records wall time over several runs, then traces one more run with tracemalloc for
+its peak memory and the memory still held by its result. Timed runs aren't traced, tracing slows
+allocation down. Python doesn't count allocations, so net_blocks stands in for them: how many more
+memory blocks are allocated right after a run, with its result still held, than right before it.
+Temporaries the run allocates and frees again don't show up there, only in the peak memory.
+Results are saved as JSON to compare across commits.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+import numpy as np
+from data_models import AssignmentInRequest, ChoreInRequest, MeetingInRequest
+from scheduler import (
+    find_time_blocks,
+    generate_available_slots,
+    merge_contiguous_slots,
+    schedule_tasks,
+)
+
+NOW = datetime(2025, 8, 11, 8, 30, 17, tzinfo=timezone.utc)
+
+
+def make_workload(
+    meetings: int = 50,
+    assignments: int = 10,
+    chores: int = 5,
+    horizon_days: int = 14,
+    tz_offset_minutes: int = 0,
+    fragmentation: float = 0.5,
+    seed: int = 0,
+) -> dict:
+    """
+    Random but reproducible scheduler inputs.
+    fragmentation: 0 gives long meetings starting on the hour, 1 gives short meetings starting at
+    any minute, which chops free time into many small pieces
+    """
+    rng = random.Random(seed)
+    horizon = horizon_days * 1440
+    max_length = 15 + int(225 * (1 - fragmentation))
+    align = max(int(60 * (1 - fragmentation)), 1)
+    meeting_list = []
+    for i in range(meetings):
+        start = NOW + timedelta(minutes=rng.randrange(0, horizon, align))
+        length = timedelta(minutes=rng.randint(15, max_length))
+        meeting_list.append(
+            MeetingInRequest(
+                name=f"Meeting {i}", start_end_times=[[start, start + length]]
+            )
+        )
+    assignment_list = [
+        AssignmentInRequest(
+            name=f"Assignment {i}",
+            effort=rng.randint(30, 600),
+            due=NOW + timedelta(minutes=rng.randint(horizon // 4, horizon)),
+        )
+        for i in range(assignments)
+    ]
+    chore_list = []
+    for i in range(chores):
+        start = NOW + timedelta(days=rng.randrange(horizon_days))
+        chore_list.append(
+            ChoreInRequest(
+                name=f"Chore {i}",
+                effort=rng.randint(15, 90),
+                window=[start, start + timedelta(hours=rng.randint(4, 24))],
+            )
+        )
+    return {
+        "meetings": meeting_list,
+        "assignments": assignment_list,
+        "chores": chore_list,
+        "end": NOW + timedelta(days=horizon_days),
+        "tz_offset_minutes": tz_offset_minutes,
+        "seed": seed,
+    }
+
+
+def meeting_times(workload: dict) -> list:
+    return [tuple(times) for m in workload["meetings"] for times in m.start_end_times]
+
+
+# Each benchmark gets a workload and returns a zero-argument function that does the measured work.
+# Setup that isn't part of what is measured happens outside the returned function
+
+
+def bench_generate_available_slots(workload):
+    meetings = meeting_times(workload)
+    return lambda: generate_available_slots(
+        meetings, NOW, workload["end"], workload["tz_offset_minutes"]
+    )
+
+
+def bench_find_time_blocks(workload, skip_prob=0.5):
+    slots = generate_available_slots(
+        meeting_times(workload), NOW, workload["end"], workload["tz_offset_minutes"]
+    )
+    used = set(random.Random(workload["seed"]).sample(slots, k=len(slots) // 3))
+    effort = sum(a.effort for a in workload["assignments"])
+
+    def run():
+        random.seed(workload["seed"])
+        return find_time_blocks(effort, slots, used, skip_prob)
+
+    return run
+
+
+def bench_merge_contiguous_slots(workload):
+    slots = generate_available_slots(
+        meeting_times(workload), NOW, workload["end"], workload["tz_offset_minutes"]
+    )
+    return lambda: merge_contiguous_slots(slots)
+
+
+def bench_schedule_tasks(workload, granularity=1, strategy="greedy"):
+    return lambda: schedule_tasks(
+        workload["meetings"],
+        workload["assignments"],
+        workload["chores"],
+        now=NOW,
+        tz_offset_minutes=workload["tz_offset_minutes"],
+        seed=workload["seed"],
+        granularity=granularity,
+        strategy=strategy,
+    )
+
+
+BENCHMARKS = {
+    "generate_available_slots": bench_generate_available_slots,
+    "find_time_blocks": bench_find_time_blocks,
+    "merge_contiguous_slots": bench_merge_contiguous_slots,
+    "schedule_tasks": bench_schedule_tasks,
+    # Same workloads as schedule_tasks, to compare coarse placement with 1-minute placement
+    "schedule_tasks_15min": lambda workload: bench_schedule_tasks(
+        workload, granularity=15
+    ),
+    "schedule_tasks_30min": lambda workload: bench_schedule_tasks(
+        workload, granularity=30
+    ),
+    "schedule_tasks_edf": lambda workload: bench_schedule_tasks(
+        workload, strategy="edf"
+    ),
+}
+
+SUITES = {
+    "quick": [
+        dict(meetings=20, assignments=5, chores=3, horizon_days=7),
+        dict(meetings=50, assignments=10, chores=5, horizon_days=14),
+        dict(
+            meetings=100,
+            assignments=15,
+            chores=7,
+            horizon_days=30,
+            tz_offset_minutes=-300,
+        ),
+    ],
+    "full": [
+        dict(meetings=20, assignments=5, chores=3, horizon_days=7),
+        dict(meetings=50, assignments=10, chores=5, horizon_days=14),
+        dict(
+            meetings=100,
+            assignments=15,
+            chores=7,
+            horizon_days=30,
+            tz_offset_minutes=-300,
+        ),
+        dict(
+            meetings=300,
+            assignments=30,
+            chores=7,
+            horizon_days=60,
+            tz_offset_minutes=330,
+        ),
+        dict(
+            meetings=300, assignments=30, chores=7, horizon_days=60, fragmentation=0.0
+        ),
+        dict(
+            meetings=300, assignments=30, chores=7, horizon_days=60, fragmentation=1.0
+        ),
+        dict(
+            meetings=1000, assignments=60, chores=14, horizon_days=90, fragmentation=0.8
+        ),
+    ],
+}
+
+
+def measure(fn, repeat: int) -> dict:
+    """Time fn repeat times, count the blocks one more run leaves allocated, then trace one more for memory"""
+    fn()  # warm up caches and lazy imports
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    result = fn()
+    net_blocks = sys.getallocatedblocks() - blocks_before
+    del result
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    retained = tracemalloc.take_snapshot().statistics("filename")
+    tracemalloc.stop()
+    del result
+    return {
+        "wall_ms": {
+            "min": min(times) * 1000,
+            "median": statistics.median(times) * 1000,
+            "mean": statistics.mean(times) * 1000,
+        },
+        "peak_kib": peak / 1024,
+        "retained_kib": sum(stat.size for stat in retained) / 1024,
+        "net_blocks": net_blocks,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(suite: str, repeat: int, only: str | None = None) -> dict:
+    results = []
+    for params in SUITES[suite]:
+        workload = make_workload(**params)
+        for name, bench in BENCHMARKS.items():
+            if only and only not in name:
+                continue
+            stats = measure(bench(workload), repeat)
+            results.append({"benchmark": name, "workload": params, **stats})
+            print(
+                f"{name:28} {_workload_label(params):48} {stats['wall_ms']['median']:10.2f} ms",
+                flush=True,
+            )
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "suite": suite,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _workload_label(params: dict) -> str:
+    return " ".join(f"{key}={value}" for key, value in params.items())
+
+
+def _result_key(result: dict) -> tuple:
+    return result["benchmark"], json.dumps(result["workload"], sort_keys=True)
+
+
+def compare(baseline: dict, current: dict):
+    """Print the median wall time, peak memory and net blocks of current relative to baseline"""
+    before = {_result_key(r): r for r in baseline["results"]}
+    print(
+        f"\ncompared to {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})"
+    )
+    print(
+        f"{'benchmark':28} {'workload':48} {'time':>8} {'peak mem':>9} {'net blocks':>10}"
+    )
+    for result in current["results"]:
+        old = before.get(_result_key(result))
+        if old is None:
+            continue
+        time_ratio = result["wall_ms"]["median"] / max(old["wall_ms"]["median"], 1e-9)
+        mem_ratio = result["peak_kib"] / max(old["peak_kib"], 1e-9)
+        blocks = (
+            f"{result['net_blocks'] / max(old['net_blocks'], 1):9.2f}x"
+            if "net_blocks" in old
+            else f"{'-':>10}"
+        )
+        print(
+            f"{result['benchmark']:28} {_workload_label(result['workload']):48} "
+            f"{time_ratio:7.2f}x {mem_ratio:8.2f}x {blocks}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="timed runs per benchmark"
+    )
+    parser.add_argument("--only", help="only run benchmarks whose name contains this")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument(
+        "--compare", help="JSON results of an earlier run to compare against"
+    )
+    args = parser.parse_args()
+
+    current = run_suite(args.suite, args.repeat, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), current)
+
+
+if __name__ == "__main__":
+    main()
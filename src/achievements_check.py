@@ -1,13 +1,15 @@
 import requests
 import json
-from datetime import datetime, timedelta, timezone
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone, tzinfo
 from collections import defaultdict
-from typing import Optional
+from typing import List, Optional
 
 from data_models import SessionCompletionDataModel
+from util import enforce_timestamp_utc, get_timezone, local_day_bounds
 
-async def check_achievements(conn, user_id: int, tz_offset_minutes: int = 0):
-    """Check and update achievements for a user"""
+async def check_achievements(conn, user_id: int, tz_offset_minutes: int = 0, tz_name: str | None = None):
+    """Check and update achievements for a user, in the IANA zone tz_name if given, else at the fixed offset"""
     try:
         achievements = await conn.fetchrow("SELECT * FROM achievements WHERE user_id = $1", user_id)
         if not achievements:
@@ -22,7 +24,7 @@ async def check_achievements(conn, user_id: int, tz_offset_minutes: int = 0):
         unlocked = {}
         
         # Session Based Achievements (with timezone consideration)
-        session_unlocked = await check_session_achievements(sessions, achievements, tz_offset_minutes)
+        session_unlocked = await check_session_achievements(sessions, achievements, tz_offset_minutes, tz_name)
         unlocked.update(session_unlocked)
         
         # Level Based Achievements
@@ -80,23 +82,39 @@ async def get_sessions_past_month(conn, user_id: int):
             "chores_completed": 0
         }
 
-def convert_utc_to_local_time(utc_time: datetime, tz_offset_minutes: int = 0) -> datetime:
-    """Convert UTC time to user's local timezone using offset in minutes"""
+def convert_utc_to_local_time(utc_time: datetime, tz_offset_minutes: int = 0, tz_name: str | None = None) -> datetime:
+    """Convert UTC time to user's local timezone using offset in minutes, or the IANA zone tz_name if given"""
     try:
+        if tz_name:
+            return utc_time.astimezone(get_timezone(tz_name))
         return utc_time + timedelta(minutes=tz_offset_minutes)
     except Exception:
         # Fallback to UTC if timezone conversion fails
         return utc_time
 
-async def check_session_achievements(sessions, achievements, tz_offset_minutes: int = 0):
+def local_dates(utc_times: List[datetime], tz: tzinfo) -> List[date]:
+    """
+    Local calendar date in tz of each of utc_times. The UTC instants at which the local days start are
+    looked up once (so days across a DST change get their real length) and each time is binary searched
+    among them, instead of being converted
+    """
+    if not utc_times:
+        return []
+    first = min(utc_times).astimezone(tz).date()
+    num_days = (max(utc_times).astimezone(tz).date() - first).days + 1
+    day_starts = [local_day_bounds(tz, first + timedelta(days=i))[0] for i in range(num_days)]
+    return [first + timedelta(days=bisect_right(day_starts, t) - 1) for t in utc_times]
+
+async def check_session_achievements(sessions, achievements, tz_offset_minutes: int = 0, tz_name: str | None = None):
     updates = {}
+    tz = get_timezone(tz_name, tz_offset_minutes)
 
     # Helper: group sessions by date in user's local timezone
+    start_times = [enforce_timestamp_utc(s['start_time']) for s in sessions]
+    local_times = [t.astimezone(tz) for t in start_times]
     sessions_by_date = defaultdict(list)
-    for s in sessions:
-        local_time = convert_utc_to_local_time(s['start_time'], tz_offset_minutes)
-        date = local_time.date()
-        sessions_by_date[date].append({**s, 'local_start_time': local_time})
+    for s, local_time, local_date in zip(sessions, local_times, local_dates(start_times, tz)):
+        sessions_by_date[local_date].append({**s, 'local_start_time': local_time})
 
     # First Timer
     if not achievements['first_timer']:
@@ -110,43 +128,32 @@ async def check_session_achievements(sessions, achievements, tz_offset_minutes:
 
     # Early Bird: Completed a session before 8 am (LOCAL TIME)
     if not achievements['early_bird']:
-        for s in sessions:
-            local_time = convert_utc_to_local_time(s['start_time'], tz_offset_minutes)
-            if local_time.hour < 8:
-                updates['early_bird'] = True
-                break
+        if any(local_time.hour < 8 for local_time in local_times):
+            updates['early_bird'] = True
 
     # Night Owl: Completed a session after 11 pm (LOCAL TIME)
     if not achievements['night_owl']:
-        for s in sessions:
-            local_time = convert_utc_to_local_time(s['start_time'], tz_offset_minutes)
-            if local_time.hour >= 23:
-                updates['night_owl'] = True
-                break
+        if any(local_time.hour >= 23 for local_time in local_times):
+            updates['night_owl'] = True
 
     # Weekend Warrior: Completed 5 sessions on a Weekend (LOCAL TIME)
     if not achievements['weekend_warrior']:
-        weekend_sessions = []
-        for s in sessions:
-            local_time = convert_utc_to_local_time(s['start_time'], tz_offset_minutes)
-            if local_time.weekday() >= 5:  # Saturday = 5, Sunday = 6
-                weekend_sessions.append(s)
-        if len(weekend_sessions) >= 5:
+        weekend_sessions = sum(
+            len(day_sessions) for day, day_sessions in sessions_by_date.items() if day.weekday() >= 5  # Saturday = 5, Sunday = 6
+        )
+        if weekend_sessions >= 5:
             updates['weekend_warrior'] = True
 
+    today = datetime.now(timezone.utc).astimezone(tz).date()
+
     # 7-Day Streak: Completed each session with 80% locked in value in the last 7 days (LOCAL TIME)
     if not achievements['seven_day_streak']:
-        today = convert_utc_to_local_time(datetime.now(timezone.utc), tz_offset_minutes).date()
         streak = True
         for i in range(7):
             day = today - timedelta(days=i)
-            # Find sessions on this day in local time
-            day_sessions = []
-            for s in sessions:
-                local_time = convert_utc_to_local_time(s['start_time'], tz_offset_minutes)
-                if local_time.date() == day:
-                    day_sessions.append(s)
-            
+            # Sessions on this day in local time
+            day_sessions = sessions_by_date.get(day, [])
+
             # Check if any session on this day has >= 80% locked in
             if not any(s['locked_in'] >= 0.8 * s['effort'] for s in day_sessions):
                 streak = False
@@ -161,18 +168,11 @@ async def check_session_achievements(sessions, achievements, tz_offset_minutes:
 
     # Consistency King: Complete all sessions everyday for a month (at least 3 a day)
     if not achievements['consistency_king']:
-        today = convert_utc_to_local_time(datetime.now(timezone.utc), tz_offset_minutes).date()
         consistency = True
         for i in range(30):
             day = today - timedelta(days=i)
             # Count sessions on this day in local time
-            day_session_count = 0
-            for s in sessions:
-                local_time = convert_utc_to_local_time(s['start_time'], tz_offset_minutes)
-                if local_time.date() == day:
-                    day_session_count += 1
-            
-            if day_session_count < 3:
+            if len(sessions_by_date.get(day, [])) < 3:
                 consistency = False
                 break
         if consistency:
@@ -212,11 +212,8 @@ async def check_session_achievements(sessions, achievements, tz_offset_minutes:
 
     # Sleep is for the weak: Complete a session between 3 am and 5 am (LOCAL TIME)
     if not achievements['sleep_is_for_the_weak']:
-        for s in sessions:
-            local_time = convert_utc_to_local_time(s['start_time'], tz_offset_minutes)
-            if 3 <= local_time.hour < 5:
-                updates['sleep_is_for_the_weak'] = True
-                break
+        if any(3 <= local_time.hour < 5 for local_time in local_times):
+            updates['sleep_is_for_the_weak'] = True
 
     return updates
 
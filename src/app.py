@@ -9,17 +9,34 @@ from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from fastapi.middleware.cors import CORSMiddleware
 from scheduler import *
 from urllib.parse import urlencode, parse_qs, urlparse
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from google.auth.transport.requests import Request as GoogleRequest
 from google.oauth2.credentials import Credentials
 import google_auth_oauthlib
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from achievements_check import check_achievements
+from scheduling_executor import (
+    SchedulingExecutor,
+    SchedulerBusyError,
+    SchedulingTimeoutError,
+)
+from schedule_cache import (
+    ScheduleCache,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    busy_version,
+)
+from busy_cache import BusyTimelineCache, RedisVersionStore
+from cachetools import TTLCache
+import asyncio
 import base64
+import multiprocessing
 import secrets
 import json
 import uvicorn
@@ -33,6 +50,153 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
 SESSION_SECRET = os.getenv("SESSION_SECRET_KEY")
+# Processes in the pool that scheduling requests fan their candidate schedules out to, 1 builds them in-thread
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "1"))
+# Candidates tried on top of the 11 regular ones when some of those turn out identical
+SCHEDULE_EXTRA_CANDIDATES = int(os.getenv("SCHEDULE_EXTRA_CANDIDATES", "4"))
+# Most CPU time a request may ask to spend searching for higher XP schedules (ScheduleRequest.search_ms)
+SCHEDULE_SEARCH_MAX_MS = int(os.getenv("SCHEDULE_SEARCH_MAX_MS", "1000"))
+
+# Scheduling runs off the event loop, on a bounded executor shared by /schedule and /reschedule
+scheduling_executor = SchedulingExecutor(
+    workers=int(os.getenv("SCHEDULING_EXECUTOR_WORKERS", "2")),
+    queue_size=int(os.getenv("SCHEDULING_QUEUE_SIZE", "8")),
+    timeout=float(os.getenv("SCHEDULING_TIMEOUT_SECONDS", "30")),
+    retry_after=int(os.getenv("SCHEDULING_RETRY_AFTER_SECONDS", "5")),
+)
+
+# Computed schedules, so re-submitting the same request (e.g. going back from the schedule picker) is cheap.
+# Set SCHEDULE_CACHE_REDIS_URL to share the cache between workers
+SCHEDULE_CACHE_TTL_SECONDS = int(os.getenv("SCHEDULE_CACHE_TTL_SECONDS", "300"))
+if os.getenv("SCHEDULE_CACHE_REDIS_URL"):
+    _schedule_cache_backend = RedisCacheBackend(
+        os.getenv("SCHEDULE_CACHE_REDIS_URL"), ttl=SCHEDULE_CACHE_TTL_SECONDS
+    )
+else:
+    _schedule_cache_backend = MemoryCacheBackend(
+        maxsize=int(os.getenv("SCHEDULE_CACHE_SIZE", "256")),
+        ttl=SCHEDULE_CACHE_TTL_SECONDS,
+    )
+schedule_cache = ScheduleCache(
+    _schedule_cache_backend,
+    bucket_seconds=int(os.getenv("SCHEDULE_CACHE_BUCKET_SECONDS", "300")),
+)
+
+# Compiled availability templates of recently active users (None for users on the default hours), so a template
+# is fetched and compiled once rather than on every /schedule and /reschedule. /setAvailability replaces its
+# user's entry, and entries expire so changes made through other workers are picked up
+availability_cache = TTLCache(
+    maxsize=int(os.getenv("AVAILABILITY_CACHE_SIZE", "1024")),
+    ttl=int(os.getenv("AVAILABILITY_CACHE_TTL_SECONDS", "300")),
+)
+
+
+async def load_availability(conn, user_id: int) -> WeeklyAvailability | None:
+    """The user's compiled weekly availability, None if they haven't set a template"""
+    cached = availability_cache.get(user_id, False)
+    if cached is not False:
+        return cached
+    raw = await conn.fetchval(
+        "SELECT template FROM availability_templates WHERE user_id = $1", user_id
+    )
+    availability = (
+        None if raw is None else WeeklyAvailability(AvailabilityTemplate.model_validate_json(raw))
+    )
+    availability_cache[user_id] = availability
+    return availability
+
+
+# Busy time (meeting, assignment and chore occurrences) of recently active users, so scheduling right after
+# scheduling doesn't query the occurrence tables again. Endpoints that write occurrences patch or invalidate
+# their user's entry and raise its version. The scheduler trusts this to avoid double booking, so the versions
+# must be shared by every worker through redis, BUSY_CACHE_REDIS_URL (defaulting to SCHEDULE_CACHE_REDIS_URL).
+# Without it the cache is off, unless BUSY_CACHE_SINGLE_PROCESS=1 says a single process serves the API: how
+# many workers a process manager started can't be told from inside one of them
+BUSY_CACHE_REDIS_URL = os.getenv("BUSY_CACHE_REDIS_URL") or os.getenv("SCHEDULE_CACHE_REDIS_URL")
+busy_cache = BusyTimelineCache(
+    maxsize=int(os.getenv("BUSY_CACHE_SIZE", "1024")),
+    ttl=int(os.getenv("BUSY_CACHE_TTL_SECONDS", "300")),
+    versions=RedisVersionStore(BUSY_CACHE_REDIS_URL) if BUSY_CACHE_REDIS_URL else None,
+    enabled=bool(BUSY_CACHE_REDIS_URL) or os.getenv("BUSY_CACHE_SINGLE_PROCESS", "0") == "1",
+)
+
+
+async def load_busy_times(conn, user_id: int, first_time: datetime, last_time: datetime) -> List[Tuple[datetime, datetime]]:
+    """
+    (start, end) of the user's meeting, assignment and chore occurrences that overlap [first_time, last_time],
+    from busy_cache when it covers the range
+    """
+    cached = await busy_cache.get(user_id, first_time, last_time)
+    if cached is not None:
+        return cached
+    version = await busy_cache.version(user_id)
+    # Served by the (user_id, end_time, start_time) indexes, see migrations/001_occurrence_time_indexes.sql
+    busy_times = []
+    for table in ("meeting_occurences", "assignment_occurences", "chore_occurences"):
+        rows = await conn.fetch(
+            f"SELECT start_time, end_time FROM {table} WHERE user_id = $1 AND end_time > $2 AND start_time < $3",
+            user_id,
+            first_time,
+            last_time,
+        )
+        busy_times.extend((row["start_time"], row["end_time"]) for row in rows)
+    await busy_cache.put(user_id, first_time, last_time, busy_times, version)
+    return busy_times
+
+
+def expand_chore_recurrences(chores: List[ChoreInRequest]) -> List[ChoreInRequest]:
+    """
+    One chore per day a chore recurs on (a week at most), named after its date, as /schedule places them.
+    Raises a 400 for a recurrence that ends before the chore's window or lasts more than 7 days
+    """
+    processed_chores = []
+    for chore in chores:
+        window_start = enforce_timestamp_utc(chore.window[0])
+        window_end = enforce_timestamp_utc(chore.window[1])
+        if chore.end_recur_date is None:
+            # No recurrence, just add date to name and keep as is
+            window_start_date = chore.window[0].strftime("%Y-%m-%d")
+            updated_chore = ChoreInRequest(
+                name=f"{chore.name} for {window_start_date}",
+                window=chore.window,
+                effort=chore.effort,
+                end_recur_date=chore.end_recur_date
+            )
+            processed_chores.append(updated_chore)
+        else:
+            end_recur = enforce_timestamp_utc(chore.end_recur_date)
+            if end_recur.date() < window_start.date():
+                raise HTTPException(status_code=400, detail="end recur before win start")
+            # Generate recurring chores
+            window_duration = window_end - window_start
+            # calculate number of recurrences and check if too many, then generate recurring chores
+            current_date = window_start.date()
+            end_date = end_recur.date()
+            recurrence_count = 0
+            temp_date = current_date
+            while temp_date <= end_date:
+                recurrence_count += 1
+                temp_date += timedelta(days=1)
+            if recurrence_count > 7:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="too many chore recurrences"
+                )
+            current_date = window_start.date()
+            while current_date <= end_date:
+                days_offset = (current_date - window_start.date()).days
+                new_window_start = window_start + timedelta(days=days_offset)
+                new_window_end = new_window_start + window_duration
+                date_str = current_date.strftime("%Y-%m-%d")
+                updated_chore = ChoreInRequest(
+                    name=f"{chore.name} for {date_str}",
+                    window=[new_window_start, new_window_end],
+                    effort=chore.effort,
+                    end_recur_date=None  # Individual occurrences don't have recurrence
+                )
+                processed_chores.append(updated_chore)
+                current_date += timedelta(days=1)
+    return processed_chores
 
 
 @asynccontextmanager
@@ -41,8 +205,28 @@ async def lifespan(app: FastAPI):
         dsn=DATABASE_URL,
         max_size=10,
     )
+    # One pool for the app's lifetime, so requests don't pay for starting worker processes.
+    # Workers come from a forkserver rather than a fork of this process, which by now has the event loop,
+    # the database pool and the scheduling executor's threads and locks
+    app.state.scheduler_pool = None
+    if SCHEDULER_WORKERS > 1:
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["scheduler"])
+        app.state.scheduler_pool = ProcessPoolExecutor(
+            max_workers=SCHEDULER_WORKERS, mp_context=context
+        )
+        # Workers start on first use, so start them all here, where the first requests don't wait for them
+        await asyncio.gather(
+            *(
+                asyncio.wrap_future(app.state.scheduler_pool.submit(merge_intervals, []))
+                for _ in range(SCHEDULER_WORKERS)
+            )
+        )
     yield
     await app.state.pool.close()
+    scheduling_executor.shutdown()
+    if app.state.scheduler_pool is not None:
+        app.state.scheduler_pool.shutdown(cancel_futures=True)
 
 
 app = FastAPI(lifespan=lifespan)
@@ -62,6 +246,82 @@ app.add_middleware(
 )
 
 
+def scheduler_busy_exception(e: SchedulerBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Scheduler is busy, please try again shortly",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+async def run_schedule_tasks(*args, **kwargs) -> List[Schedule]:
+    """Await schedule_tasks on the scheduling executor, turning a full queue or a timeout into an HTTP error"""
+    return await run_on_scheduling_executor(schedule_tasks, *args, **kwargs)
+
+
+async def run_on_scheduling_executor(func, *args, **kwargs):
+    """Await func on the scheduling executor, turning a full queue or a timeout into an HTTP error"""
+    try:
+        return await scheduling_executor.run(func, *args, **kwargs)
+    except SchedulerBusyError as e:
+        raise scheduler_busy_exception(e)
+    except SchedulingTimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Scheduling took too long, try fewer or shorter tasks",
+        )
+
+
+def stream_schedule_tasks(*args, **kwargs):
+    """
+    Start iter_schedules on the scheduling executor and return an async iterator over the schedules.
+    A full queue is reported right away as a 503, before the caller commits to a streamed response
+    """
+    try:
+        return scheduling_executor.stream(iter_schedules, *args, **kwargs)
+    except SchedulerBusyError as e:
+        raise scheduler_busy_exception(e)
+
+
+def ndjson_line(kind: str, **fields) -> str:
+    return json.dumps({"type": kind, **fields}) + "\n"
+
+
+async def schedule_ndjson(
+    header: dict, schedules: List[Schedule] | None, schedule_stream, cache_key: str
+):
+    """
+    Body of a streamed /schedule response: the header line, then a line per schedule as it's produced,
+    then a done line. Scheduling errors can't become a status code anymore, so they end the stream
+    with an error line. Fully streamed results are cached like non-streamed ones
+    """
+    yield ndjson_line("meetings", **header)
+    if schedules is None:
+        schedules = []
+        try:
+            async for schedule in schedule_stream:
+                yield ndjson_line(
+                    "schedule", index=len(schedules), schedule=schedule.model_dump(mode="json")
+                )
+                schedules.append(schedule)
+        except SchedulingTimeoutError:
+            yield ndjson_line(
+                "error", detail="Scheduling took too long, try fewer or shorter tasks"
+            )
+            return
+        except Exception as e:
+            print(e)
+            yield ndjson_line(
+                "error", detail="Something went wrong on the backend, please check the logs"
+            )
+            return
+        await schedule_cache.set(cache_key, schedules)
+    else:
+        for index, schedule in enumerate(schedules):
+            yield ndjson_line("schedule", index=index, schedule=schedule.model_dump(mode="json"))
+    yield ndjson_line("done", count=len(schedules))
+
+
 @app.post("/register")
 async def register(data: RegistrationDataModel, status_code=status.HTTP_201_CREATED):
     if not data.username or not data.email or not data.pwd:
@@ -388,7 +648,7 @@ async def sync(
             if not page_token:
                 break
        # For deduplication: fetch all meetings and their occurrences for this user
-        async with app.state.pool.acquire() as conn:
+        async with app.state.pool.acquire() as conn, busy_cache.batch(user.user_id) as (inserted, _):
             meetings = await conn.fetch(
                 "SELECT meeting_id, meeting_name FROM meetings WHERE user_id = $1",
                 user.user_id,
@@ -453,6 +713,7 @@ async def sync(
                         start_dt,
                         end_dt,
                     )
+                    inserted.append(occ_tuple)
                     occs_by_meeting[meeting_id].add(occ_tuple)
                     new_occs += 1
 
@@ -475,144 +736,113 @@ async def schedule(
     sched: ScheduleRequest,
     token: Annotated[str, Depends(oauth2_scheme)],
     status_code=status.HTTP_201_CREATED,
+    stream: bool = False,
 ) -> ScheduleResponseFormat:
     """
     Sets in stone the meetings in the request, and then returns a list of possible ways to arrange times to work on assignments and chores.
     Now checks for conflicts with already scheduled meetings/assignments/chores.
+    stream=true returns application/x-ndjson instead, one JSON object per line, so the first schedules can be
+    shown while the rest are computed:
+        {"type": "meetings", "conflicting_meetings": [...], "meetings": [...], "meeting_conflicts": [...]}
+        {"type": "schedule", "index": 0, "schedule": {...}}, one per schedule, in order
+        {"type": "done", "count": 11}, count being the number of distinct schedules sent,
+        or {"type": "error", "detail": "..."} if scheduling failed midway
     """
     try:
         # print("HELLO", sched.model_dump_json())
         user = await get_current_user(token, app.state.pool)
         now = datetime.now(timezone.utc)
-        last_time = get_latest_time(sched.meetings, sched.assignments, sched.chores)
-        # Fetch all existing meeting, assignment, and chore occurrences for this user
+        # generate recurrences for chores if requested
+        processed_chores = expand_chore_recurrences(sched.chores)
+
+        # Every expanded recurrence counts, a chore recurring for a week reaches days past its first window
+        first_time = min(
+            [get_earliest_time(sched.meetings, now)]
+            + [enforce_timestamp_utc(c.window[0]) for c in processed_chores]
+        )
+        last_time = get_latest_time(sched.meetings, sched.assignments, processed_chores)
+        # The existing meeting, assignment, and chore occurrences that overlap [first_time, last_time],
+        # the only ones that can clash with a requested meeting or block a task
         async with app.state.pool.acquire() as conn:
-            meeting_rows = await conn.fetch(
-                "SELECT start_time, end_time FROM meeting_occurences WHERE user_id = $1 AND (start_time < $2 OR end_time > $3)",
-                user.user_id,
-                last_time,
-                now,
-            )
-            assignment_rows = await conn.fetch(
-                "SELECT start_time, end_time FROM assignment_occurences WHERE user_id = $1 AND (start_time < $2 OR end_time > $3)",
-                user.user_id,
-                last_time,
-                now,
-            )
-            chore_rows = await conn.fetch(
-                "SELECT start_time, end_time FROM chore_occurences WHERE user_id = $1 AND (start_time < $2 OR end_time > $3)",
-                user.user_id,
-                last_time,
-                now,
-            )
-        # Build a MeetingInRequest representing all existing scheduled blocks
-        already_scheduled_times = []
-        for row in meeting_rows:
-            already_scheduled_times.append([row["start_time"], row["end_time"]])
-        for row in assignment_rows:
-            already_scheduled_times.append([row["start_time"], row["end_time"]])
-        for row in chore_rows:
-            already_scheduled_times.append([row["start_time"], row["end_time"]])
-        # Only add if there are any
-        scheduled_blocker = MeetingInRequest(
-            name="__already_scheduled__",
-            start_end_times=already_scheduled_times,
-            link_or_loc=None,
+            already_scheduled_times = await load_busy_times(conn, user.user_id, first_time, last_time)
+            availability = await load_availability(conn, user.user_id)
+        # Index all existing scheduled blocks, for conflict checks and as blocked time for the scheduler
+        blocked_index = IntervalIndex(already_scheduled_times)
+
+        # The scheduler sees the requested meetings and the blocked time the same way, so together they
+        # are the blocked-time version the cached schedules depend on
+        busy = busy_version(
+            already_scheduled_times
+            + [tuple(occ) for meeting in sched.meetings for occ in meeting.start_end_times]
         )
-        
-        # generate recurrences for chores if requested
-        processed_chores = []
-        for chore in sched.chores:
-            window_start = enforce_timestamp_utc(chore.window[0])
-            window_end = enforce_timestamp_utc(chore.window[1])
-            if chore.end_recur_date is None:
-                # No recurrence, just add date to name and keep as is
-                window_start_date = chore.window[0].strftime("%Y-%m-%d")
-                updated_chore = ChoreInRequest(
-                    name=f"{chore.name} for {window_start_date}",
-                    window=chore.window,
-                    effort=chore.effort,
-                    end_recur_date=chore.end_recur_date
-                )
-                processed_chores.append(updated_chore)
-            else:
-                end_recur = enforce_timestamp_utc(chore.end_recur_date)
-                if end_recur.date() < window_start.date():
-                    raise HTTPException(status_code=400, detail="end recur before win start")
-                # Generate recurring chores
-                window_duration = window_end - window_start
-                # calculate number of recurrences and check if too many, then generate recurring chores
-                current_date = window_start.date()
-                end_date = end_recur.date()
-                recurrence_count = 0
-                temp_date = current_date
-                while temp_date <= end_date:
-                    recurrence_count += 1
-                    temp_date += timedelta(days=1)
-                if recurrence_count > 7:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="too many chore recurrences"
-                    )
-                current_date = window_start.date()
-                while current_date <= end_date:
-                    days_offset = (current_date - window_start.date()).days
-                    new_window_start = window_start + timedelta(days=days_offset)
-                    new_window_end = new_window_start + window_duration
-                    date_str = current_date.strftime("%Y-%m-%d")
-                    updated_chore = ChoreInRequest(
-                        name=f"{chore.name} for {date_str}",
-                        window=[new_window_start, new_window_end],
-                        effort=chore.effort,
-                        end_recur_date=None  # Individual occurrences don't have recurrence
-                    )
-                    processed_chores.append(updated_chore)
-                    current_date += timedelta(days=1)
-        
-        if not already_scheduled_times:
-            schedules = schedule_tasks(
-                sched.meetings,
-                sched.assignments,
-                processed_chores,
-                num_schedules=11,
-                tz_offset_minutes=getattr(sched, "tz_offset_minutes", 0),
-                now=datetime.now(timezone.utc)
-            )
-        else: 
-            # we send the blocking times as meetings to the scheduling algorithm
-            # this is only fine because it inserts nothing in the DB
-            # and it will just use the meetings as blocked times
-            schedules = schedule_tasks(
-                sched.meetings + [scheduled_blocker],
-                sched.assignments,
-                processed_chores,
+        # Schedules are built from the start of the next cache bucket, so cached ones fit every request they
+        # are served to, and a client can send it back to /regenerateSchedule
+        origin = schedule_cache.origin(now)
+        cache_key = schedule_cache.key(
+            user.user_id,
+            sched,
+            busy,
+            origin,
+            None if availability is None else availability.version,
+        )
+        schedules = await schedule_cache.get(cache_key)
+        schedule_stream = None
+        if schedules is None:
+            schedule_args = (sched.meetings, sched.assignments, processed_chores)
+            schedule_kwargs = dict(
                 num_schedules=11,
                 tz_offset_minutes=getattr(sched, "tz_offset_minutes", 0),
-                now=datetime.now(timezone.utc)
+                tz_name=sched.tz_name,
+                availability=availability,
+                now=origin,
+                max_workers=SCHEDULER_WORKERS,
+                pool=getattr(app.state, "scheduler_pool", None),
+                blocked_times=blocked_index,
+                seed=sched.seed,
+                granularity=sched.granularity,
+                strategy=sched.strategy,
+                dedupe=True,
+                extra_candidates=SCHEDULE_EXTRA_CANDIDATES,
+                search_ms=max(min(sched.search_ms, SCHEDULE_SEARCH_MAX_MS), 0),
+                min_session_minutes=max(sched.min_session_minutes, 0),
             )
+            if stream:
+                # Starts scheduling in the background; a busy scheduler still fails before meetings are stored
+                schedule_stream = stream_schedule_tasks(*schedule_args, **schedule_kwargs)
+            else:
+                schedules = await run_schedule_tasks(*schedule_args, **schedule_kwargs)
+                await schedule_cache.set(cache_key, schedules)
         # Now, check for conflicts between requested meetings and already scheduled blocks
-        # maybe do this as an async task when waiting on network to fetch assignment and chore rows?
+        occurrences = [
+            (meeting_idx, occ_idx, occ)
+            for meeting_idx, meeting in enumerate(sched.meetings)
+            for occ_idx, occ in enumerate(meeting.start_end_times)
+        ]
+        clashes = blocked_index.overlaps([occ for _, _, occ in occurrences])
+        clashed_meetings = set()
+        meeting_conflicts = []
+        for occurrence_pos, block_pos in sorted(clashes):
+            meeting_idx, occ_idx, occ = occurrences[occurrence_pos]
+            block_start, block_end = blocked_index.intervals[block_pos]
+            clashed_meetings.add(meeting_idx)
+            meeting_conflicts.append(
+                MeetingConflict(
+                    meeting_name=sched.meetings[meeting_idx].name,
+                    occurrence_index=occ_idx,
+                    occurrence=TimeSlot(start=occ[0], end=occ[1]),
+                    blocked_by=TimeSlot(start=block_start, end=block_end),
+                )
+            )
         conflicting_meetings = []
         non_conflicting_meetings = []
-        for meeting in sched.meetings:
-            is_conflicting = False
-            for occ in meeting.start_end_times:
-                occ_start, occ_end = occ
-                for block in already_scheduled_times:
-                    block_start, block_end = block
-                    # Check for overlap
-                    if not (occ_end <= block_start or occ_start >= block_end):
-                        is_conflicting = True
-                        break
-                if is_conflicting:
-                    break
-            if is_conflicting:
+        for meeting_idx, meeting in enumerate(sched.meetings):
+            if meeting_idx in clashed_meetings:
                 conflicting_meetings.append(meeting.name)
             else:
                 non_conflicting_meetings.append(meeting)
         # Only schedule non-conflicting meetings in the DB
         meeting_resp = []
-        async with app.state.pool.acquire() as conn:
+        async with app.state.pool.acquire() as conn, busy_cache.batch(user.user_id) as (inserted, _):
             for meeting in non_conflicting_meetings:
                 lloc = "N/A" if meeting.link_or_loc is None else meeting.link_or_loc
                 recurs: bool = len(meeting.start_end_times) > 1
@@ -636,6 +866,7 @@ async def schedule(
                         start,
                         end,
                     )
+                    inserted.append((start, end))
                     occurence_ids += [occurence_id]
                 meeting_response = MeetingInResponse(
                     ocurrence_ids=occurence_ids,
@@ -650,10 +881,30 @@ async def schedule(
         #     meetings=meeting_resp,
         #     schedules=schedules,
         # ).model_dump_json())
-        return ScheduleResponseFormat(
+        if stream:
+            header = ScheduleResponseFormat(
+                conflicting_meetings=conflicting_meetings,
+                meetings=meeting_resp,
+                schedules=[],
+                meeting_conflicts=meeting_conflicts,
+                origin=origin,
+            ).model_dump(mode="json", exclude={"schedules", "distinct_schedules"})
+            return StreamingResponse(
+                schedule_ndjson(header, schedules, schedule_stream, cache_key),
+                media_type="application/x-ndjson",
+            )
+        response = ScheduleResponseFormat(
             conflicting_meetings=conflicting_meetings,
             meetings=meeting_resp,
             schedules=schedules,
+            meeting_conflicts=meeting_conflicts,
+            distinct_schedules=len(schedules),
+            origin=origin,
+        )
+        # Serialized straight to JSON: the schedules come out of the scheduler already validated, so the
+        # dump-to-dict and validate round trip FastAPI does for response models would be wasted work
+        return Response(
+            content=response.model_dump_json(), media_type="application/json"
         )
     except HTTPException as http_exc:
         # Pass through known HTTP exceptions like 401
@@ -666,6 +917,54 @@ async def schedule(
         )
 
 
+@app.post("/regenerateSchedule")
+async def regenerate(
+    req: RegenerateScheduleRequest, token: Annotated[str, Depends(oauth2_scheme)]
+) -> Schedule:
+    """
+    Rebuild one schedule of an earlier /schedule response from the same request, the response's origin and
+    the schedule's seed and skip_prob, without building the other candidates or storing the meetings again.
+    The meetings /schedule stored are blocked time now, which the scheduler treats like the requested meetings
+    """
+    try:
+        user = await get_current_user(token, app.state.pool)
+        origin = enforce_timestamp_utc(req.origin)
+        processed_chores = expand_chore_recurrences(req.chores)
+        # Same range of blocked time as /schedule, the scheduler ignores what ends before the origin
+        first_time = min(
+            [get_earliest_time(req.meetings, origin)]
+            + [enforce_timestamp_utc(c.window[0]) for c in processed_chores]
+        )
+        last_time = get_latest_time(req.meetings, req.assignments, processed_chores)
+        async with app.state.pool.acquire() as conn:
+            busy_times = await load_busy_times(conn, user.user_id, first_time, last_time)
+            availability = await load_availability(conn, user.user_id)
+        return await run_on_scheduling_executor(
+            regenerate_schedule,
+            req.meetings,
+            req.assignments,
+            processed_chores,
+            req.seed,
+            req.skip_prob,
+            origin,
+            tz_offset_minutes=req.tz_offset_minutes,
+            blocked_times=IntervalIndex(busy_times),
+            granularity=req.granularity,
+            strategy=req.strategy,
+            tz_name=req.tz_name,
+            availability=availability,
+            min_session_minutes=max(req.min_session_minutes, 0),
+        )
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error",
+        )
+
+
 @app.post("/setSchedule")
 async def set_schedule(
     chosen_schedule: Schedule,
@@ -674,8 +973,8 @@ async def set_schedule(
 ) -> ScheduleSetInStone:
     """Picks a "schedule" (a list of possible ways to arrange times to work on assignments and chores) and sets it in stone"""
     try:
-        async with app.state.pool.acquire() as conn:
-            user = await get_current_user(token, app.state.pool)
+        user = await get_current_user(token, app.state.pool)
+        async with app.state.pool.acquire() as conn, busy_cache.batch(user.user_id) as (inserted, _):
             assignment_return_list: List[AssignmentInResponse] = []
             for assignment in chosen_schedule.assignments:
                 # print(assignment.due)
@@ -701,6 +1000,7 @@ async def set_schedule(
                         timeslot.end,
                         timeslot.xp_potential,
                     )
+                    inserted.append((timeslot.start, timeslot.end))
                     occurence_ids.append(occurence_id)
                 assignment_return = AssignmentInResponse(
                     assignment_id=assign_id,
@@ -741,6 +1041,7 @@ async def set_schedule(
                         user.user_id,
                         timeslot.xp_potential,
                     )
+                    inserted.append((timeslot.start, timeslot.end))
                     occurence_ids.append(occurence_id)
                 chore_return = ChoreInResponse(
                     chore_id=assign_id,
@@ -809,7 +1110,7 @@ async def mark_session_completed(complete: SessionCompletionDataModel, token: An
                 await conn.execute("UPDATE achievements SET levels = $1 WHERE user_id = $2", new_level, user.user_id)
             
             # Check achievements with timezone awareness
-            achievements_unlocked = await check_achievements(conn, user.user_id, complete.tz_offset_minutes)
+            achievements_unlocked = await check_achievements(conn, user.user_id, complete.tz_offset_minutes, complete.tz_name)
             
             return SessionCompletionResponse(message='Successfully marked session as complete!', new_xp=new_xp, achievements=achievements_unlocked)
     except HTTPException as e:
@@ -889,32 +1190,35 @@ async def update(
 
                 clashed_ids: list[int] = []
                 updated_count = 0
-                for fo in future_occs:
-                    prop_start = fo["start_time"] + delta_start
-                    prop_end = fo["end_time"] + delta_end
-
-                    # Check for clash with other meetings (exclude same meeting)
-                    clash = await conn.fetchval(
-                        """
-                        SELECT 1 FROM meeting_occurences
-                        WHERE user_id = $1 AND meeting_id != $2
-                          AND (($3, $4) OVERLAPS (start_time, end_time))
-                        """,
-                        user.user_id, changes.meeting_id, prop_start, prop_end
-                    )
-                    if clash:
-                        clashed_ids.append(fo["occurence_id"])
-                        continue
+                async with busy_cache.batch(user.user_id) as (moved_to, moved_from):
+                    for fo in future_occs:
+                        prop_start = fo["start_time"] + delta_start
+                        prop_end = fo["end_time"] + delta_end
 
-                    await conn.execute(
-                        """
-                        UPDATE meeting_occurences
-                        SET start_time = $1, end_time = $2
-                        WHERE occurence_id = $3 AND user_id = $4
-                        """,
-                        prop_start, prop_end, fo["occurence_id"], user.user_id
-                    )
-                    updated_count += 1
+                        # Check for clash with other meetings (exclude same meeting)
+                        clash = await conn.fetchval(
+                            """
+                            SELECT 1 FROM meeting_occurences
+                            WHERE user_id = $1 AND meeting_id != $2
+                              AND (($3, $4) OVERLAPS (start_time, end_time))
+                            """,
+                            user.user_id, changes.meeting_id, prop_start, prop_end
+                        )
+                        if clash:
+                            clashed_ids.append(fo["occurence_id"])
+                            continue
+
+                        await conn.execute(
+                            """
+                            UPDATE meeting_occurences
+                            SET start_time = $1, end_time = $2
+                            WHERE occurence_id = $3 AND user_id = $4
+                            """,
+                            prop_start, prop_end, fo["occurence_id"], user.user_id
+                        )
+                        moved_from.append((fo["start_time"], fo["end_time"]))
+                        moved_to.append((prop_start, prop_end))
+                        updated_count += 1
 
                 msg = (
                     f"Updated {updated_count} occurrence(s). "
@@ -942,6 +1246,8 @@ async def update(
                     """,
                     new_start, new_end, changes.ocurrence_id, changes.meeting_id, user.user_id
                 )
+                # The old times of the occurrence aren't known here
+                await busy_cache.invalidate(user.user_id)
                 return UpdateResponseDataModel(clashed=[], message="Occurrence updated successfully.")
     except HTTPException as e:
         raise e
@@ -980,6 +1286,7 @@ async def delete(
                         user.user_id,
                         start_time,
                     )
+                    await busy_cache.invalidate(user.user_id)
                     await conn.execute(
                         "DELETE FROM meetings WHERE meeting_id = $1 AND user_id = $2",
                         meeting_id,
@@ -995,6 +1302,7 @@ async def delete(
                         deletion.occurence_id,
                         user.user_id,
                     )
+                    await busy_cache.invalidate(user.user_id)
                     return MessageResponseDataModel(message="Occurrence deleted.")
             elif deletion.event_type == "assignment":
                 # Get assignment_id from the occurrence
@@ -1012,6 +1320,7 @@ async def delete(
                     ass_id,
                     user.user_id,
                 )
+                await busy_cache.invalidate(user.user_id)
                 # Delete the assignment itself
                 await conn.execute(
                     "DELETE FROM assignments WHERE assignment_id = $1 AND user_id = $2",
@@ -1037,6 +1346,7 @@ async def delete(
                     chore_id,
                     user.user_id,
                 )
+                await busy_cache.invalidate(user.user_id)
                 # Delete the chore itself
                 await conn.execute(
                     "DELETE FROM chores WHERE chore_id = $1 AND user_id = $2",
@@ -1064,23 +1374,55 @@ async def reschedule(
     Deletes all current occurrences but not the parent assignment/chore record.
     """
     try:
-        async with app.state.pool.acquire() as conn:
-            user = await get_current_user(token, app.state.pool)
-            now = datetime.now(timezone.utc)
+        user = await get_current_user(token, app.state.pool)
+        if re.event_type not in ("assignment", "chore"):
+            raise HTTPException(status_code=400, detail="Invalid event_type")
 
-            if re.event_type not in ("assignment", "chore"):
-                raise HTTPException(status_code=400, detail="Invalid event_type")
+        table = "assignments" if re.event_type == "assignment" else "chores"
+        occ_table = (
+            "assignment_occurences" if re.event_type == "assignment" else "chore_occurences"
+        )
+        id_col = "assignment_id" if re.event_type == "assignment" else "chore_id"
+        name_col = "assignment_name" if re.event_type == "assignment" else "chore_name"
 
-            table = "assignments" if re.event_type == "assignment" else "chores"
-            occ_table = (
-                "assignment_occurences"
-                if re.event_type == "assignment"
-                else "chore_occurences"
-            )
-            id_col = "assignment_id" if re.event_type == "assignment" else "chore_id"
-            name_col = (
-                "assignment_name" if re.event_type == "assignment" else "chore_name"
-            )
+        # Validate the new values and build the UPDATE of the parent record, it only runs once scheduling is done
+        update_fields = []
+        update_values = []
+        if re.new_effort is not None:
+            update_fields.append("effort")
+            update_values.append(re.new_effort)
+        if re.event_type == "assignment":
+            if re.new_window_end is not None:
+                # Ensure deadline is a datetime, not an int
+                if isinstance(re.new_window_end, int):
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Deadline must be a datetime, not an integer",
+                    )
+                update_fields.append("deadline")
+                update_values.append(re.new_window_end)
+        else:
+            if re.new_window_start is not None:
+                if isinstance(re.new_window_start, int):
+                    raise HTTPException(
+                        status_code=400,
+                        detail="start_window must be a datetime, not an integer",
+                    )
+                update_fields.append("start_window")
+                update_values.append(re.new_window_start)
+            if re.new_window_end is not None:
+                if isinstance(re.new_window_end, int):
+                    raise HTTPException(
+                        status_code=400,
+                        detail="end_window must be a datetime, not an integer",
+                    )
+                update_fields.append("end_window")
+                update_values.append(re.new_window_end)
+
+        # Only reads here: the connection goes back to the pool before scheduling, which can take up to the
+        # executor's timeout, and nothing is changed until the new schedules exist
+        async with app.state.pool.acquire() as conn:
+            now = datetime.now(timezone.utc)
 
             obj_id = re.id
             # Fetch the parent record
@@ -1103,173 +1445,94 @@ async def reschedule(
 
             obj_id = row[id_col]
             name = row[name_col]
-            old_effort = row["effort"]
+            new_effort = re.new_effort if re.new_effort is not None else row["effort"]
             if re.event_type == "assignment":
-                old_window_start = None
-                old_window_end = old_due = row["deadline"]
+                new_due = re.new_window_end if re.new_window_end is not None else row["deadline"]
+                assignment_req = AssignmentInRequest(name=name, effort=new_effort, due=new_due)
+                window_end = new_due
             else:
-                old_window_start = row["start_window"]
-                old_window_end = row["end_window"]
-                old_due = None
-
-            # Get all current occurrences for this assignment/chore
-            old_occs = await conn.fetch(
-                f"SELECT start_time, end_time, occurence_id FROM {occ_table} WHERE {id_col} = $1 AND user_id = $2",
-                obj_id,
-                user.user_id,
-            )
-            old_slots = [[o["start_time"], o["end_time"]] for o in old_occs]
-
-            # Only delete occurrences with end_time in the future
-            now_utc = datetime.now(timezone.utc)
-            future_occs = [
-                o["occurence_id"] for o in old_occs if o["end_time"] >= now_utc
-            ]
-            if future_occs:
-                await conn.execute(
-                    f"DELETE FROM {occ_table} WHERE occurence_id = ANY($1::int[]) AND user_id = $2",
-                    future_occs,
-                    user.user_id,
-                )
-
-            # Update parent record if new values provided
-            if re.event_type == "assignment":
-                update_fields = []
-                update_values = []
-                param_idx = 1
-                if re.new_effort is not None:
-                    update_fields.append(f"effort = ${param_idx}")
-                    update_values.append(re.new_effort)
-                    param_idx += 1
-                if re.new_window_end is not None:
-                    update_fields.append(f"deadline = ${param_idx}")
-                    # Ensure deadline is a datetime, not an int
-                    if isinstance(re.new_window_end, int):
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Deadline must be a datetime, not an integer",
-                        )
-                    update_values.append(re.new_window_end)
-                    param_idx += 1
-                if update_fields:
-                    await conn.execute(
-                        f"UPDATE {table} SET {', '.join(update_fields)} WHERE {id_col} = ${param_idx} AND user_id = ${param_idx+1}",
-                        *(update_values + [obj_id, user.user_id]),
-                    )
-                new_effort = re.new_effort if re.new_effort is not None else old_effort
-                new_due = (
-                    re.new_window_end if re.new_window_end is not None else old_due
-                )
-                assignment_req = AssignmentInRequest(
-                    name=name, effort=new_effort, due=new_due
-                )
-            else:
-                update_fields = []
-                update_values = []
-                param_idx = 1
-                if re.new_effort is not None:
-                    update_fields.append(f"effort = ${param_idx}")
-                    update_values.append(re.new_effort)
-                    param_idx += 1
-                if re.new_window_start is not None:
-                    update_fields.append(f"start_window = ${param_idx}")
-                    if isinstance(re.new_window_start, int):
-                        raise HTTPException(
-                            status_code=400,
-                            detail="start_window must be a datetime, not an integer",
-                        )
-                    update_values.append(re.new_window_start)
-                    param_idx += 1
-                if re.new_window_end is not None:
-                    update_fields.append(f"end_window = ${param_idx}")
-                    if isinstance(re.new_window_end, int):
-                        raise HTTPException(
-                            status_code=400,
-                            detail="end_window must be a datetime, not an integer",
-                        )
-                    update_values.append(re.new_window_end)
-                    param_idx += 1
-                if update_fields:
-                    await conn.execute(
-                        f"UPDATE {table} SET {', '.join(update_fields)} WHERE {id_col} = ${param_idx} AND user_id = ${param_idx+1}",
-                        *(update_values + [obj_id, user.user_id]),
-                    )
-                new_effort = re.new_effort if re.new_effort is not None else old_effort
                 new_window_start = (
-                    re.new_window_start
-                    if re.new_window_start is not None
-                    else old_window_start
+                    re.new_window_start if re.new_window_start is not None else row["start_window"]
                 )
                 new_window_end = (
-                    re.new_window_end
-                    if re.new_window_end is not None
-                    else old_window_end
+                    re.new_window_end if re.new_window_end is not None else row["end_window"]
                 )
                 chore_req = ChoreInRequest(
                     name=name,
                     window=[new_window_start, new_window_end],
                     effort=new_effort,
                 )
+                window_end = new_window_end
 
-            # Gather all other blocked times (meetings, assignments, chores)
-            # If allow_overlaps is False, include old_slots as blocked times
-            meetings = await conn.fetch(
-                "SELECT start_time, end_time FROM meeting_occurences WHERE user_id = $1",
+            # Get all current occurrences for this assignment/chore
+            old_occs = await conn.fetch(
+                f"SELECT start_time, end_time, occurence_id FROM {occ_table} WHERE {id_col} = $1 AND user_id = $2",
+                obj_id,
                 user.user_id,
             )
-            assignments = await conn.fetch(
-                "SELECT start_time, end_time FROM assignment_occurences WHERE user_id = $1"
-                + (
-                    f" AND assignment_id != {obj_id}"
-                    if re.event_type == "assignment"
-                    else ""
-                ),
-                user.user_id,
+            old_slots = [(o["start_time"], o["end_time"]) for o in old_occs]
+            # Only occurrences with end_time in the future get deleted
+            future_occs = [o for o in old_occs if o["end_time"] >= now]
+
+            # Gather all other blocked times (meetings, assignments, chores) between now and the end of the
+            # new window, nothing outside it can block the rescheduled task
+            # If allow_overlaps is False, include old_slots as blocked times
+            window_end = enforce_timestamp_utc(window_end)
+            busy_times = Counter(
+                (enforce_timestamp_utc(s), enforce_timestamp_utc(e))
+                for s, e in await load_busy_times(conn, user.user_id, now, window_end)
             )
-            chores = await conn.fetch(
-                "SELECT start_time, end_time FROM chore_occurences WHERE user_id = $1"
-                + (f" AND chore_id != {obj_id}" if re.event_type == "chore" else ""),
-                user.user_id,
+            # The task's own future occurrences are about to be deleted, so they don't block it
+            busy_times.subtract(
+                (enforce_timestamp_utc(o["start_time"]), enforce_timestamp_utc(o["end_time"]))
+                for o in future_occs
             )
-            blocked_times = []
-            for r in meetings:
-                blocked_times.append([r["start_time"], r["end_time"]])
-            for r in assignments:
-                blocked_times.append([r["start_time"], r["end_time"]])
-            for r in chores:
-                blocked_times.append([r["start_time"], r["end_time"]])
+            blocked_times = list((+busy_times).elements())
             if not re.allow_overlaps:
                 blocked_times.extend(old_slots)
+            availability = await load_availability(conn, user.user_id)
 
-            scheduled_blocker = MeetingInRequest(
-                name="__already_scheduled__",
-                start_end_times=blocked_times,
-                link_or_loc=None,
-            )
+        # Call scheduler for just this assignment/chore. A 503 or 504 from here leaves the task as it was
+        schedules = await run_schedule_tasks(
+            [],
+            [assignment_req] if re.event_type == "assignment" else [],
+            [chore_req] if re.event_type == "chore" else [],
+            tz_offset_minutes=getattr(re, "tz_offset_minutes", 0),
+            tz_name=re.tz_name,
+            availability=availability,
+            num_schedules=11,
+            now=datetime.now(timezone.utc),
+            max_workers=SCHEDULER_WORKERS,
+            pool=getattr(app.state, "scheduler_pool", None),
+            blocked_times=IntervalIndex(blocked_times),
+        )
 
-            # Call scheduler for just this assignment/chore
-            tz_offset = getattr(re, "tz_offset_minutes", 0)
-            if re.event_type == "assignment":
-                schedules = schedule_tasks(
-                    [scheduled_blocker],
-                    [assignment_req],
-                    [],
-                    tz_offset_minutes=tz_offset,
-                    num_schedules=11,
-                    now=datetime.now(timezone.utc)
-                )
-            else:
-                schedules = schedule_tasks(
-                    [scheduled_blocker],
-                    [],
-                    [chore_req],
-                    tz_offset_minutes=tz_offset,
-                    num_schedules=11,
-                    now=datetime.now(timezone.utc)
+        # Delete the future occurrences and update the parent record together
+        if future_occs or update_fields:
+            async with app.state.pool.acquire() as conn:
+                async with conn.transaction():
+                    if future_occs:
+                        await conn.execute(
+                            f"DELETE FROM {occ_table} WHERE occurence_id = ANY($1::int[]) AND user_id = $2",
+                            [o["occurence_id"] for o in future_occs],
+                            user.user_id,
+                        )
+                    if update_fields:
+                        set_clause = ", ".join(
+                            f"{field} = ${i}" for i, field in enumerate(update_fields, start=1)
+                        )
+                        await conn.execute(
+                            f"UPDATE {table} SET {set_clause} WHERE {id_col} = ${len(update_fields) + 1} AND user_id = ${len(update_fields) + 2}",
+                            *(update_values + [obj_id, user.user_id]),
+                        )
+            if future_occs:
+                await busy_cache.remove(
+                    user.user_id,
+                    [(o["start_time"], o["end_time"]) for o in future_occs],
                 )
-            return ScheduleResponseFormat(
-                schedules=schedules, conflicting_meetings=[], meetings=[]
-            )
+        return ScheduleResponseFormat(
+            schedules=schedules, conflicting_meetings=[], meetings=[]
+        )
 
     except HTTPException as e:
         raise e
@@ -1477,6 +1740,108 @@ async def fetch(
         )
 
 
+@app.post("/setAvailability")
+async def set_availability(
+    template: AvailabilityTemplate, token: Annotated[str, Depends(oauth2_scheme)]
+) -> MessageResponseDataModel:
+    """
+    Store the hours of the week (local time) in which the user's tasks may be scheduled, replacing the default
+    7AM-11PM. Applies to /schedule and /reschedule from the next request on
+    """
+    try:
+        user = await get_current_user(token, app.state.pool)
+        availability = WeeklyAvailability(template)
+        async with app.state.pool.acquire() as conn:
+            await conn.execute(
+                "INSERT INTO availability_templates(user_id, template) VALUES($1, $2::jsonb) "
+                "ON CONFLICT (user_id) DO UPDATE SET template = EXCLUDED.template, updated_at = now()",
+                user.user_id,
+                template.model_dump_json(),
+            )
+        availability_cache[user.user_id] = availability
+        return MessageResponseDataModel(message="Availability updated")
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error",
+        )
+
+
+@app.get("/getAvailability")
+async def get_availability(token: Annotated[str, Depends(oauth2_scheme)]) -> AvailabilityTemplate:
+    """The user's weekly availability template, or the default 7AM-11PM every day if they haven't set one"""
+    try:
+        user = await get_current_user(token, app.state.pool)
+        async with app.state.pool.acquire() as conn:
+            raw = await conn.fetchval(
+                "SELECT template FROM availability_templates WHERE user_id = $1", user.user_id
+            )
+        if raw is None:
+            return DEFAULT_AVAILABILITY
+        return AvailabilityTemplate.model_validate_json(raw)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error",
+        )
+
+
+@app.post("/freeTime")
+async def free_time(
+    request: FreeTimeRequest, token: Annotated[str, Depends(oauth2_scheme)]
+) -> FreeTimeResponse:
+    """
+    Free minutes in each of the requested windows, the capacity /schedule has to place tasks in there.
+    Counted on the same timeline /schedule builds, without placing anything, so it's cheap enough to preview
+    whether tasks will fit before asking for schedules
+    """
+    try:
+        user = await get_current_user(token, app.state.pool)
+        windows = []
+        for window in request.windows:
+            if len(window) != 2:
+                raise HTTPException(status_code=400, detail="each window needs a start and an end")
+            start, end = enforce_timestamp_utc(window[0]), enforce_timestamp_utc(window[1])
+            if end < start:
+                raise HTTPException(status_code=400, detail="window ends before it starts")
+            windows.append((start, end))
+        if not windows:
+            return FreeTimeResponse(free_minutes=[], total_free_minutes=0)
+        first_time = min(start for start, _ in windows)
+        last_time = max(end for _, end in windows)
+        async with app.state.pool.acquire() as conn:
+            blocked = await load_busy_times(conn, user.user_id, first_time, last_time)
+            availability = await load_availability(conn, user.user_id)
+        timeline = Timeline(
+            blocked,
+            first_time,
+            last_time,
+            request.tz_offset_minutes,
+            request.tz_name,
+            availability,
+        )
+        return FreeTimeResponse(
+            free_minutes=[timeline.free_minutes(start, end) for start, end in windows],
+            total_free_minutes=sum(
+                timeline.free_minutes(start, end) for start, end in merge_intervals(windows)
+            ),
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error",
+        )
+
+
 @app.get("/getLevel")
 async def get_level(token: Annotated[str, Depends(oauth2_scheme)]) -> LevelResponse:
     try:
@@ -0,0 +1,236 @@
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from cachetools import TTLCache
+
+from util import enforce_timestamp_utc
+
+
+def _utc(
+    intervals: Iterable[Tuple[datetime, datetime]],
+) -> List[Tuple[datetime, datetime]]:
+    return [(enforce_timestamp_utc(s), enforce_timestamp_utc(e)) for s, e in intervals]
+
+
+class BusyTimeline:
+    """
+    One user's meeting, assignment and chore occurrences, as (start, end) intervals.
+    lo, hi: the range they were fetched for, every occurrence overlapping it is in intervals.
+    intervals: count of each interval, two occurrences can take the same time
+    version: the user's busy version the intervals are current for
+    """
+
+    __slots__ = ("lo", "hi", "intervals", "version")
+
+    def __init__(self, lo: datetime, hi: datetime, intervals: Counter, version: int):
+        self.lo = lo
+        self.hi = hi
+        self.intervals = intervals
+        self.version = version
+
+    def covers(self, lo: datetime, hi: datetime) -> bool:
+        return self.lo <= lo and hi <= self.hi
+
+    def overlapping(
+        self, lo: datetime, hi: datetime
+    ) -> List[Tuple[datetime, datetime]]:
+        """The intervals with end > lo and start < hi, like the occurrence lookups, repeated as often as they occur"""
+        return sorted(
+            interval
+            for interval, count in self.intervals.items()
+            if interval[1] > lo and interval[0] < hi
+            for _ in range(count)
+        )
+
+
+class MemoryVersionStore:
+    """In-process busy versions, only correct while a single worker serves the API"""
+
+    def __init__(self):
+        self._versions: Dict[int, int] = {}
+
+    async def get(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    async def bump(self, user_id: int) -> int:
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        return self._versions[user_id]
+
+    async def clear(self):
+        self._versions.clear()
+
+
+class RedisVersionStore:
+    """
+    Busy versions shared by every worker process, one counter per user under prefix + user_id.
+    The counters never expire, a counter restarting at 0 could match an entry built before it expired.
+    """
+
+    def __init__(self, url: str, prefix: str = "busy_version:"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, user_id: int) -> int:
+        raw = await self._redis.get(f"{self.prefix}{user_id}")
+        return 0 if raw is None else int(raw)
+
+    async def bump(self, user_id: int) -> int:
+        return await self._redis.incr(f"{self.prefix}{user_id}")
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(match=self.prefix + "*"):
+            await self._redis.delete(key)
+
+
+class BusyTimelineCache:
+    """
+    Busy time of recently active users, so back to back scheduling requests don't query the three occurrence
+    tables again. An entry is built from the lookups of the first request that needs it (put), and the
+    endpoints that add or remove occurrences patch it with the times they wrote (add, remove). Endpoints that
+    can't tell which times they changed call invalidate instead.
+    Every change raises the user's version in versions, an entry is only used at the version it was built or
+    patched for, and put drops lookups that started before a change, so a request racing a change can't cache
+    stale rows. With a RedisVersionStore a change made through one worker outdates the entries of every other
+    worker, with the default MemoryVersionStore only those of its own.
+    versions: anything with async get/bump/clear, MemoryVersionStore or RedisVersionStore
+    enabled: False makes every lookup a miss, for several workers without a shared version store
+    A failing version store is treated as a miss, the cache never fails a request.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300,
+        timer=time.monotonic,
+        versions=None,
+        enabled: bool = True,
+    ):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        self.versions = versions if versions is not None else MemoryVersionStore()
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    async def version(self, user_id: int) -> int | None:
+        """The user's current version, None if the version store can't be read"""
+        try:
+            return await self.versions.get(user_id)
+        except Exception as e:
+            print(f"Busy cache version read failed: {e}")
+            return None
+
+    async def get(
+        self, user_id: int, lo: datetime, hi: datetime
+    ) -> List[Tuple[datetime, datetime]] | None:
+        """The user's busy intervals overlapping [lo, hi], None unless a current entry covers the range"""
+        lo, hi = enforce_timestamp_utc(lo), enforce_timestamp_utc(hi)
+        entry = self._entries.get(user_id) if self.enabled else None
+        if (
+            entry is None
+            or not entry.covers(lo, hi)
+            or entry.version != await self.version(user_id)
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.overlapping(lo, hi)
+
+    async def put(
+        self,
+        user_id: int,
+        lo: datetime,
+        hi: datetime,
+        intervals: List[Tuple[datetime, datetime]],
+        version: int | None,
+    ):
+        """
+        Cache the busy intervals looked up for [lo, hi]. version: the user's version read before the
+        lookups, nothing is cached if it changed since
+        """
+        if (
+            not self.enabled
+            or version is None
+            or version != await self.version(user_id)
+        ):
+            return
+        self._entries[user_id] = BusyTimeline(
+            enforce_timestamp_utc(lo),
+            enforce_timestamp_utc(hi),
+            Counter(_utc(intervals)),
+            version,
+        )
+
+    async def _patch(self, user_id: int) -> BusyTimeline | None:
+        """Raise the user's version and return their entry, if it was current, to be patched for the new one"""
+        try:
+            version = await self.versions.bump(user_id)
+        except Exception as e:
+            print(f"Busy cache version bump failed: {e}")
+            self._entries.pop(user_id, None)
+            return None
+        entry = self._entries.get(user_id)
+        # Another change in between (possibly through another worker) means the entry misses more than ours
+        if entry is None or entry.version != version - 1:
+            self._entries.pop(user_id, None)
+            return None
+        entry.version = version
+        return entry
+
+    async def update(
+        self,
+        user_id: int,
+        added: Iterable[Tuple[datetime, datetime]] = (),
+        removed: Iterable[Tuple[datetime, datetime]] = (),
+    ):
+        """Occurrences inserted and deleted for the user, patched in with a single version bump"""
+        entry = await self._patch(user_id)
+        if entry is not None:
+            entry.intervals.subtract(_utc(removed))
+            entry.intervals.update(_utc(added))
+            entry.intervals = +entry.intervals
+
+    async def add(self, user_id: int, intervals: Iterable[Tuple[datetime, datetime]]):
+        """Occurrences inserted for the user"""
+        await self.update(user_id, added=intervals)
+
+    async def remove(
+        self, user_id: int, intervals: Iterable[Tuple[datetime, datetime]]
+    ):
+        """Occurrences deleted for the user"""
+        await self.update(user_id, removed=intervals)
+
+    @asynccontextmanager
+    async def batch(self, user_id: int):
+        """
+        Yields (added, removed) lists for an endpoint to collect the occurrences it inserts and deletes, and
+        applies them in one update at the end, also when the endpoint fails part way with some rows written
+        """
+        added: List[Tuple[datetime, datetime]] = []
+        removed: List[Tuple[datetime, datetime]] = []
+        try:
+            yield added, removed
+        finally:
+            if added or removed:
+                await self.update(user_id, added, removed)
+
+    async def invalidate(self, user_id: int):
+        """Occurrences of the user changed in a way the caller can't describe, the next lookup goes to the DB"""
+        self._entries.pop(user_id, None)
+        try:
+            await self.versions.bump(user_id)
+        except Exception as e:
+            print(f"Busy cache version bump failed: {e}")
+
+    async def clear(self):
+        self._entries.clear()
+        await self.versions.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
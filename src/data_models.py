@@ -1,7 +1,23 @@
-from pydantic import BaseModel
-from datetime import datetime, timedelta, timezone
+from pydantic import AfterValidator, BaseModel, Field, model_validator
+from datetime import datetime, time as dt_time, timedelta, timezone
 from typing import Annotated, Union, List, Tuple, Literal
 from collections import defaultdict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def _known_timezone(name: str) -> str:
+    try:
+        ZoneInfo(name)
+    except ZoneInfoNotFoundError:
+        raise ValueError(f"unknown timezone {name}")
+    return name
+
+
+# IANA timezone name such as "America/New_York". Takes precedence over tz_offset_minutes where both are given
+TimezoneName = Annotated[str, AfterValidator(_known_timezone)]
+
+# Fixed offset from UTC in minutes, strictly within a day like any datetime.timezone
+TzOffsetMinutes = Annotated[int, Field(gt=-24 * 60, lt=24 * 60)]
 
 # Request data models
 
@@ -80,7 +96,8 @@ class RescheduleRequestDataModel(BaseModel):
     new_effort: int | None = None
     new_window_start: datetime | None = None
     new_window_end: datetime | None = None
-    tz_offset_minutes: int = 0  # NEW: offset from UTC in minutes
+    tz_offset_minutes: TzOffsetMinutes = 0  # NEW: offset from UTC in minutes
+    tz_name: TimezoneName | None = None
 
 
 class MeetingInRequest(BaseModel):
@@ -122,7 +139,66 @@ class ScheduleRequest(BaseModel):
     assignments: List[AssignmentInRequest]
     meetings: List[MeetingInRequest]
     chores: List[ChoreInRequest]
-    tz_offset_minutes: int = 0  # NEW: offset from UTC in minutes
+    tz_offset_minutes: TzOffsetMinutes = 0  # NEW: offset from UTC in minutes
+    tz_name: TimezoneName | None = None  # follows DST, unlike the fixed offset
+    seed: int | None = None  # same seed and inputs give the same schedules; picked at random if missing
+    granularity: Literal[1, 5, 15, 30] = 1  # minutes per scheduling block
+    strategy: Literal["greedy", "edf"] = "greedy"  # edf packs tasks earliest deadline first
+    search_ms: int = 0  # CPU milliseconds to spend searching for more potential XP, capped by the server
+    min_session_minutes: int = 0  # shorter work sessions are merged into longer ones of the same task or dropped
+
+
+class RegenerateScheduleRequest(ScheduleRequest):
+    """
+    Rebuild one schedule of a /schedule response: the same request, with the response's origin and the
+    schedule's seed and skip_prob. It comes out the same as long as the user's busy time hasn't changed since
+    """
+
+    origin: datetime
+    seed: int
+    skip_prob: float
+
+
+class WeeklyTimeBlock(BaseModel):
+    """
+    A block of local time on one day of the week
+    weekday: 0 is Monday, 6 is Sunday
+    end: 00:00 stands for midnight at the end of the day
+    """
+
+    weekday: int = Field(ge=0, le=6)
+    start: dt_time
+    end: dt_time
+
+    @model_validator(mode="after")
+    def _ends_after_start(self):
+        if self.end != dt_time(0) and self.end <= self.start:
+            raise ValueError("end must be after start")
+        return self
+
+
+class AvailabilityTemplate(BaseModel):
+    """
+    When tasks may be scheduled, in the user's local time, repeated every week. Replaces the default 7AM-11PM
+    available: blocks in which tasks may be scheduled, they may overlap
+    blackouts: blocks in which nothing is scheduled, even where they overlap an available block
+    """
+
+    available: List[WeeklyTimeBlock]
+    blackouts: List[WeeklyTimeBlock] = []
+
+
+class FreeTimeRequest(BaseModel):
+    """
+    Windows to count the free time of, without scheduling anything. Each window is a list of exactly 2
+    timestamps, like an occurrence in MeetingInRequest
+    Free time is time tasks could be scheduled in: inside the user's availability (7AM-11PM by default)
+    and not taken by an already scheduled meeting, assignment or chore
+    """
+
+    windows: List[List[datetime]]
+    tz_offset_minutes: TzOffsetMinutes = 0
+    tz_name: TimezoneName | None = None
 
 
 class SessionCompletionDataModel(BaseModel):
@@ -132,7 +208,8 @@ class SessionCompletionDataModel(BaseModel):
     completed: bool
     is_assignment: bool
     locked_in: int
-    tz_offset_minutes: int = 0  # NEW: timezone offset from UTC in minutes
+    tz_offset_minutes: TzOffsetMinutes = 0  # NEW: timezone offset from UTC in minutes
+    tz_name: TimezoneName | None = None
 
 
 # Response data models
@@ -228,6 +305,10 @@ class Schedule(BaseModel):
     conflicting_chores: Not possible to find a schedule in which there is time to work on these chores
     not_enough_time_assignments: Can work on these for a little bit, but not enough to meet the amount of time required
     same idea for chores
+    seed, skip_prob: the random stream and skip probability this schedule was built with. Together with the
+    response's origin and the request they're enough to rebuild it with /regenerateSchedule
+    fingerprint: hash of the slots given to each task, schedules with the same layout share it
+    fragment_count: number of work sessions (slots) across all tasks, each becomes an occurrence row on setSchedule
     """
 
     assignments: List[AssignmentInPotentialSchedule]
@@ -237,17 +318,48 @@ class Schedule(BaseModel):
     not_enough_time_assignments: List[str]
     not_enough_time_chores: List[str]
     total_potential_xp: int = 0  # New field for total potential XP
+    fragment_count: int = 0
+    seed: int | None = None
+    skip_prob: float | None = None
+    fingerprint: str | None = None
+
+
+class FreeTimeResponse(BaseModel):
+    """
+    free_minutes: free minutes in each requested window, in the same order
+    total_free_minutes: free minutes in all the windows together, time in overlapping windows is counted once
+    """
+
+    free_minutes: List[int]
+    total_free_minutes: int
+
+
+class MeetingConflict(BaseModel):
+    """One occurrence of a requested meeting that clashes with an already scheduled block
+    occurrence_index: position of the occurrence in the meeting's start_end_times
+    """
+
+    meeting_name: str
+    occurrence_index: int
+    occurrence: TimeSlot
+    blocked_by: TimeSlot
 
 
 class ScheduleResponseFormat(BaseModel):
     """Main element of response: a list of schedules
     conflicting_meetings: has the string names of meetings that couldn't be scheduled at all because they conflict with other meetings
+    meeting_conflicts: which occurrence of each conflicting meeting clashed with which already scheduled block
+    distinct_schedules: number of distinct schedules found. Candidates with the same layout are only sent once
+    origin: the time the schedules were built from, nothing is placed before it. Needed to rebuild one of them
 
     """
 
     conflicting_meetings: List[str]
     meetings: List[MeetingInResponse]
     schedules: List[Schedule]
+    meeting_conflicts: List[MeetingConflict] = []
+    distinct_schedules: int | None = None
+    origin: datetime | None = None
 
 
 class ScheduleSetInStone(BaseModel):
@@ -0,0 +1,20 @@
+-- Indexes for the time-bounded occurrence lookups in /schedule and /reschedule:
+--     WHERE user_id = $1 AND end_time > $lo AND start_time < $hi
+-- end_time comes before start_time so the scan starts at the window and skips the user's past occurrences,
+-- which is where history keeps growing. start_time is in the key so the other bound is checked in the index,
+-- and both columns are covered, so the lookups are index-only scans.
+-- benchmarks/results/blocked_time_queries.json has the timings of the three lookups of one /schedule with and
+-- without these indexes, as the user's past occurrences grow, and the server and machine they were measured on.
+-- Rerun it with: python benchmarks/bench_blocked_time_queries.py --dsn "$DATABASE_URL" -o <file>.json
+--
+-- CONCURRENTLY keeps the tables writable while the indexes build. It can't run inside a transaction, so
+-- apply this file with autocommit, e.g. psql "$DATABASE_URL" -f src/migrations/001_occurrence_time_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS meeting_occurences_user_end_start_idx
+    ON meeting_occurences (user_id, end_time, start_time);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS assignment_occurences_user_end_start_idx
+    ON assignment_occurences (user_id, end_time, start_time);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chore_occurences_user_end_start_idx
+    ON chore_occurences (user_id, end_time, start_time);
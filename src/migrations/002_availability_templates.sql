@@ -0,0 +1,10 @@
+-- Weekly availability templates (see AvailabilityTemplate in data_models.py), set through /setAvailability.
+-- One row per user, users without one are scheduled 7AM-11PM. template is the AvailabilityTemplate as JSON:
+--     {"available": [{"weekday": 0, "start": "09:00:00", "end": "17:00:00"}, ...], "blackouts": [...]}
+-- Apply with psql "$DATABASE_URL" -f src/migrations/002_availability_templates.sql
+
+CREATE TABLE IF NOT EXISTS availability_templates (
+    user_id INTEGER PRIMARY KEY REFERENCES users (user_id) ON DELETE CASCADE,
+    template JSONB NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import math
+import time
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from cachetools import TTLCache
+from pydantic import TypeAdapter
+
+from data_models import Schedule, ScheduleRequest
+from util import enforce_timestamp_utc
+
+_schedules_adapter = TypeAdapter(List[Schedule])
+
+
+def busy_version(intervals: List[Tuple[datetime, datetime]]) -> str:
+    """
+    Digest of a user's blocked time. The same blocks in any order, repeated or in other timezones
+    give the same digest, so it changes exactly when the time the scheduler has to avoid changes.
+    """
+    canonical = sorted(
+        {
+            (enforce_timestamp_utc(s).isoformat(), enforce_timestamp_utc(e).isoformat())
+            for s, e in intervals
+        }
+    )
+    return hashlib.sha256(json.dumps(canonical).encode()).hexdigest()
+
+
+def schedule_cache_key(
+    user_id: int,
+    sched: ScheduleRequest,
+    busy: str,
+    now: datetime,
+    bucket_seconds: int,
+    availability: str | None = None,
+) -> str:
+    """
+    Content address of a /schedule computation.
+    The requested meetings only matter as blocked time, so they are expected to be part of busy
+    rather than of the key. Every other request field (tasks, tz_offset_minutes, ...) is hashed as is.
+    availability: version of the user's weekly availability template, None for the default hours
+    """
+    payload = {
+        "user_id": user_id,
+        "request": sched.model_dump(mode="json", exclude={"meetings"}),
+        "busy": busy,
+        "now_bucket": int(now.timestamp()) // bucket_seconds,
+    }
+    if availability is not None:
+        payload["availability"] = availability
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process backend: at most maxsize entries, least recently used evicted first, entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300, timer=time.monotonic):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+
+    async def get(self, key: str) -> List[Schedule] | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, schedules: List[Schedule]):
+        self._cache[key] = schedules
+
+    async def clear(self):
+        self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class RedisCacheBackend:
+    """
+    Backend shared by every worker process, stores schedules as JSON under prefix + key with a ttl.
+    Eviction beyond the ttl is left to redis' maxmemory policy (allkeys-lru).
+    """
+
+    def __init__(self, url: str, ttl: int = 300, prefix: str = "schedule:"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> List[Schedule] | None:
+        raw = await self._redis.get(self.prefix + key)
+        if raw is None:
+            return None
+        return _schedules_adapter.validate_json(raw)
+
+    async def set(self, key: str, schedules: List[Schedule]):
+        await self._redis.set(
+            self.prefix + key, _schedules_adapter.dump_json(schedules), ex=self.ttl
+        )
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(match=self.prefix + "*"):
+            await self._redis.delete(key)
+
+
+class ScheduleCache:
+    """
+    Cache of computed candidate schedules, keyed by schedule_cache_key.
+    backend: anything with async get/set/clear, MemoryCacheBackend or RedisCacheBackend
+    bucket_seconds: width of the time buckets of now, requests in the same bucket may share results
+    A failing backend is treated as a miss, the cache never fails a request.
+    """
+
+    def __init__(self, backend, bucket_seconds: int = 300):
+        self.backend = backend
+        self.bucket_seconds = bucket_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def origin(self, now: datetime) -> datetime:
+        """
+        First bucket boundary at or after now, the time /schedule builds schedules from. Every request
+        served from the same entry was scheduled from it, so it goes out with the schedules
+        """
+        bucket = math.ceil(enforce_timestamp_utc(now).timestamp() / self.bucket_seconds)
+        return datetime.fromtimestamp(bucket * self.bucket_seconds, timezone.utc)
+
+    def key(
+        self,
+        user_id: int,
+        sched: ScheduleRequest,
+        busy: str,
+        now: datetime,
+        availability: str | None = None,
+    ) -> str:
+        return schedule_cache_key(
+            user_id, sched, busy, now, self.bucket_seconds, availability
+        )
+
+    async def get(self, key: str) -> List[Schedule] | None:
+        try:
+            schedules = await self.backend.get(key)
+        except Exception as e:
+            print(f"Schedule cache read failed: {e}")
+            schedules = None
+        if schedules is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return schedules
+
+    async def set(self, key: str, schedules: List[Schedule]):
+        try:
+            await self.backend.set(key, schedules)
+        except Exception as e:
+            print(f"Schedule cache write failed: {e}")
+
+    async def clear(self):
+        await self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
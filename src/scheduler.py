@@ -1,13 +1,286 @@
 from datetime import datetime, timedelta, timezone
-from typing import List, Tuple, Literal, Dict, Union
-from pydantic import BaseModel, Field
+from typing import List, Tuple, Literal, Dict, Union, Iterator
+from pydantic import BaseModel, Field, TypeAdapter
 from data_models import *
 from util import *
 import random
+import hashlib
+import heapq
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 
 CHUNK_MINUTES = 1
+# Free slots are expanded at least a week at a time (see Timeline.available_in)
+PAGE_SLOTS = 7 * 1440 // CHUNK_MINUTES
+# Slots may only start between 7AM (inclusive) and 11PM (exclusive) local time
+ALLOWED_START_HOUR = 7
+ALLOWED_END_HOUR = 23
+# What users without an availability template get, the same hours every day
+DEFAULT_AVAILABILITY = AvailabilityTemplate(
+    available=[
+        WeeklyTimeBlock(weekday=w, start=dt_time(ALLOWED_START_HOUR), end=dt_time(ALLOWED_END_HOUR))
+        for w in range(7)
+    ]
+)
+
+
+def merge_intervals(intervals: List[Tuple]) -> List[Tuple]:
+    """
+    Sort intervals by start and merge the ones that overlap or touch.
+    Works for anything orderable (datetimes, slot indices). Empty intervals are dropped.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(intervals: List[Tuple], busy: List[Tuple]) -> List[Tuple]:
+    """Remove the busy intervals from intervals. Both lists must be sorted and merged"""
+    free = []
+    j = 0
+    for start, end in intervals:
+        # Busy intervals ending before this one can never matter again
+        while j < len(busy) and busy[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(busy) and busy[k][0] < end:
+            if busy[k][0] > start:
+                free.append((start, busy[k][0]))
+            start = max(start, busy[k][1])
+            k += 1
+        if start < end:
+            free.append((start, end))
+    return free
+
+
+class IntervalIndex:
+    """
+    Index over a set of busy intervals (e.g. already scheduled occurrences) answering
+    "which of these clash with those" with a sweep line in O((n + m) log(n + m) + clashes)
+    instead of comparing every pair. Intervals are open, so touching intervals don't clash.
+    """
+
+    def __init__(self, intervals: List[Tuple[datetime, datetime]]):
+        self.intervals = [
+            (enforce_timestamp_utc(start), enforce_timestamp_utc(end))
+            for start, end in intervals
+        ]
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def merged(self) -> List[Tuple[datetime, datetime]]:
+        """The busy time as sorted, merged intervals"""
+        return merge_intervals(self.intervals)
+
+    def overlaps(self, queries: List[Tuple[datetime, datetime]]) -> List[Tuple[int, int]]:
+        """
+        Returns (query index, interval index) for every query that overlaps an indexed interval,
+        in the order the sweep finds them. Intervals that end before they start are ignored.
+        """
+        # Ends sort before zero-length points, which sort before starts, so at equal times
+        # only intervals that started strictly earlier and end strictly later are active
+        END, POINT, START = 0, 1, 2
+        events = []
+        for side, intervals in (
+            (0, [(enforce_timestamp_utc(s), enforce_timestamp_utc(e)) for s, e in queries]),
+            (1, self.intervals),
+        ):
+            for k, (start, end) in enumerate(intervals):
+                if start < end:
+                    events.append((start, START, side, k))
+                    events.append((end, END, side, k))
+                elif start == end:
+                    events.append((start, POINT, side, k))
+        events.sort()
+        active = ({}, {})
+        clashes = []
+        for _, kind, side, k in events:
+            if kind == END:
+                del active[side][k]
+                continue
+            for other in active[1 - side]:
+                clashes.append((k, other) if side == 0 else (other, k))
+            if kind == START:
+                active[side][k] = None
+        return clashes
+
+
+def _ceil_div(a: timedelta, b: timedelta) -> int:
+    return -((-a) // b)
+
+
+def _ceil_to_minute(t: datetime) -> datetime:
+    floor = t.replace(second=0, microsecond=0)
+    return floor if floor == t else floor + timedelta(minutes=1)
+
+
+def _busy_slot_ranges(
+    meetings: List[Tuple[datetime, datetime]],
+    from_time: datetime,
+    step: timedelta,
+    num_slots: int,
+) -> List[Tuple[int, int]]:
+    """
+    Map meetings to merged [lo, hi) ranges of slot indices they block.
+    Slot k is [from_time + k*step, from_time + (k+1)*step] and is blocked when it overlaps the meeting at all.
+    """
+    ranges = []
+    for m_start, m_end in meetings:
+        lo = max((m_start - from_time) // step, 0)
+        hi = min(_ceil_div(m_end - from_time, step), num_slots)
+        ranges.append((lo, hi))
+    return merge_intervals(ranges)
+
+
+def _allowed_slot_ranges(
+    from_time: datetime,
+    step: timedelta,
+    num_slots: int,
+    tz_offset_minutes: int = 0,
+    tz_name: str | None = None,
+) -> List[Tuple[int, int]]:
+    """
+    [lo, hi) ranges of slot indices whose start falls between 7AM and 11PM local time, in the IANA zone
+    tz_name if given (following DST) or else at the fixed offset. Each day's band is looked up once as
+    UTC instants (see local_day_bounds), no slot is converted to local time
+    """
+    tz = get_timezone(tz_name, tz_offset_minutes)
+    origin = enforce_timestamp_utc(from_time)
+    day = origin.astimezone(tz).date()
+    ranges = []
+    while True:
+        band_start, band_end = local_day_bounds(tz, day, ALLOWED_START_HOUR, ALLOWED_END_HOUR)
+        lo = max(_ceil_div(band_start - origin, step), 0)
+        hi = min(_ceil_div(band_end - origin, step), num_slots)
+        if lo >= num_slots:
+            break
+        if lo < hi:
+            ranges.append((lo, hi))
+        day += timedelta(days=1)
+    return ranges
+
+
+class WeeklyAvailability:
+    """
+    An AvailabilityTemplate compiled once, for a user's templates to replace the 7AM-11PM band.
+    The blocks are painted onto a minute-of-week mask, available ones first and blackouts on top, and only the
+    runs of the mask are kept. Tiling it over a horizon then costs per day and run, however many rules the
+    template had, and never looks at single minutes.
+    runs: (n, 2) array of [lo, hi) runs in minutes since local midnight, Monday's first, then Tuesday's...
+    first: runs of weekday w (0 is Monday) are runs[first[w]:first[w + 1]]
+    version: digest of the mask, templates allowing the same minutes share it
+    """
+
+    __slots__ = ("runs", "first", "version")
+
+    def __init__(self, template: AvailabilityTemplate):
+        mask = np.zeros((7, 1440), dtype=bool)
+        for blocks, value in ((template.available, True), (template.blackouts, False)):
+            for block in blocks:
+                lo = block.start.hour * 60 + block.start.minute
+                hi = block.end.hour * 60 + block.end.minute or 1440
+                mask[block.weekday, lo:hi] = value
+        # Rising and falling edges of each day alternate, so they pair up into [lo, hi) runs
+        edges = np.diff(mask.astype(np.int8), axis=1, prepend=0, append=0)
+        weekday, minute = np.nonzero(edges)
+        self.runs = minute.reshape(-1, 2).astype(np.int64)
+        self.first = np.searchsorted(weekday[::2], np.arange(8))
+        self.version = hashlib.sha256(np.packbits(mask).tobytes()).hexdigest()
+
+    def slot_ranges(
+        self, from_time: datetime, step: timedelta, num_slots: int, tz: tzinfo
+    ) -> List[Tuple[int, int]]:
+        """
+        Merged [lo, hi) ranges of slot indices whose start falls in an available minute of the local week in tz.
+        Every day's runs are shifted to the day's local midnight at once. Only days across a DST change, which
+        aren't 1440 minutes long, have their runs placed by the wall clock one by one
+        """
+        if num_slots <= 0:
+            return []
+        origin = enforce_timestamp_utc(from_time)
+        first_day = origin.astimezone(tz).date()
+        last_day = (origin + num_slots * step).astimezone(tz).date()
+        days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+        us = timedelta(microseconds=1)
+        minute_us = timedelta(minutes=1) // us
+        day_bounds = [local_day_bounds(tz, day) for day in days]
+        midnight_us = np.array([(start - origin) // us for start, _ in day_bounds], dtype=np.int64)
+        day_us = np.array([(end - start) // us for start, end in day_bounds], dtype=np.int64)
+        weekdays = np.array([day.weekday() for day in days], dtype=np.int64)
+        run_lo, run_hi = self.first[weekdays], self.first[weekdays + 1]
+        run = _expand_runs(run_lo, run_hi)
+        run_day = np.repeat(np.arange(len(days)), run_hi - run_lo)
+        bounds_us = midnight_us[run_day, None] + self.runs[run] * minute_us
+        for d in np.flatnonzero(day_us != 1440 * minute_us):
+            midnight = datetime.combine(days[d], dt_time(0), tzinfo=tz)
+            for r in np.flatnonzero(run_day == d):
+                for side in (0, 1):
+                    wall = midnight + timedelta(minutes=int(self.runs[run[r], side]))
+                    bounds_us[r, side] = (wall.astimezone(timezone.utc) - origin) // us
+        slots = np.clip(-((-bounds_us) // (step // us)), 0, num_slots)
+        return merge_intervals(map(tuple, slots.tolist()))
+
+
+def free_slot_ranges(
+    meetings: List[Tuple[datetime, datetime]],
+    from_time: datetime,
+    to_time: datetime,
+    tz_offset_minutes: int = 0,
+    tz_name: str | None = None,
+    availability: WeeklyAvailability | None = None,
+) -> List[Tuple[int, int]]:
+    """
+    Free time between from_time and to_time as sorted [lo, hi) ranges of slot indices,
+    where slot k starts at from_time + k * CHUNK_MINUTES.
+    Busy intervals are sorted and merged once and then subtracted from the 7AM-11PM bands,
+    so the cost depends on the number of days and meetings, not the number of minutes.
+    tz_name: IANA zone of the user, used instead of tz_offset_minutes if given
+    availability: the user's weekly template, used instead of the 7AM-11PM bands if given
+    """
+    step = timedelta(minutes=CHUNK_MINUTES)
+    if to_time < from_time:
+        return []
+    num_slots = (to_time - from_time) // step
+    if availability is not None:
+        allowed = availability.slot_ranges(
+            from_time, step, num_slots, get_timezone(tz_name, tz_offset_minutes)
+        )
+    else:
+        allowed = _allowed_slot_ranges(from_time, step, num_slots, tz_offset_minutes, tz_name)
+    busy = _busy_slot_ranges(meetings, from_time, step, num_slots)
+    return subtract_intervals(allowed, busy)
+
+
+def generate_free_intervals(
+    meetings: List[Tuple[datetime, datetime]],
+    from_time: datetime,
+    to_time: datetime,
+    tz_offset_minutes: int = 0,
+    tz_name: str | None = None,
+    availability: WeeklyAvailability | None = None,
+) -> List[Tuple[datetime, datetime]]:
+    """Returns the free intervals (merged runs of available slots), skipping 11PM-7AM in the given offset or zone"""
+    step = timedelta(minutes=CHUNK_MINUTES)
+    return [
+        (from_time + lo * step, from_time + hi * step)
+        for lo, hi in free_slot_ranges(
+            meetings, from_time, to_time, tz_offset_minutes, tz_name, availability
+        )
+    ]
 
 
 def generate_available_slots(
@@ -15,31 +288,441 @@ def generate_available_slots(
     from_time: datetime,
     to_time: datetime,
     tz_offset_minutes: int = 0,
+    tz_name: str | None = None,
+    availability: WeeklyAvailability | None = None,
 ) -> List[Tuple[datetime, datetime]]:
-    """Returns a time slot, skipping 11PM-7AM in the given timezone offset (in minutes)"""
+    """Returns a time slot, skipping 11PM-7AM in the given timezone offset (in minutes) or IANA zone"""
     step = timedelta(minutes=CHUNK_MINUTES)
     slots = []
-    t = from_time
-    while t + step <= to_time:
-        slot_start = t
-        slot_end = t + step
-        # Convert slot_start to local time in the user's timezone
-        local_start = slot_start + timedelta(minutes=tz_offset_minutes)
-        hour = local_start.hour
-        # Only allow slots between 7AM and 11PM (inclusive of 7:00, exclusive of 23:00)
-        if not (7 <= hour < 23):
-            t += step
-            continue
-        overlaps = any(
-            not (slot_end <= m_start or slot_start >= m_end)
-            for m_start, m_end in meetings
+    for lo, hi in free_slot_ranges(
+        meetings, from_time, to_time, tz_offset_minutes, tz_name, availability
+    ):
+        slots.extend(
+            (from_time + k * step, from_time + (k + 1) * step) for k in range(lo, hi)
         )
-        if not overlaps:
-            slots.append((slot_start, slot_end))
-        t += step
     return slots
 
 
+class Timeline:
+    """
+    The scheduling horizon on an integer slot axis. Slot k covers
+    [origin + k * CHUNK_MINUTES, origin + (k + 1) * CHUNK_MINUTES], so scheduler state is kept
+    as slot indices and bitmaps, and datetimes are only built when a TimeSlot is returned.
+    Only the runs of free time are computed up front, which costs per day and meeting, not per minute.
+    Free slot indices are paged out of the runs on demand, a doubling page at a time, and kept for the
+    other candidates, so the far end of a long horizon is only expanded if some task gets that far.
+    runs: (m, 2) array of the [lo, hi) runs of free slots
+    free: bitmap of slots inside the 7AM-11PM band (or the user's availability) that no meeting overlaps,
+    built on first use
+    available: sorted indices of all free slots
+    free_before_run: prefix sums of the run lengths, free_before_run[j] free slots lie before run j. Counting
+    the free slots of any range then takes two binary searches (see free_count)
+    units: the free runs split into granularity-minute units, built once per granularity, for coarse placement
+    grid_offset_minutes: UTC offset of the user's clock at the origin, which coarse units are aligned to
+    """
+
+    __slots__ = (
+        "origin",
+        "step",
+        "num_slots",
+        "runs",
+        "free_before_run",
+        "_free",
+        "_paged",
+        "_paged_to",
+        "_units",
+        "_wall_origin_us",
+        "grid_offset_minutes",
+    )
+
+    def __init__(
+        self,
+        meetings: List[Tuple[datetime, datetime]],
+        from_time: datetime,
+        to_time: datetime,
+        tz_offset_minutes: int = 0,
+        tz_name: str | None = None,
+        availability: WeeklyAvailability | None = None,
+    ):
+        self.origin = from_time
+        self.step = timedelta(minutes=CHUNK_MINUTES)
+        self.num_slots = max((to_time - from_time) // self.step, 0)
+        ranges = free_slot_ranges(
+            meetings, from_time, to_time, tz_offset_minutes, tz_name, availability
+        )
+        self.runs = np.array(ranges, dtype=np.int64).reshape(-1, 2)
+        self.free_before_run = np.concatenate(([0], np.cumsum(self.runs[:, 1] - self.runs[:, 0])))
+        self._free = None
+        # Sorted free slot indices of [0, _paged_to)
+        self._paged = np.empty(0, dtype=np.int64)
+        self._paged_to = 0
+        # Unit index of each granularity asked for, see units
+        self._units: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        # Wall clock of the origin in its own timezone, which is what slot hour/minute refer to
+        self._wall_origin_us = (
+            from_time.replace(tzinfo=None) - datetime(1970, 1, 1)
+        ) // timedelta(microseconds=1)
+        # DST moves the clock by whole hours (or half hours), which keeps the grid of every granularity
+        self.grid_offset_minutes = (
+            from_time.astimezone(get_timezone(tz_name, tz_offset_minutes)).utcoffset()
+            - from_time.utcoffset()
+        ) // timedelta(minutes=1)
+
+    @property
+    def free(self) -> np.ndarray:
+        if self._free is None:
+            self._free = np.zeros(self.num_slots, dtype=bool)
+            for lo, hi in self.runs:
+                self._free[lo:hi] = True
+        return self._free
+
+    @property
+    def available(self) -> np.ndarray:
+        return self.available_in(0, self.num_slots)
+
+    def __len__(self) -> int:
+        return self.num_slots
+
+    def slot_range(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """[lo, hi) indices of the slots that lie entirely inside [start, end]"""
+        lo = max(_ceil_div(start - self.origin, self.step), 0)
+        hi = min((end - self.origin) // self.step, self.num_slots)
+        return lo, max(lo, hi)
+
+    def slot_start(self, k: int) -> datetime:
+        return self.origin + int(k) * self.step
+
+    def wall_minutes(self, idx: np.ndarray) -> np.ndarray:
+        """Wall-clock minute since the epoch (in the origin's timezone) at which each slot starts"""
+        step_us = self.step // timedelta(microseconds=1)
+        return (self._wall_origin_us + idx.astype(np.int64) * step_us) // 60_000_000
+
+    def local_minutes(self, idx: np.ndarray) -> np.ndarray:
+        """Minute on the user's clock at which each slot starts, the grid coarse units are aligned to"""
+        return self.wall_minutes(idx) + self.grid_offset_minutes
+
+    def free_runs(self, lo: int, hi: int) -> np.ndarray:
+        """The runs of free slots clipped to [lo, hi), found with binary searches on the run bounds"""
+        a = int(np.searchsorted(self.runs[:, 1], lo, side="right"))
+        b = int(np.searchsorted(self.runs[:, 0], hi, side="left"))
+        return np.clip(self.runs[a:b], lo, hi)
+
+    def free_before(self, k: int) -> int:
+        """Number of free slots before slot k, O(log m) in the number of runs"""
+        j = int(np.searchsorted(self.runs[:, 0], k, side="right"))
+        if j == 0:
+            return 0
+        lo, hi = self.runs[j - 1]
+        return int(self.free_before_run[j - 1]) + int(min(max(k - lo, 0), hi - lo))
+
+    def free_count(self, lo: int, hi: int) -> int:
+        """Number of free slots in [lo, hi)"""
+        return self.free_before(hi) - self.free_before(lo) if hi > lo else 0
+
+    def free_minutes(self, start: datetime, end: datetime) -> int:
+        """Free minutes in [start, end], counting the slots that lie entirely inside it, as placement does"""
+        return self.free_count(*self.slot_range(start, end)) * CHUNK_MINUTES
+
+    def slot_after_free(self, lo: int, count: int, hi: int) -> int:
+        """The smallest e <= hi such that [lo, e) holds count free slots, or hi if [lo, hi) holds fewer"""
+        target = self.free_before(lo) + count
+        j = int(np.searchsorted(self.free_before_run, target, side="left"))
+        if j == 0:
+            return lo
+        if j >= len(self.free_before_run):
+            return hi
+        # The count is reached inside run j - 1
+        return max(min(int(self.runs[j - 1, 1] - (self.free_before_run[j] - target)), hi), lo)
+
+    def units(self, granularity: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The free runs split into units at multiples of granularity minutes on the user's clock (see granular_units),
+        built on first use for each granularity and shared by every task and candidate placed on the timeline.
+        Returns the lo and hi arrays of the units, in time order
+        """
+        if granularity not in self._units:
+            self._units[granularity] = granular_units(
+                self.runs, self.local_minutes(self.runs[:, 0]), granularity
+            )
+        return self._units[granularity]
+
+    def available_in(self, lo: int, hi: int) -> np.ndarray:
+        """Sorted indices of the free slots in [lo, hi), a view into the pages expanded so far"""
+        if hi > self._paged_to:
+            to = min(max(hi, 2 * self._paged_to, PAGE_SLOTS), self.num_slots)
+            runs = self.free_runs(self._paged_to, to)
+            self._paged = np.concatenate((self._paged, _expand_runs(runs[:, 0], runs[:, 1])))
+            self._paged_to = to
+        a, b = np.searchsorted(self._paged, (lo, hi))
+        return self._paged[a:b]
+
+
+def _expand_runs(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Every index of the [lo, hi) ranges, in order: each range's start plus the position within the range"""
+    lengths = hi - lo
+    within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(lo, lengths) + within
+
+
+def _skip_target(
+    wall_minutes: np.ndarray, suffix_max_tod: np.ndarray, q: int
+) -> int | None:
+    """
+    Index of the first candidate after q whose hour and minute are at least 2 hours past those of q.
+    Only hour and minute are compared, so the target can wrap to the next day. Candidates are sorted,
+    so each day is resolved with one searchsorted, and suffix_max_tod rules out hopeless searches up front.
+    """
+    n = len(wall_minutes)
+    skip_tod = (int(wall_minutes[q]) % 1440 + 120) % 1440
+    if q + 1 >= n or suffix_max_tod[q + 1] < skip_tod:
+        return None
+    lo = q + 1
+    day = int(wall_minutes[q]) // 1440
+    while True:
+        j = max(int(np.searchsorted(wall_minutes, day * 1440 + skip_tod)), lo)
+        if int(wall_minutes[j]) // 1440 == day:
+            return j
+        # Nothing late enough on this day, j is the first candidate of a later day
+        day = int(wall_minutes[j]) // 1440
+        lo = j
+
+
+def place_effort(
+    effort_minutes: int,
+    wall_minutes: np.ndarray,
+    skip_prob: float = 0.0,
+    positions: np.ndarray | None = None,
+    rng: random.Random = random,
+    partial: bool = False,
+    weights: np.ndarray | None = None,
+) -> np.ndarray | None:
+    """
+    Core of find_time_blocks on integers. Candidates are free, unused slots in time order,
+    described by the wall-clock minute (minutes since the epoch, in the slots' timezone) they start at.
+    positions: index of each candidate in the caller's slot list (used for the 30 minute gap between skips),
+    defaults to the candidate index.
+    rng: source of the skip decisions, the global random module unless a per-schedule stream is given.
+    Runs of candidates between skip decision points are placed in one step, and the decision points
+    and skip targets are found with binary searches instead of walking minute by minute. Decision points and
+    offsets are searched as plain lists, a loop iteration is too little work to pay numpy's per-call overhead.
+    partial: the candidates are only a prefix of the real candidate list. Returns None as soon as the
+    result could depend on candidates past the end of the prefix, so the caller can retry with a longer one.
+    weights: number of chunks each candidate holds, one by default. Positions then default to the chunk
+    offset of each candidate, and the last chosen candidate may hold more chunks than still needed.
+    Returns the indices of the chosen candidates.
+    """
+    n = len(wall_minutes)
+    needed = max(-(-effort_minutes // CHUNK_MINUTES), 0)
+    # offsets[k]: chunks held by the candidates before k
+    if weights is None:
+        offsets = np.arange(n + 1)
+    else:
+        offsets = np.concatenate(([0], np.cumsum(weights)))
+    if skip_prob <= 0.0 or needed == 0:
+        # The effort is filled by a prefix of the candidates
+        if partial and offsets[-1] < needed:
+            return None
+        return np.arange(min(int(np.searchsorted(offsets, needed)), n))
+
+    tod = wall_minutes % 1440
+    decision_points = np.flatnonzero(tod % 30 == 0).tolist()
+    suffix_max_tod = np.maximum.accumulate(tod[::-1])[::-1]
+    # Unweighted candidates hold one chunk each, a range then stands in for the offsets at no cost
+    chunks_before = range(n + 1) if weights is None else offsets.tolist()
+    skip_positions = chunks_before[:-1] if positions is None else np.asarray(positions).tolist()
+    min_gap_slots = 30 // CHUNK_MINUTES  # 30 minutes worth of slots
+    last_skip_pos = -9999  # position of last skip
+
+    runs = []
+    count = 0
+    i = 0
+    while i < n and count < needed:
+        # Next candidate where a skip may be considered: a 30-minute multiple far enough from the last skip
+        eligible_from = max(i, bisect_left(skip_positions, last_skip_pos + min_gap_slots))
+        d = bisect_left(decision_points, eligible_from)
+        q = decision_points[d] if d < len(decision_points) else n
+        # Take candidates up to the decision point, or until the effort is filled
+        j = min(q, bisect_left(chunks_before, chunks_before[i] + needed - count))
+        if j > i:
+            runs.append((i, j))
+            count += chunks_before[j] - chunks_before[i]
+            i = j
+        if count >= needed or i >= n:
+            break
+        if rng.random() < skip_prob:
+            next_idx = _skip_target(wall_minutes, suffix_max_tod, q)
+            if next_idx is not None:
+                last_skip_pos = skip_positions[next_idx]
+                i = next_idx
+                continue
+            if partial:
+                # The skip target may lie past the end of the prefix
+                return None
+            # If skip would go past end, backtrack: ignore skip, just continue scheduling as normal
+        runs.append((q, q + 1))
+        count += chunks_before[q + 1] - chunks_before[q]
+        i = q + 1
+
+    if count < needed:
+        if partial:
+            return None
+        return place_effort(
+            effort_minutes, wall_minutes, 0.0, positions, rng, weights=weights
+        )
+    return np.concatenate([np.arange(a, b) for a, b in runs])
+
+
+def place_in_window(
+    effort_minutes: int,
+    timeline: "Timeline",
+    lo: int,
+    hi: int,
+    used: np.ndarray,
+    skip_prob: float = 0.0,
+    rng: random.Random = random,
+) -> np.ndarray:
+    """
+    Place effort on the free, unused slots of the timeline in [lo, hi).
+    used: bitmap of slots the caller already gave its other tasks. Meetings are left out of the timeline's
+    free slots, so they don't need to be in it
+    The window is paged in from the start, a growing number of free slots at a time, and used slots are
+    filtered out of each page: placement runs on the unused slots seen so far and only looks further
+    (replaying the same random draws) when it runs out of candidates. A task that fits early never touches
+    the rest of its window, however far away its deadline is.
+    The timeline's free counts size each page in one lookup, skip windows with no free time at all and page
+    in a window with less free time than the effort whole, since it can't fit early.
+    Returns the chosen slot indices.
+    """
+    needed = max(-(-effort_minutes // CHUNK_MINUTES), 0)
+    capacity = timeline.free_count(lo, hi)
+    if capacity == 0:
+        # Nothing free in the whole window, whatever the other tasks took
+        return np.zeros(0, dtype=np.int64)
+    state = rng.getstate()
+    blocks = []
+    cursor = lo
+    # A window with less free time than the effort is always placed to the end, so it's paged in at once
+    block = max(2 * needed, 1440) if capacity >= needed else capacity
+    while True:
+        # Take block free slots from the cursor on, wherever nights and meetings push the end of the page
+        page_end = timeline.slot_after_free(cursor, block, hi)
+        page = timeline.available_in(cursor, page_end)
+        blocks.append(page[~used[page]])
+        cursor = page_end
+        block *= 2
+        candidates = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+        chosen = place_effort(
+            effort_minutes,
+            timeline.wall_minutes(candidates),
+            skip_prob=skip_prob,
+            rng=rng,
+            partial=cursor < hi,
+        )
+        if chosen is not None:
+            return candidates[chosen]
+        rng.setstate(state)
+
+
+def granular_units(
+    runs: np.ndarray, wall_starts: np.ndarray, granularity: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split (m, 2) [lo, hi) runs of slots into units at wall-clock multiples of granularity minutes.
+    wall_starts: wall-clock minute of the first slot of each run.
+    Units are whole granularity blocks, so every unit starts on the clock. A run that starts mid-block (after a
+    meeting, at the start of the day) only starts its units at the next block boundary, a run that ends
+    mid-block keeps a shorter last unit.
+    Returns the lo and hi arrays of the units, in time order.
+    """
+    per_block = max(granularity // CHUNK_MINUTES, 1)
+    runs = np.asarray(runs, dtype=np.int64).reshape(-1, 2)
+    lo, hi = runs[:, 0], runs[:, 1]
+    # First block boundary strictly inside each run
+    first = lo + (-np.asarray(wall_starts, dtype=np.int64) % granularity) // CHUNK_MINUTES
+    first = np.where(first <= lo, lo + per_block, first)
+    num_cuts = np.maximum(-(-(hi - first) // per_block), 0)
+    counts = num_cuts + 1
+    run_of_unit = np.repeat(np.arange(len(runs)), counts)
+    # k: position of each unit within its run
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    block_start = first[run_of_unit] + (k - 1) * per_block
+    unit_lo = np.where(k == 0, lo[run_of_unit], block_start)
+    unit_hi = np.where(k == counts[run_of_unit] - 1, hi[run_of_unit], block_start + per_block)
+    # The minutes before the first boundary of a run that starts mid-block
+    on_clock = (k > 0) | (np.asarray(wall_starts, dtype=np.int64)[run_of_unit] % granularity == 0)
+    return unit_lo[on_clock], unit_hi[on_clock]
+
+
+def _cut_taken(
+    unit_lo: np.ndarray, unit_hi: np.ndarray, taken: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The [lo, hi) units (at least one), in time order, with the (m, 2) sorted, merged taken ranges cut out.
+    A unit partly taken leaves its untaken pieces, the result is what granular_units gives for the runs left free.
+    """
+    i = int(np.searchsorted(taken[:, 1], unit_lo[0], side="right"))
+    j = int(np.searchsorted(taken[:, 0], unit_hi[-1], side="left"))
+    if i >= j:
+        return unit_lo, unit_hi
+    # Only the first and last taken range can stick out of the units
+    taken = taken[i:j].copy()
+    taken[0, 0] = max(taken[0, 0], unit_lo[0])
+    taken[-1, 1] = min(taken[-1, 1], unit_hi[-1])
+    # Split taken ranges where they span unit boundaries, each piece then lies inside a unit, so cutting
+    # the pieces out leaves the gaps between consecutive bounds
+    k = np.minimum(np.searchsorted(taken[:, 1], unit_lo, side="right"), len(taken) - 1)
+    cuts = unit_lo[(taken[k, 0] < unit_lo) & (unit_lo < taken[k, 1])]
+    bounds = np.sort(np.concatenate((unit_lo, unit_hi, taken.ravel(), cuts, cuts))).reshape(-1, 2)
+    bounds = bounds[bounds[:, 1] > bounds[:, 0]]
+    return bounds[:, 0], bounds[:, 1]
+
+
+def place_in_units(
+    effort_minutes: int,
+    timeline: "Timeline",
+    lo: int,
+    hi: int,
+    taken: List[Tuple[int, int]],
+    granularity: int,
+    skip_prob: float = 0.0,
+    rng: random.Random = random,
+) -> np.ndarray:
+    """
+    Coarse counterpart of place_in_window: place effort on whole granularity-minute blocks of free time.
+    taken: sorted, merged [lo, hi) slot ranges already given to other tasks, all inside the timeline's free runs.
+    The window's units are sliced out of the timeline's unit index (Timeline.units), which is built once per
+    request, so a call costs two binary searches and work on the units of the window, never single slots.
+    Pieces of units that start off the clock, where the window starts or another task's time ends mid-block,
+    are left out, so every session starts on the user's clock.
+    Returns the chosen slot indices, trimmed to the effort at the end of the last block.
+    """
+    unit_lo, unit_hi = timeline.units(granularity)
+    # Units overlapping the window. They are sorted and disjoint, so only the first and last need clipping
+    a = int(np.searchsorted(unit_hi, lo, side="right"))
+    b = int(np.searchsorted(unit_lo, hi, side="left"))
+    if a >= b:
+        return np.zeros(0, dtype=np.int64)
+    unit_lo, unit_hi = unit_lo[a:b].copy(), unit_hi[a:b].copy()
+    unit_lo[0] = max(unit_lo[0], lo)
+    unit_hi[-1] = min(unit_hi[-1], hi)
+    unit_lo, unit_hi = _cut_taken(
+        unit_lo, unit_hi, np.asarray(taken, dtype=np.int64).reshape(-1, 2)
+    )
+    on_clock = timeline.local_minutes(unit_lo) % granularity == 0
+    unit_lo, unit_hi = unit_lo[on_clock], unit_hi[on_clock]
+    if len(unit_lo) == 0:
+        return np.zeros(0, dtype=np.int64)
+    chosen = place_effort(
+        effort_minutes,
+        timeline.wall_minutes(unit_lo),
+        skip_prob=skip_prob,
+        rng=rng,
+        weights=unit_hi - unit_lo,
+    )
+    idx = _expand_runs(unit_lo[chosen], unit_hi[chosen])
+    return idx[: max(-(-effort_minutes // CHUNK_MINUTES), 0)]
+
+
 def find_time_blocks(
     effort_minutes: int,
     available_slots: List[Tuple[datetime, datetime]],
@@ -52,65 +735,29 @@ def find_time_blocks(
     that the algorithm skips forward and tries to schedule the next block 2 hours after.
     After a skip, do not apply the skip rule again until at least 30 minutes of scheduling has occurred.
     If skipping lands past the end, backtrack and try to fill as much as possible.
-    Returns individual 1-minute slots without merging.
+    Returns individual 1-minute slots without merging. available_slots must be in time order.
     """
-    assigned_mins = 0
-    scheduled = []
-    i = 0
-    n = len(available_slots)
-    last_skip_idx = -9999  # index of last skip
-    min_gap_slots = 30 // CHUNK_MINUTES  # 30 minutes worth of slots
+    positions = [i for i, slot in enumerate(available_slots) if slot not in used_slots]
+    epoch = datetime(1970, 1, 1)
+    wall_minutes = np.array(
+        [
+            (available_slots[i][0].replace(tzinfo=None) - epoch) // timedelta(minutes=1)
+            for i in positions
+        ],
+        dtype=np.int64,
+    )
+    chosen = place_effort(effort_minutes, wall_minutes, skip_prob, positions)
+    return [available_slots[positions[c]] for c in chosen]
 
-    while i < n and assigned_mins < effort_minutes:
-        slot = available_slots[i]
-        if slot in used_slots:
-            i += 1
-            continue
 
-        # Ignore seconds and microseconds for skip logic
-        slot_start = slot[0]
-        minute = slot_start.minute
-        hour = slot_start.hour
-        # Only use hour and minute for skip logic
-        can_skip = (
-            skip_prob > 0.0
-            and (minute % 30 == 0)
-            and (i - last_skip_idx >= min_gap_slots)
-        )
-        did_skip = False
-        if can_skip and random.random() < skip_prob:
-            skip_time = slot_start.replace(second=0, microsecond=0) + timedelta(hours=2)
-            next_idx = None
-            for j in range(i + 1, n):
-                # Compare only hour and minute for skip target
-                candidate = available_slots[j][0]
-                if (
-                    candidate.hour > skip_time.hour
-                    or (
-                        candidate.hour == skip_time.hour
-                        and candidate.minute >= skip_time.minute
-                    )
-                ) and available_slots[j] not in used_slots:
-                    next_idx = j
-                    break
-            if next_idx is not None:
-                last_skip_idx = next_idx
-                i = next_idx
-                did_skip = True
-                continue
-            # If skip would go past end, backtrack: ignore skip, just continue scheduling as normal
-        # Schedule this slot - keep as individual slot instead of merging
-        scheduled.append(slot)
-        assigned_mins += CHUNK_MINUTES
-        i += 1
-        if did_skip:
-            last_skip_idx = i - 1
-
-    if assigned_mins < effort_minutes and skip_prob > 0.0:
-        return find_time_blocks(
-            effort_minutes, available_slots, used_slots, skip_prob=0.0
-        )
-    return scheduled
+def slot_runs(idx: np.ndarray) -> List[Tuple[int, int]]:
+    """Group sorted slot indices into [lo, hi) runs of consecutive slots"""
+    if len(idx) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(idx) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(idx)]))
+    return list(zip(idx[starts].tolist(), (idx[ends - 1] + 1).tolist()))
 
 
 def merge_contiguous_slots(slots: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
@@ -121,8 +768,10 @@ def merge_contiguous_slots(slots: List[Tuple[datetime, datetime]]) -> List[Tuple
     if not slots:
         return []
     
-    # Sort slots by start time to ensure proper merging
-    sorted_slots = sorted(slots, key=lambda x: x[0])
+    # Only sort when the slots aren't in order already, which the scheduler's always are
+    sorted_slots = slots
+    if any(a[0] > b[0] for a, b in zip(slots, slots[1:])):
+        sorted_slots = sorted(slots, key=lambda x: x[0])
     merged = []
     current_start, current_end = sorted_slots[0]
     
@@ -139,10 +788,14 @@ def merge_contiguous_slots(slots: List[Tuple[datetime, datetime]]) -> List[Tuple
 
 
 def loosely_sort_assignments(
-    assignments: List[AssignmentInRequest], bucket_minutes: int = 240
+    assignments: List[AssignmentInRequest],
+    bucket_minutes: int = 240,
+    rng: random.Random = random,
+    now: datetime | None = None,
 ) -> List[AssignmentInRequest]:
     # Ensure now is timezone-aware UTC
-    now = datetime.now(timezone.utc)
+    if now is None:
+        now = datetime.now(timezone.utc)
     buckets = defaultdict(list)
     for a in assignments:
         due = enforce_timestamp_utc(a.due)
@@ -152,7 +805,7 @@ def loosely_sort_assignments(
     result = []
     for key in sorted_keys:
         group = buckets[key]
-        random.shuffle(group)  # Only shuffle within each bucket
+        rng.shuffle(group)  # Only shuffle within each bucket
         result.extend(group)
     return result
 
@@ -188,34 +841,655 @@ def calc_xp_for_slot(
     return int(round(xp))
 
 
-def schedule_tasks(
-    meetings: List[MeetingInRequest],
+def calc_xp_for_slots(
+    slot_starts: np.ndarray, slot_ends: np.ndarray, due_times: np.ndarray, now: int
+) -> np.ndarray:
+    """
+    calc_xp_for_slot for many slots in one vectorized pass. Times are integer microseconds from any common
+    origin, with a due time per slot. Every step is the same float operation in the same order as in
+    calc_xp_for_slot, rounding included (half to even), so the XP is identical
+    """
+    us_per_second = timedelta(seconds=1) // timedelta(microseconds=1)
+    duration_min = ((slot_ends - slot_starts) / us_per_second) // 60
+    total_window = (due_times - now) / us_per_second
+    slot_time_left = (due_times - slot_ends) / us_per_second
+    with np.errstate(divide="ignore", invalid="ignore"):
+        time_factor = np.maximum(0, slot_time_left / total_window)
+        xp = 100 / 60 * duration_min * time_factor
+    scored = (due_times > now) & (slot_time_left >= 0)
+    return np.where(scored, np.rint(xp), 0).astype(np.int64)
+
+
+def candidate_seed(seed: int, index: int) -> int:
+    """
+    Seed of the index-th candidate schedule of a request seeded with seed.
+    Derived with a hash, so it's the same in every process and Python version, and kept to
+    52 bits so it survives a round trip through a JSON number.
+    """
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") >> 12
+
+
+# Validator for whole schedules, built once. Schedule.model_construct would skip validation, but it is a python
+# loop over the fields of every model it builds, and for the thousands of TimeSlots of a request that costs
+# about 3x the single validation pass in pydantic-core (pydantic 2.11)
+_schedule_adapter = TypeAdapter(Schedule)
+
+
+@dataclass(slots=True, order=True)
+class TaskPlacement:
+    """
+    Where one task went in a candidate schedule, in scheduler-internal terms.
+    index: position of the task in its input list (assignments or chores)
+    runs: [lo, hi) slot index ranges given to the task, in time order
+    """
+
+    task_type: Literal["assignment", "chore"]
+    index: int
+    runs: List[Tuple[int, int]]
+
+
+def place_candidate(
+    skip_prob: float,
+    seed: int,
+    timeline: Timeline,
     assignments: List[AssignmentInRequest],
     chores: List[ChoreInRequest],
-    num_schedules: int = 11,
-    end_time: datetime = None,
-    now: datetime = datetime.now(timezone.utc),
-    skip_p: float = 0.0,
-    tz_offset_minutes: int = 0,
-) -> List["Schedule"]:
-    # Ensure now is timezone-aware UTC
+    now: datetime,
+    granularity: int = 1,
+) -> List[TaskPlacement]:
     """
-    General flow:
-        1. First get all meeting start/end times
-        2. Loop over num schedules
-            a. Create list of used slots and fill with meetings
-            b. Init lists for schedule info
-            c. Loosely sort asssignments, randomize chores
-            d. Then create task queue with assignments/chores
-            e. Iterate through tasks in queue
-                i. Get time ranges the task can be worked on
-                ii. Generate all available time windows not used by meetings and previous tasks in queue
-                iii. Then use find_time_blocks logic to find a block
-                iv. Add this to used slots, and figure out if enough was scheduled
+    Place every task of one candidate schedule on a shared timeline, without building any models.
+    All randomness (assignment shuffling, chore order, skips) comes from a random.Random seeded with seed,
+    so a candidate only depends on its arguments and can be placed in any process.
+    granularity: minutes per placement block. Above CHUNK_MINUTES tasks are placed with place_in_units
+    Returns a TaskPlacement per task, in the order tasks were placed
+    """
+    rng = random.Random(seed)
+    # The timeline is the meeting baseline, built once per request and shared read-only by every candidate:
+    # meetings and blocked time are left out of its free slots. The slots this candidate gives its tasks
+    # are a zeroed bitmap of its own, or merged ranges for coarse placement
+    used = np.zeros(len(timeline), dtype=bool) if granularity <= CHUNK_MINUTES else None
+    taken: List[Tuple[int, int]] = []
+
+    prioritized_assignments = loosely_sort_assignments(assignments, rng=rng, now=now)
+    randomized_chores = rng.sample(chores, k=len(chores))
+    assignment_index = {id(a): i for i, a in enumerate(assignments)}
+    chore_index = {id(c): i for i, c in enumerate(chores)}
+
+    task_queue: List[
+        Tuple[
+            Literal["assignment", "chore"],
+            Union[AssignmentInRequest, ChoreInRequest],
+        ]
+    ] = [("assignment", a) for a in prioritized_assignments] + [
+        ("chore", c) for c in randomized_chores
+    ]
+
+    placement = []
+    for task_type, task in task_queue:
+        if task_type == "assignment":
+            time_range = (now, enforce_timestamp_utc(task.due))
+            index = assignment_index[id(task)]
+        else:
+            w0, w1 = enforce_timestamp_utc(task.window[0]), enforce_timestamp_utc(
+                task.window[1]
+            )
+            time_range = (w0, w1)
+            index = chore_index[id(task)]
+        lo, hi = timeline.slot_range(*time_range)
+        if granularity > CHUNK_MINUTES:
+            assigned_idx = place_in_units(
+                task.effort, timeline, lo, hi, taken, granularity, skip_prob, rng
+            )
+        else:
+            assigned_idx = place_in_window(
+                task.effort,
+                timeline,
+                lo,
+                hi,
+                used,
+                skip_prob=skip_prob,
+                rng=rng,
+            )
+        runs = slot_runs(assigned_idx)
+        if granularity > CHUNK_MINUTES:
+            taken = merge_intervals(taken + runs)
+        else:
+            used[assigned_idx] = True
+        placement.append(TaskPlacement(task_type, index, runs))
+    return placement
+
 
+def place_candidate_edf(
+    skip_prob: float,
+    seed: int,
+    timeline: Timeline,
+    assignments: List[AssignmentInRequest],
+    chores: List[ChoreInRequest],
+    now: datetime,
+    granularity: int = 1,
+) -> List[TaskPlacement]:
     """
-    if end_time is None:
-        end_time = get_latest_time(meetings, assignments, chores)
+    Earliest deadline first: pack all tasks at once over the free runs of the timeline, always working on
+    the released task whose window ends first. A task is released at the start of its window (now for
+    assignments) and dropped when its window ends, with whatever it got by then.
+    A newly released task with an earlier deadline preempts the running one, at the next unit boundary
+    when granularity is above CHUNK_MINUTES, so coarse blocks stay whole and clock aligned. There the rest of a
+    unit a task finishes in stays free, and a task released mid-unit starts at the next one.
+    Tasks are kept in a heap keyed by deadline and time only advances from one event (release, deadline,
+    completion, end of a free run) to the next, O((n + m) log n) for n tasks and m free runs.
+    Same arguments and result as place_candidate. The only randomness is the order of tasks with the same
+    deadline, drawn from seed, and skip_prob is unused.
+    Returns a TaskPlacement per task, in deadline order
+    """
+    rng = random.Random(seed)
+    tasks = []
+    for i, a in enumerate(assignments):
+        lo, hi = timeline.slot_range(now, enforce_timestamp_utc(a.due))
+        tasks.append(("assignment", i, lo, hi, a.effort))
+    for i, c in enumerate(chores):
+        lo, hi = timeline.slot_range(
+            enforce_timestamp_utc(c.window[0]), enforce_timestamp_utc(c.window[1])
+        )
+        tasks.append(("chore", i, lo, hi, c.effort))
+    ties = rng.sample(range(len(tasks)), k=len(tasks))
+    remaining = [max(-(-effort // CHUNK_MINUTES), 0) for *_, effort in tasks]
+    runs: List[List[Tuple[int, int]]] = [[] for _ in tasks]
+    releases = sorted(range(len(tasks)), key=lambda k: tasks[k][2])
+
+    segments = timeline.free_runs(0, len(timeline))
+    if granularity > CHUNK_MINUTES and len(segments):
+        unit_lo, unit_hi = granular_units(
+            segments, timeline.local_minutes(segments[:, 0]), granularity
+        )
+        segments = np.column_stack((unit_lo, unit_hi))
+
+    heap: List[Tuple[int, int, int]] = []
+    r = 0
+    for seg_lo, seg_hi in segments.tolist():
+        t = seg_lo
+        while t < seg_hi:
+            while r < len(releases) and tasks[releases[r]][2] <= t:
+                k = releases[r]
+                r += 1
+                if remaining[k] > 0:
+                    heapq.heappush(heap, (tasks[k][3], ties[k], k))
+            # Windows that are over
+            while heap and heap[0][0] <= t:
+                heapq.heappop(heap)
+            next_release = tasks[releases[r]][2] if r < len(releases) else seg_hi
+            if not heap:
+                if r == len(releases):
+                    break
+                t = min(next_release, seg_hi) if granularity <= CHUNK_MINUTES else seg_hi
+                continue
+            deadline, _, k = heap[0]
+            end = min(seg_hi, deadline, t + remaining[k])
+            if granularity <= CHUNK_MINUTES:
+                end = min(end, next_release)
+            if runs[k] and runs[k][-1][1] == t:
+                runs[k][-1] = (runs[k][-1][0], end)
+            else:
+                runs[k].append((t, end))
+            remaining[k] -= end - t
+            if remaining[k] == 0:
+                heapq.heappop(heap)
+            t = end if granularity <= CHUNK_MINUTES else seg_hi
+        if not heap and r == len(releases):
+            break
+
+    order = sorted(range(len(tasks)), key=lambda k: (tasks[k][3], ties[k]))
+    return [TaskPlacement(tasks[k][0], tasks[k][1], runs[k]) for k in order]
+
+
+# Ways to place a candidate's tasks, by the strategy name a request can ask for
+PLACEMENT_STRATEGIES = {"greedy": place_candidate, "edf": place_candidate_edf}
+
+
+def coalesce_fragments(
+    placement: List[TaskPlacement],
+    timeline: Timeline,
+    assignments: List[AssignmentInRequest],
+    chores: List[ChoreInRequest],
+    now: datetime,
+    granularity: int = 1,
+    min_session_minutes: int = 0,
+) -> List[TaskPlacement]:
+    """
+    Get rid of work sessions shorter than min_session_minutes, each of which would be its own occurrence row.
+    Shortest first, a task's fragment is vacated and its minutes are added to the task's other runs, nearest
+    first, by growing them into the free unused slots next to them inside the task's window. Minutes that
+    don't fit anywhere are dropped, so the task ends up with less effort rather than a short session.
+    A task with a single run keeps it, and a task given less than min_session_minutes in total only needs
+    its runs to reach that total. With granularity above CHUNK_MINUTES runs only grow to the left up to
+    a clock-aligned start, and another task's run starting off the clock right after a fragment slides left
+    onto the fragment's start. A fragment stays if that run can't slide.
+    Same shared arguments as improve_placement. Returns the placement in the same task order
+    """
+    per_block = max(granularity // CHUNK_MINUTES, 1)
+    min_slots = -(-min_session_minutes // CHUNK_MINUTES)
+    runs = [sorted(p.runs) for p in placement]
+    # Every task's runs as sorted starts, with the end and task of each, so finding what stops a run from
+    # growing takes binary searches here and on the timeline's free runs, never a bitmap of the horizon
+    starts: List[int] = []
+    occupied: Dict[int, Tuple[int, int]] = {}
+    free_lo, free_hi = timeline.runs[:, 0].tolist(), timeline.runs[:, 1].tolist()
+
+    def occupy(t: int, lo: int, hi: int):
+        insort(starts, lo)
+        occupied[lo] = (hi, t)
+
+    def vacate(lo: int):
+        del starts[bisect_left(starts, lo)]
+        del occupied[lo]
+
+    def set_runs(t: int, new_runs: List[Tuple[int, int]]):
+        for lo, _ in runs[t]:
+            vacate(lo)
+        runs[t] = new_runs
+        for lo, hi in new_runs:
+            occupy(t, lo, hi)
+
+    def owner(k: int) -> int | None:
+        """Task whose run starts at slot k. Only asked right after a run, where a task's run can only start"""
+        return occupied[k][1] if k in occupied else None
+
+    def room_right(hi: int, window_hi: int) -> int:
+        """Free, unused slots from hi on, up to window_hi"""
+        j = bisect_right(free_lo, hi) - 1
+        if j < 0 or hi >= free_hi[j]:
+            return 0
+        i = bisect_left(starts, hi)
+        end = min(free_hi[j], starts[i]) if i < len(starts) else free_hi[j]
+        return max(min(end, window_hi) - hi, 0)
+
+    def room_left(lo: int, window_lo: int) -> int:
+        """Free, unused slots right before lo, down to window_lo"""
+        j = bisect_right(free_lo, lo - 1) - 1
+        if j < 0 or lo - 1 >= free_hi[j]:
+            return 0
+        i = bisect_left(starts, lo) - 1
+        start = max(free_lo[j], occupied[starts[i]][0]) if i >= 0 else free_lo[j]
+        return max(lo - max(start, window_lo), 0)
+
+    for t, task_runs in enumerate(runs):
+        for lo, hi in task_runs:
+            occupy(t, lo, hi)
+
+    def unaligned(k: int) -> bool:
+        return per_block > 1 and bool(timeline.local_minutes(np.array([k]))[0] % granularity)
+
+    windows = []
+    for p in placement:
+        if p.task_type == "assignment":
+            window = (now, enforce_timestamp_utc(assignments[p.index].due))
+        else:
+            window = tuple(enforce_timestamp_utc(w) for w in chores[p.index].window)
+        windows.append(timeline.slot_range(*window))
+    # Vacating a fragment can unblock one of another task that was stuck in front of it, so go again
+    # until a pass vacates nothing. Every vacated fragment is one run less, so this ends
+    vacated = True
+    while vacated:
+        vacated = False
+        for t, (window_lo, window_hi) in enumerate(windows):
+            shortest = min(min_slots, sum(hi - lo for lo, hi in runs[t]))
+            stuck = set()
+            while len(runs[t]) > 1:
+                fragments = [r for r in runs[t] if r[1] - r[0] < shortest and r not in stuck]
+                if not fragments:
+                    break
+                a, b = min(fragments, key=lambda r: (r[1] - r[0], r[0]))
+                u = owner(b)
+                slide = u is not None and unaligned(b)
+                if slide:
+                    # Vacating it would leave the next run starting mid-gap off the clock. That run slides
+                    # left to start where the fragment did instead, freeing as many slots at its end
+                    end = occupied[b][0]
+                    cut = end - (b - a)
+                    if windows[u][0] > a or (owner(end) is not None and unaligned(end)):
+                        stuck.add((a, b))
+                        continue
+                set_runs(t, [r for r in runs[t] if r != (a, b)])
+                if slide:
+                    set_runs(u, merge_intervals([(a, cut) if r == (b, end) else r for r in runs[u]]))
+                vacated = True
+                others = sorted(runs[t], key=lambda r: max(r[0] - b, a - r[1]))
+                need = b - a
+                grown = []
+                for lo, hi in others:
+                    # Right: up to the first slot that isn't free and unused
+                    take = min(need, room_right(hi, window_hi))
+                    vacate(lo)
+                    hi += take
+                    need -= take
+                    # Left: the run has to start on the clock
+                    take = min(need, room_left(lo, window_lo))
+                    if take > 0 and unaligned(lo - take):
+                        # Up to the next clock-aligned slot
+                        take -= int(-timeline.local_minutes(np.array([lo - take]))[0] % granularity)
+                        take = max(take, 0)
+                    lo -= take
+                    need -= take
+                    occupy(t, lo, hi)
+                    grown.append((lo, hi))
+                runs[t] = grown
+                set_runs(t, merge_intervals(grown))
+
+    return [TaskPlacement(p.task_type, p.index, task_runs) for p, task_runs in zip(placement, runs)]
+
+
+def place_with_strategy(
+    strategy: str,
+    skip_prob: float,
+    seed: int,
+    shared_inputs: Dict,
+    min_session_minutes: int = 0,
+) -> List[TaskPlacement]:
+    """Place one candidate with PLACEMENT_STRATEGIES[strategy], then coalesce sessions shorter than min_session_minutes"""
+    placement = PLACEMENT_STRATEGIES[strategy](skip_prob, seed, **shared_inputs)
+    if min_session_minutes > CHUNK_MINUTES:
+        placement = coalesce_fragments(
+            placement, **shared_inputs, min_session_minutes=min_session_minutes
+        )
+    return placement
+
+
+def placement_fingerprint(placement: List[TaskPlacement]) -> str:
+    """
+    Hash of which slots each task got. Candidates that place every task on the same slots get the
+    same fingerprint, whatever order their tasks were placed in
+    """
+    key = sorted((p.task_type, p.index, p.runs) for p in placement)
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+def schedule_from_placement(
+    placement: List[TaskPlacement],
+    skip_prob: float,
+    seed: int,
+    timeline: Timeline,
+    assignments: List[AssignmentInRequest],
+    chores: List[ChoreInRequest],
+    now: datetime,
+    fingerprint: str | None = None,
+) -> "Schedule":
+    """
+    Turn a candidate's placement into a Schedule, converting slot indices back to datetimes only here.
+    This is the API edge of the scheduler: the schedule is put together as plain dicts and turned into
+    models in a single pass of the precompiled validator, instead of model by model
+    """
+    assignments_out = []
+    chores_out = []
+
+    conflicting_assignments = []
+    conflicting_chores = []
+    not_enough_time_assignments = []
+    not_enough_time_chores = []
+
+    # XP of every run of every task at once, in microseconds from the timeline's origin
+    us = timedelta(microseconds=1)
+    step_us = timeline.step // us
+    tasks = []
+    run_bounds = []
+    run_dues = []
+    for task_placement in placement:
+        if task_placement.task_type == "assignment":
+            task = assignments[task_placement.index]
+            due_time = enforce_timestamp_utc(task.due)
+        else:
+            task = chores[task_placement.index]
+            due_time = enforce_timestamp_utc(task.window[1])
+        tasks.append(task)
+        run_bounds.extend(task_placement.runs)
+        run_dues.extend([(due_time - timeline.origin) // us] * len(task_placement.runs))
+    bounds_us = np.array(run_bounds, dtype=np.int64).reshape(-1, 2) * step_us
+    run_xps = calc_xp_for_slots(
+        bounds_us[:, 0],
+        bounds_us[:, 1],
+        np.array(run_dues, dtype=np.int64),
+        (now - timeline.origin) // us,
+    ).tolist()
+    total_potential_xp = sum(run_xps)
+    next_run = 0
+
+    for task_placement, task in zip(placement, tasks):
+        task_type, runs = task_placement.task_type, task_placement.runs
+        assigned_minutes = sum(hi - lo for lo, hi in runs) * CHUNK_MINUTES
+
+        status = (
+            "fully_scheduled"
+            if assigned_minutes == task.effort
+            else "partially_scheduled" if assigned_minutes > 0 else "unschedulable"
+        )
+        slot_objs = []
+        # Runs are already merged, contiguous slots for display purposes
+        for run_lo, run_hi in runs:
+            start, end = timeline.slot_start(run_lo), timeline.slot_start(run_hi)
+            slot_objs.append({"start": start, "end": end, "xp_potential": run_xps[next_run]})
+            next_run += 1
+        schedule_info = {
+            "effort_assigned": assigned_minutes,
+            "status": status,
+            "slots": slot_objs,
+        }
+        # Shallow copy of the request fields, they're never mutated
+        result = {**dict(task), "schedule": schedule_info}
+        if task_type == "assignment":
+            assignments_out.append(result)
+            if status == "unschedulable":
+                conflicting_assignments.append(task.name)
+            elif status == "partially_scheduled":
+                not_enough_time_assignments.append(task.name)
+        else:
+            chores_out.append(result)
+            if status == "unschedulable":
+                conflicting_chores.append(task.name)
+            elif status == "partially_scheduled":
+                not_enough_time_chores.append(task.name)
+
+    return _schedule_adapter.validate_python(
+        {
+            "assignments": assignments_out,
+            "chores": chores_out,
+            "conflicting_assignments": conflicting_assignments,
+            "conflicting_chores": conflicting_chores,
+            "not_enough_time_assignments": not_enough_time_assignments,
+            "not_enough_time_chores": not_enough_time_chores,
+            "total_potential_xp": total_potential_xp,
+            "fragment_count": len(run_bounds),
+            "seed": seed,
+            "skip_prob": skip_prob,
+            "fingerprint": fingerprint,
+        }
+    )
+
+
+def build_candidate_schedule(
+    skip_prob: float,
+    seed: int,
+    timeline: Timeline,
+    assignments: List[AssignmentInRequest],
+    chores: List[ChoreInRequest],
+    now: datetime,
+    granularity: int = 1,
+    strategy: str = "greedy",
+    min_session_minutes: int = 0,
+) -> "Schedule":
+    """Build one candidate schedule on a shared timeline, see place_candidate and place_with_strategy"""
+    shared_inputs = dict(
+        timeline=timeline,
+        assignments=assignments,
+        chores=chores,
+        now=now,
+        granularity=granularity,
+    )
+    placement = place_with_strategy(strategy, skip_prob, seed, shared_inputs, min_session_minutes)
+    return schedule_from_placement(
+        placement,
+        skip_prob,
+        seed,
+        timeline,
+        assignments,
+        chores,
+        now,
+        fingerprint=placement_fingerprint(placement),
+    )
+
+
+def improve_placement(
+    placement: List[TaskPlacement],
+    timeline: Timeline,
+    assignments: List[AssignmentInRequest],
+    chores: List[ChoreInRequest],
+    now: datetime,
+    granularity: int = 1,
+    budget_seconds: float = 0.05,
+    rng: random.Random = random,
+    xp_cache: Dict | None = None,
+) -> Tuple[List[TaskPlacement], int]:
+    """
+    Local search for more total potential XP, run until budget_seconds of this thread's CPU time are used.
+    Every task keeps the effort it was given, two moves change where it goes:
+        relocate: move one of a task's runs to an earlier gap of its window that is free and unused
+        swap: exchange a run with the run of another task that directly follows it
+    A move is kept if it raises the XP. XP is only computed for the runs a move creates, so a move costs
+    a pass over the moved task's window, not a rescoring of the schedule. Runs of a task that end up
+    touching are merged, like slot_runs does, and scored as one, as schedule_from_placement will.
+    With granularity above CHUNK_MINUTES runs only go to clock-aligned starts, a run directly followed by an
+    unaligned run isn't moved away, and swaps need both runs to be whole blocks, so blocks stay aligned.
+    xp_cache: XP of (task_type, index, lo, hi) runs, can be shared by searches on the same inputs
+    Returns the best placement found, in the same task order, and its total XP
+    """
+    deadline = time.thread_time() + budget_seconds
+    per_block = max(granularity // CHUNK_MINUTES, 1)
+    xp_cache = {} if xp_cache is None else xp_cache
+    tasks = []
+    for p in placement:
+        if p.task_type == "assignment":
+            task = assignments[p.index]
+            window = (now, enforce_timestamp_utc(task.due))
+        else:
+            task = chores[p.index]
+            window = (enforce_timestamp_utc(task.window[0]), enforce_timestamp_utc(task.window[1]))
+        tasks.append((task, window[1], timeline.slot_range(*window)))
+    runs = [list(p.runs) for p in placement]
+
+    def run_xp(t: int, lo: int, hi: int) -> int:
+        key = (placement[t].task_type, placement[t].index, lo, hi)
+        xp = xp_cache.get(key)
+        if xp is None:
+            task, due, _ = tasks[t]
+            xp = calc_xp_for_slot(
+                timeline.slot_start(lo), timeline.slot_start(hi), task.effort, due, now
+            )
+            xp_cache[key] = xp
+        return xp
+
+    def rebuilt(t: int, removed: Tuple[int, int], added: Tuple[int, int]):
+        """Runs of task t with one run replaced, merged where they touch, and the XP that changes"""
+        new_runs = merge_intervals([r for r in runs[t] if r != removed] + [added])
+        before, after = set(runs[t]), set(new_runs)
+        delta = sum(run_xp(t, *r) for r in after - before) - sum(
+            run_xp(t, *r) for r in before - after
+        )
+        return new_runs, delta
+
+    # Owner of each slot: the position of its task in placement, -1 if it's free, -2 if it's a meeting or night.
+    # Meetings are already left out of the timeline's free bitmap
+    owner = np.where(timeline.free, -1, -2)
+    for t, task_runs in enumerate(runs):
+        for lo, hi in task_runs:
+            owner[lo:hi] = t
+
+    movable = [t for t in range(len(runs)) if runs[t]]
+    total = sum(run_xp(t, *r) for t in movable for r in runs[t])
+    while movable and time.thread_time() < deadline:
+        t = rng.choice(movable)
+        a, b = runs[t][rng.randrange(len(runs[t]))]
+        length = b - a
+        window_lo, window_hi = tasks[t][2]
+        if rng.random() < 0.5:
+            # Relocate to an earlier gap where the whole run fits
+            if a <= window_lo:
+                continue
+            # Vacating the run must not leave the run after it starting off the clock in the middle of a gap
+            if per_block > 1 and b < len(owner) and owner[b] >= 0:
+                if timeline.local_minutes(np.array([b]))[0] % granularity:
+                    continue
+            gap = owner[window_lo:a] == -1
+            filled = np.concatenate(([0], np.cumsum(gap)))
+            fits = np.flatnonzero(filled[length:] - filled[:-length] == length)
+            if per_block > 1 and len(fits):
+                fits = fits[timeline.local_minutes(fits + window_lo) % granularity == 0]
+            if not len(fits):
+                continue
+            start = window_lo + int(fits[rng.randrange(len(fits))])
+            new_runs, delta = rebuilt(t, (a, b), (start, start + length))
+            if delta <= 0:
+                continue
+            owner[a:b] = -1
+            owner[start : start + length] = t
+            runs[t] = new_runs
+        else:
+            # Swap with the run of another task right after this one
+            if b >= len(owner) or owner[b] < 0 or owner[b] == t:
+                continue
+            u = int(owner[b])
+            c = next(hi for lo, hi in runs[u] if lo == b)
+            if per_block > 1 and (length % per_block or (c - b) % per_block):
+                continue
+            if a < tasks[u][2][0] or c > window_hi:
+                continue
+            new_u, delta_u = rebuilt(u, (b, c), (a, a + c - b))
+            new_t, delta_t = rebuilt(t, (a, b), (a + c - b, c))
+            if delta_u + delta_t <= 0:
+                continue
+            owner[a : a + c - b] = u
+            owner[a + c - b : c] = t
+            runs[u], runs[t] = new_u, new_t
+            delta = delta_u + delta_t
+        total += delta
+
+    improved = [TaskPlacement(p.task_type, p.index, task_runs) for p, task_runs in zip(placement, runs)]
+    return improved, total
+
+
+# Shared inputs of the candidate schedules, set once per pool worker by _init_candidate_worker
+_worker_inputs: Dict = {}
+
+
+def _init_candidate_worker(shared_inputs: Dict):
+    _worker_inputs.clear()
+    _worker_inputs.update(shared_inputs)
+
+
+def _place_candidate_in_worker(strategy: str, min_session_minutes: int, job: Tuple[float, int]):
+    skip_prob, seed = job
+    return place_with_strategy(strategy, skip_prob, seed, _worker_inputs, min_session_minutes)
+
+
+def _place_candidates_in_worker(
+    strategy: str, min_session_minutes: int, shared_inputs: Dict, jobs: List[Tuple[float, int]]
+):
+    return [
+        place_with_strategy(strategy, skip_prob, seed, shared_inputs, min_session_minutes)
+        for skip_prob, seed in jobs
+    ]
+
+
+def _candidate_inputs(
+    meetings: List[MeetingInRequest],
+    assignments: List[AssignmentInRequest],
+    chores: List[ChoreInRequest],
+    now: datetime,
+    tz_offset_minutes: int = 0,
+    blocked_times: IntervalIndex | None = None,
+    granularity: int = 1,
+    tz_name: str | None = None,
+    availability: WeeklyAvailability | None = None,
+) -> Dict:
+    """Everything build_candidate_schedule needs besides skip_prob and seed, shared by all candidates"""
     # Compute all meeting times
     all_meeting_times: List[Tuple[datetime, datetime]] = []
     for m in meetings:
@@ -224,26 +1498,159 @@ def schedule_tasks(
                 interval[1]
             )
             all_meeting_times.append((start, end))
+    if blocked_times is not None:
+        all_meeting_times.extend(blocked_times.intervals)
 
-    # Find the latest relevant end time (assignment due, chore window end, meeting end)
+    # The horizon ends with the last task window (assignment due, chore window end), no task can be placed
+    # past it, so meetings and blocked time beyond it don't need to be looked at
     latest_times = []
     for a in assignments:
         latest_times.append(enforce_timestamp_utc(a.due))
     for c in chores:
         latest_times.append(enforce_timestamp_utc(c.window[1]))
-    for m in all_meeting_times:
-        latest_times.append(m[1])
     if latest_times:
         latest_time = max(latest_times)
     else:
         latest_time = now + timedelta(days=1)
+    all_meeting_times = [
+        (start, end) for start, end in all_meeting_times if start < latest_time and end > now
+    ]
 
-    # Generate all available slots once for the entire scheduling window
-    available = generate_available_slots(
-        all_meeting_times, now, latest_time, tz_offset_minutes=tz_offset_minutes
+    # Build the free-time timeline once for the entire scheduling window. Coarse blocks start on the user's
+    # clock, so their slots start on whole minutes, from the first one after now
+    origin = now if granularity <= CHUNK_MINUTES else _ceil_to_minute(now)
+    timeline = Timeline(
+        all_meeting_times,
+        origin,
+        latest_time,
+        tz_offset_minutes=tz_offset_minutes,
+        tz_name=tz_name,
+        availability=availability,
+    )
+    # Meetings and blocked time are left out of the timeline's free slots, so it is the whole baseline
+    # the candidates share, read-only
+    return dict(
+        timeline=timeline,
+        assignments=assignments,
+        chores=chores,
+        now=now,
+        granularity=granularity,
     )
 
-    schedules_results = []
+
+def _search_candidates(
+    found: List[Tuple[float, int, List[TaskPlacement], str]],
+    shared_inputs: Dict,
+    budget_seconds: float,
+    rng: random.Random,
+) -> List[Tuple[float | None, int | None, List[TaskPlacement], str]]:
+    """
+    Improve each (skip_prob, seed, placement, fingerprint) candidate with improve_placement, on an equal
+    share of the budget. Returns the distinct results, best total XP first
+    """
+    xp_cache = {}
+    improved = []
+    for skip_prob, job_seed, placement, fingerprint in found:
+        better, xp = improve_placement(
+            placement,
+            **shared_inputs,
+            budget_seconds=budget_seconds / len(found),
+            rng=rng,
+            xp_cache=xp_cache,
+        )
+        better_fingerprint = placement_fingerprint(better)
+        if better_fingerprint != fingerprint:
+            skip_prob, job_seed = None, None
+        improved.append((xp, skip_prob, job_seed, better, better_fingerprint))
+    improved.sort(key=lambda candidate: -candidate[0])
+    results = []
+    seen = set()
+    for _, skip_prob, job_seed, placement, fingerprint in improved:
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            results.append((skip_prob, job_seed, placement, fingerprint))
+    return results
+
+
+def iter_schedules(
+    meetings: List[MeetingInRequest],
+    assignments: List[AssignmentInRequest],
+    chores: List[ChoreInRequest],
+    num_schedules: int = 11,
+    end_time: datetime = None,
+    now: datetime = datetime.now(timezone.utc),
+    skip_p: float = 0.0,
+    tz_offset_minutes: int = 0,
+    max_workers: int = 1,
+    blocked_times: IntervalIndex | None = None,
+    seed: int | None = None,
+    granularity: int = 1,
+    dedupe: bool = False,
+    extra_candidates: int = 0,
+    strategy: str = "greedy",
+    search_ms: int = 0,
+    tz_name: str | None = None,
+    availability: WeeklyAvailability | None = None,
+    min_session_minutes: int = 0,
+    pool: ProcessPoolExecutor | None = None,
+) -> Iterator["Schedule"]:
+    # Ensure now is timezone-aware UTC
+    """
+    Build the candidate schedules, yielding them in order, each as soon as it's built.
+
+    General flow:
+        1. First get all meeting start/end times
+        2. Loop over num schedules
+            a. Share the read-only timeline, whose free slots leave out the meetings, built once for all candidates
+            b. Init lists for schedule info
+            c. Loosely sort asssignments, randomize chores
+            d. Then create task queue with assignments/chores
+            e. Iterate through tasks in queue
+                i. Get time ranges the task can be worked on
+                ii. Generate all available time windows not used by meetings and previous tasks in queue
+                iii. Then use find_time_blocks logic to find a block
+                iv. Add this to used slots, and figure out if enough was scheduled
+        Candidates are independent of each other. With max_workers > 1 they are built in a process pool.
+    pool: a long-lived ProcessPoolExecutor to build the candidates in, split into max_workers chunks,
+    instead of starting a pool of max_workers processes for this call
+    blocked_times: already scheduled time that is treated like meetings
+    seed: request seed, candidate i is built from candidate_seed(seed, i). Drawn from the global
+    random module if not given
+    granularity: minutes per placement block (1, 5, 15 or 30). Coarser blocks are placed whole, aligned
+    to the clock, and only split to the minute where free time starts or ends mid-block
+    dedupe: skip candidates whose placement_fingerprint was already yielded, so fewer than num_schedules
+    may come out. Up to extra_candidates more are then tried to make up for the duplicates
+    strategy: how each candidate's tasks are placed, a key of PLACEMENT_STRATEGIES. "greedy" (place_candidate)
+    places tasks one by one in loosely sorted order, "edf" (place_candidate_edf) packs them earliest
+    deadline first. EDF candidates only differ in how ties are broken, so most of them are duplicates
+    search_ms: CPU milliseconds to spend improving the candidates' total potential XP with improve_placement,
+    split evenly between them. The improved schedules are only yielded once the search is over, best XP
+    first, without duplicates. A schedule the search changed can't be rebuilt from a seed, so its seed and
+    skip_prob are None
+    tz_name: IANA zone of the user (e.g. "Europe/Berlin"). The 7AM-11PM band then follows DST instead
+    of the fixed tz_offset_minutes
+    availability: the user's compiled weekly template (WeeklyAvailability), tasks are then only placed in its
+    available minutes instead of 7AM-11PM
+    min_session_minutes: shortest work session to hand out. Shorter fragments of a candidate are merged into
+    the task's other sessions or dropped (see coalesce_fragments) before dedupe and search_ms
+
+    """
+    if end_time is None:
+        end_time = get_latest_time(meetings, assignments, chores)
+    if seed is None:
+        seed = random.getrandbits(52)
+    shared_inputs = _candidate_inputs(
+        meetings,
+        assignments,
+        chores,
+        now,
+        tz_offset_minutes,
+        blocked_times,
+        granularity,
+        tz_name,
+        availability,
+    )
+    jobs = []
     for i in range(num_schedules):
         # Set skip_p for each schedule
         if num_schedules == 1:
@@ -251,114 +1658,132 @@ def schedule_tasks(
         else:
             # For 11 schedules: 0, 0.1, ..., 1.0
             skip_prob = i / (num_schedules - 1)
+        # Each candidate gets its own stream, so results don't depend on where it is built
+        jobs.append((skip_prob, candidate_seed(seed, i)))
 
-        used_slots = set(
-            slot
-            for start, end in all_meeting_times
-            for slot in generate_available_slots(
-                [], start, end, tz_offset_minutes=tz_offset_minutes
-            )
-        )
-
-        assignments_out = []
-        chores_out = []
-
-        conflicting_assignments = []
-        conflicting_chores = []
-        not_enough_time_assignments = []
-        not_enough_time_chores = []
+    extra_jobs = []
+    if dedupe:
+        # Extra candidates stand in for duplicates, with skip probabilities between the regular ones
+        step = 1 / (num_schedules - 1) if num_schedules > 1 else 1.0
+        for k in range(extra_candidates):
+            skip_prob = min((k % max(num_schedules - 1, 1) + 0.5) * step, 1.0)
+            extra_jobs.append((skip_prob, candidate_seed(seed, num_schedules + k)))
 
-        prioritized_assignments = loosely_sort_assignments(assignments)
-        randomized_chores = random.sample(chores, k=len(chores))
+    own_pool = None
+    if pool is None and max_workers > 1 and num_schedules > 1:
+        # Shared inputs go to each worker once, and map keeps the candidates in order
+        own_pool = ProcessPoolExecutor(
+            max_workers=min(max_workers, num_schedules),
+            initializer=_init_candidate_worker,
+            initargs=(shared_inputs,),
+        )
+    futures = []
 
-        task_queue: List[
-            Tuple[
-                Literal["assignment", "chore"],
-                Union[AssignmentInRequest, ChoreInRequest],
+    def placements(batch):
+        if own_pool is not None:
+            return own_pool.map(
+                partial(_place_candidate_in_worker, strategy, min_session_minutes), batch
+            )
+        if pool is not None:
+            # A long-lived pool serves other requests too, so the shared inputs go with each chunk of jobs,
+            # one chunk per worker
+            size = max(-(-len(batch) // max(max_workers, 1)), 1)
+            chunks = [
+                pool.submit(
+                    _place_candidates_in_worker,
+                    strategy,
+                    min_session_minutes,
+                    shared_inputs,
+                    batch[i : i + size],
+                )
+                for i in range(0, len(batch), size)
             ]
-        ] = [("assignment", a) for a in prioritized_assignments] + [
-            ("chore", c) for c in randomized_chores
-        ]
+            futures.extend(chunks)
+            return (placement for chunk in chunks for placement in chunk.result())
+        return (
+            place_with_strategy(strategy, sp, s, shared_inputs, min_session_minutes)
+            for sp, s in batch
+        )
 
-        total_potential_xp = 0
+    def candidates():
+        seen = set()
+        for batch in (jobs, extra_jobs):
+            if batch is extra_jobs and len(seen) >= num_schedules:
+                break
+            for (skip_prob, job_seed), placement in zip(batch, placements(batch)):
+                fingerprint = placement_fingerprint(placement)
+                if dedupe and fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                yield skip_prob, job_seed, placement, fingerprint
+                if batch is extra_jobs and len(seen) >= num_schedules:
+                    break
 
-        for task_type, task in task_queue:
-            if task_type == "assignment":
-                time_range = (now, enforce_timestamp_utc(task.due))
-            else:
-                w0, w1 = enforce_timestamp_utc(task.window[0]), enforce_timestamp_utc(
-                    task.window[1]
-                )
-                time_range = (w0, w1)
-            avail_for_this = [
-                s
-                for s in available
-                if s not in used_slots
-                and s[0] >= time_range[0]
-                and s[1] <= time_range[1]
-            ]
-            assigned_slots = find_time_blocks(
-                task.effort, avail_for_this, used_slots, skip_prob=skip_prob
+    try:
+        if search_ms > 0:
+            found = _search_candidates(
+                list(candidates()), shared_inputs, search_ms / 1000, random.Random(seed)
             )
-            assigned_minutes = 0
-            for start, end in assigned_slots:
-                assigned_minutes += (end - start).total_seconds() / 60
-
-            status = (
-                "fully_scheduled"
-                if assigned_minutes == task.effort
-                else "partially_scheduled" if assigned_minutes > 0 else "unschedulable"
-            )
-            for slot in assigned_slots:
-                used_slots.add(slot)
-            # Merge contiguous slots for display purposes
-            merged_slots_for_display = merge_contiguous_slots(assigned_slots)
-            slot_objs = []
-            if task_type == "assignment":
-                due_time = enforce_timestamp_utc(task.due)
-                total_effort = task.effort
-                for s in merged_slots_for_display:
-                    xp = calc_xp_for_slot(s[0], s[1], total_effort, due_time, now)
-                    total_potential_xp += xp
-                    slot_objs.append(TimeSlot(start=s[0], end=s[1], xp_potential=xp))
-            else:
-                due_time = enforce_timestamp_utc(task.window[1])
-                total_effort = task.effort
-                for s in merged_slots_for_display:
-                    xp = calc_xp_for_slot(s[0], s[1], total_effort, due_time, now)
-                    total_potential_xp += xp
-                    slot_objs.append(TimeSlot(start=s[0], end=s[1], xp_potential=xp))
-            schedule_info = ScheduledTaskInfo(
-                effort_assigned=assigned_minutes, status=status, slots=slot_objs
+        else:
+            found = candidates()
+        for skip_prob, job_seed, placement, fingerprint in found:
+            # Only candidates that are kept get turned into models
+            yield schedule_from_placement(
+                placement,
+                skip_prob,
+                job_seed,
+                shared_inputs["timeline"],
+                assignments,
+                chores,
+                now,
+                fingerprint=fingerprint,
             )
-            if task_type == "assignment":
-                result = AssignmentInPotentialSchedule(
-                    **task.model_dump(), schedule=schedule_info
-                )
-                assignments_out.append(result)
-                if status == "unschedulable":
-                    conflicting_assignments.append(task.name)
-                elif status == "partially_scheduled":
-                    not_enough_time_assignments.append(task.name)
-            else:
-                result = ChoreInPotentialSchedule(
-                    **task.model_dump(), schedule=schedule_info
-                )
-                chores_out.append(result)
-                if status == "unschedulable":
-                    conflicting_chores.append(task.name)
-                elif status == "partially_scheduled":
-                    not_enough_time_chores.append(task.name)
-
-        schedule = Schedule(
-            assignments=assignments_out,
-            chores=chores_out,
-            conflicting_assignments=conflicting_assignments,
-            conflicting_chores=conflicting_chores,
-            not_enough_time_assignments=not_enough_time_assignments,
-            not_enough_time_chores=not_enough_time_chores,
-            total_potential_xp=total_potential_xp,
-        )
-        schedules_results.append(schedule)
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown(cancel_futures=True)
+        for future in futures:
+            future.cancel()
+
 
-    return schedules_results
+def schedule_tasks(*args, **kwargs) -> List["Schedule"]:
+    """All candidate schedules at once, see iter_schedules for the arguments"""
+    return list(iter_schedules(*args, **kwargs))
+
+
+def regenerate_schedule(
+    meetings: List[MeetingInRequest],
+    assignments: List[AssignmentInRequest],
+    chores: List[ChoreInRequest],
+    seed: int,
+    skip_prob: float,
+    now: datetime,
+    tz_offset_minutes: int = 0,
+    blocked_times: IntervalIndex | None = None,
+    granularity: int = 1,
+    strategy: str = "greedy",
+    tz_name: str | None = None,
+    availability: WeeklyAvailability | None = None,
+    min_session_minutes: int = 0,
+) -> "Schedule":
+    """
+    Rebuild a single candidate from its seed and skip_prob (as returned on the Schedule) and the inputs
+    it was scheduled with, without building the other candidates
+    """
+    shared_inputs = _candidate_inputs(
+        meetings,
+        assignments,
+        chores,
+        now,
+        tz_offset_minutes,
+        blocked_times,
+        granularity,
+        tz_name,
+        availability,
+    )
+    return build_candidate_schedule(
+        skip_prob,
+        seed,
+        **shared_inputs,
+        strategy=strategy,
+        min_session_minutes=min_session_minutes,
+    )
@@ -0,0 +1,143 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Marks the end of a streamed job's output
+_END = object()
+
+
+class SchedulerBusyError(Exception):
+    """Raised when the scheduling queue is full. retry_after is a hint in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Scheduling queue is full")
+        self.retry_after = retry_after
+
+
+class SchedulingTimeoutError(Exception):
+    """Raised when a scheduling job doesn't finish within the executor's timeout"""
+
+
+class SchedulingExecutor:
+    """
+    Runs CPU-bound scheduling jobs on a dedicated set of worker threads so the event loop
+    keeps serving cheap endpoints while schedules are being computed.
+    workers: number of jobs that run at the same time
+    queue_size: number of jobs that may wait for a worker before new ones are rejected
+    timeout: seconds a caller waits for its job before giving up
+    retry_after: seconds clients are told to wait when the queue is full
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 8,
+        timeout: float = 30.0,
+        retry_after: int = 5,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="scheduler"
+        )
+        # Jobs running or waiting. Released from worker threads, so guarded by a lock
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on a worker thread and await its result.
+        Raises SchedulerBusyError if workers + queue_size jobs are already pending, and
+        SchedulingTimeoutError if the job takes longer than timeout.
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                raise SchedulerBusyError(self.retry_after)
+            self._pending += 1
+        # The slot is only released once the job itself is done, even if the caller timed out,
+        # so abandoned jobs still count against the queue
+        future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise SchedulingTimeoutError(
+                f"Scheduling did not finish within {self.timeout} seconds"
+            )
+
+    def stream(self, fn, *args, **kwargs):
+        """
+        Run the generator function fn(*args, **kwargs) on a worker thread and return an async iterator
+        over the items it yields, each delivered as soon as it's produced.
+        The queue slot is taken right away, so SchedulerBusyError is raised by this call and not while
+        iterating. Iterating raises SchedulingTimeoutError if the whole job takes longer than timeout,
+        and re-raises whatever fn raised. If the consumer stops early, the job stops at its next item.
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                raise SchedulerBusyError(self.retry_after)
+            self._pending += 1
+        loop = asyncio.get_running_loop()
+        items = asyncio.Queue()
+        stop = threading.Event()
+
+        def put(entry):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, entry)
+            except RuntimeError:
+                # The loop is gone, nobody is listening anymore
+                stop.set()
+
+        def produce():
+            try:
+                for item in fn(*args, **kwargs):
+                    if stop.is_set():
+                        return
+                    put((item, None))
+            except Exception as e:
+                put((None, e))
+            finally:
+                put(_END)
+
+        future = self._pool.submit(produce)
+        future.add_done_callback(self._release)
+        return self._drain(items, stop, loop.time() + self.timeout)
+
+    async def _drain(
+        self, items: asyncio.Queue, stop: threading.Event, deadline: float
+    ):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    entry = await asyncio.wait_for(
+                        items.get(), max(deadline - loop.time(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    raise SchedulingTimeoutError(
+                        f"Scheduling did not finish within {self.timeout} seconds"
+                    )
+                if entry is _END:
+                    return
+                item, error = entry
+                if error is not None:
+                    raise error
+                yield item
+        finally:
+            stop.set()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
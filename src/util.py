@@ -2,8 +2,10 @@ import dotenv
 import os
 import asyncpg
 from pydantic import BaseModel
-from datetime import datetime, timedelta, timezone
-from typing import Annotated, Union
+from datetime import date, datetime, time as dt_time, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Annotated, Union, Tuple
+from zoneinfo import ZoneInfo
 import jwt
 from fastapi import Depends, FastAPI, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
@@ -141,6 +143,32 @@ def enforce_timestamp_utc(time: datetime):
     return time
 
 
+@lru_cache(maxsize=256)
+def get_timezone(tz_name: str | None = None, tz_offset_minutes: int = 0) -> tzinfo:
+    """
+    The IANA zone tz_name (e.g. "America/Chicago") if given, which follows DST,
+    otherwise the fixed tz_offset_minutes offset from UTC.
+    Raises zoneinfo.ZoneInfoNotFoundError for an unknown tz_name
+    """
+    if tz_name:
+        return ZoneInfo(tz_name)
+    return timezone(timedelta(minutes=tz_offset_minutes))
+
+
+@lru_cache(maxsize=8192)
+def local_day_bounds(
+    tz: tzinfo, day: date, start_hour: int = 0, end_hour: int = 24
+) -> Tuple[datetime, datetime]:
+    """
+    UTC instants at which the wall clock in tz reads start_hour and end_hour on day (end_hour 24 being
+    midnight of the next day). A day across a DST change is 23 or 25 hours long. Cached, since schedules
+    and achievements keep asking for the same few days
+    """
+    start = datetime.combine(day, dt_time(start_hour), tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=end_hour // 24), dt_time(end_hour % 24), tzinfo=tz)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
 def get_latest_time(
     meetings: List[MeetingInRequest],
     assignments: List[AssignmentInRequest],
@@ -165,6 +193,18 @@ def get_latest_time(
     return latest_time
 
 
+def get_earliest_time(meetings: List[MeetingInRequest], now: datetime):
+    """
+    Earliest time the events of a schedule request reach back to: now, or the start of a requested
+    meeting occurrence if one is in the past
+    """
+    earliest_times = [now]
+    for m in meetings:
+        for pair in m.start_end_times:
+            earliest_times.append(enforce_timestamp_utc(pair[0]))
+    return min(earliest_times)
+
+
 def get_xp_for_next_level(level: int):
     """
     Given a level, return the XP required to reach the next level.
@@ -3,6 +3,7 @@ import asyncio
 from unittest.mock import AsyncMock, MagicMock
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
+from zoneinfo import ZoneInfo
 import sys
 import os
 
@@ -13,7 +14,8 @@ from achievements_check import (
     check_session_achievements,
     check_level_achievements,
     check_cumulative_achievements,
-    convert_utc_to_local_time
+    convert_utc_to_local_time,
+    local_dates
 )
 
 class TestAchievements:
@@ -83,6 +85,24 @@ class TestAchievements:
         result = convert_utc_to_local_time(utc_time, 0)
         assert result == utc_time
 
+    def test_timezone_conversion_zone_name_follows_dst(self):
+        winter = convert_utc_to_local_time(datetime(2024, 1, 7, 14, 30, tzinfo=timezone.utc), 0, "America/Los_Angeles")
+        summer = convert_utc_to_local_time(datetime(2024, 8, 7, 14, 30, tzinfo=timezone.utc), 0, "America/Los_Angeles")
+        assert (winter.hour, summer.hour) == (6, 7)
+
+    def test_local_dates_split_at_local_midnight_across_dst(self):
+        # Clocks in Berlin went back on 2024-10-27, that day ran from 22:00 UTC on the 26th to 23:00 UTC on the 27th
+        berlin = ZoneInfo("Europe/Berlin")
+        times = [
+            datetime(2024, 10, 26, 21, 59, tzinfo=timezone.utc),
+            datetime(2024, 10, 26, 22, 0, tzinfo=timezone.utc),
+            datetime(2024, 10, 27, 22, 59, tzinfo=timezone.utc),
+            datetime(2024, 10, 27, 23, 0, tzinfo=timezone.utc),
+        ]
+        expected = [t.astimezone(berlin).date() for t in times]
+        assert local_dates(times, berlin) == expected
+        assert [d.day for d in expected] == [26, 27, 27, 28]
+
     @pytest.mark.asyncio
     async def test_first_timer_should_trigger(self, default_achievements):
         sessions = [self.create_session(datetime(2024, 8, 7, 14, 0, tzinfo=timezone.utc))]
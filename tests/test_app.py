@@ -8,11 +8,15 @@ from googleapiclient.errors import HttpError
 from datetime import datetime, timezone, timedelta, time, date
 from asyncpg import Record
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
-from app import app
+from app import app, schedule_cache, availability_cache, busy_cache
+from scheduling_executor import SchedulerBusyError
+import asyncio
+import json
 from data_models import (
     RegistrationDataModel, UserInDB, ScheduleRequest, MeetingInRequest, 
     AssignmentInRequest, ChoreInRequest, Schedule, ScheduleResponseFormat, 
-    SessionCompletionDataModel, RescheduleRequestDataModel
+    SessionCompletionDataModel, RescheduleRequestDataModel, AvailabilityTemplate, WeeklyTimeBlock,
+    FreeTimeRequest
 )
 
 def validate_schedule_no_overlaps(schedule):
@@ -130,6 +134,12 @@ class TestEndpoints:
         self.mock_pool = MagicMock()
         self.mock_pool.acquire.return_value = self.mock_acquire
         app.state.pool = self.mock_pool
+        asyncio.run(schedule_cache.clear())
+        # The mocked user has no availability template, so the mocked fetches are only the occurrence lookups
+        availability_cache.clear()
+        availability_cache[123] = None
+        # Nothing cached for the mocked user either, so their occurrences are looked up with conn.fetch
+        asyncio.run(busy_cache.clear())
     
     def teardown_method(self):
         """Clean up after each test"""
@@ -565,7 +575,11 @@ class TestEndpoints:
         response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
         assert response.status_code == 200
         response_data = response.json()
-        assert len(response_data["conflicting_meetings"]) > 0
+        assert response_data["conflicting_meetings"] == ["Team Standup"]
+        assert len(response_data["meeting_conflicts"]) == 1
+        conflict = response_data["meeting_conflicts"][0]
+        assert conflict["meeting_name"] == "Team Standup" and conflict["occurrence_index"] == 0
+        assert conflict["blocked_by"]["start"].startswith("2024-08-07T09:15:00")
         # Validate that schedules are well-formed (no overlaps)
         for schedule in response_data["schedules"]:
             assert validate_schedule_no_overlaps(schedule), f"Schedule contains overlapping occurrences: {schedule}"
@@ -665,6 +679,416 @@ class TestEndpoints:
         assert response.status_code == 500
         assert "Something went wrong on the backend" in response.json()["detail"]
 
+    @patch('app.get_current_user')
+    def test_schedule_resubmission_is_served_from_cache(self, mock_get_current_user, mock_user, sample_meetings, sample_assignments, sample_chores):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        # The second time around, the meetings set in stone by the first request are blocked time
+        meeting_rows = [{'start_time': s, 'end_time': e} for m in sample_meetings for s, e in m.start_end_times]
+        mock_connection.fetch.side_effect = [[], [], [], meeting_rows, [], []]
+        mock_connection.fetchval.return_value = 1
+        request_data = ScheduleRequest(meetings=sample_meetings, assignments=sample_assignments, chores=sample_chores, tz_offset_minutes=0)
+        headers = {"Authorization": "Bearer mock_token"}
+        # A wide time bucket so the two requests can't straddle a bucket boundary
+        with patch.object(schedule_cache, 'bucket_seconds', 10**9), \
+                patch('app.run_schedule_tasks', wraps=__import__('app').run_schedule_tasks) as mock_run:
+            first = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+            second = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert first.status_code == 200 and second.status_code == 200
+        assert mock_run.call_count == 1
+        assert first.json()["schedules"] == second.json()["schedules"]
+        assert schedule_cache.stats() == {"hits": 1, "misses": 1}
+
+    @patch('app.get_current_user')
+    def test_schedule_response_is_enough_to_regenerate_a_schedule(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        start = datetime.now(timezone.utc) + timedelta(hours=3)
+        meeting = MeetingInRequest(name="Sync", start_end_times=[[start + timedelta(hours=2 * i), start + timedelta(hours=2 * i, minutes=50)] for i in range(4)])
+        stored = []
+
+        async def fetch(query, user_id, lo, hi):
+            # Occurrence lookups only see the meeting once /schedule has stored it
+            return stored if "meeting_occurences" in query else []
+
+        mock_connection.fetch.side_effect = fetch
+        mock_connection.fetchval.return_value = 1
+        request_data = ScheduleRequest(
+            meetings=[meeting],
+            assignments=[AssignmentInRequest(name=f"A{i}", effort=70 + 40 * i, due=start + timedelta(days=1 + i)) for i in range(3)],
+            chores=[ChoreInRequest(name="Laundry", effort=45, window=[start, start + timedelta(hours=10)])],
+            tz_offset_minutes=-300,
+            granularity=15,
+        )
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        stored.extend({"start_time": s, "end_time": e} for s, e in meeting.start_end_times)
+        for schedule in body["schedules"][::3]:
+            regenerate_data = {
+                **request_data.model_dump(mode='json'),
+                "origin": body["origin"],
+                "seed": schedule["seed"],
+                "skip_prob": schedule["skip_prob"],
+            }
+            rebuilt = self.client.post("/regenerateSchedule", json=regenerate_data, headers=headers)
+            assert rebuilt.status_code == 200
+            assert rebuilt.json() == schedule
+
+    @patch('app.get_current_user')
+    def test_schedule_blocks_time_under_later_chore_recurrences(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        day = datetime.now(timezone.utc).replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        # Already stored: a meeting taking the whole window of the chore's third recurrence
+        existing = (day + timedelta(days=2), day + timedelta(days=2, hours=1))
+        rows = {"meeting_occurences": [{"start_time": existing[0], "end_time": existing[1]}]}
+
+        async def fetch(query, user_id, lo, hi):
+            table = query.split(" FROM ")[1].split()[0]
+            return [r for r in rows.get(table, []) if r["end_time"] > lo and r["start_time"] < hi]
+
+        mock_connection.fetch.side_effect = fetch
+        mock_connection.fetchval.return_value = 1
+        chore = ChoreInRequest(name="Dishes", effort=60, window=[day, day + timedelta(hours=1)], end_recur_date=day + timedelta(days=2))
+        request_data = ScheduleRequest(meetings=[], assignments=[], chores=[chore])
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        for schedule in response.json()["schedules"]:
+            assert len(schedule["chores"]) == 3
+            slots = [(datetime.fromisoformat(s["start"]), datetime.fromisoformat(s["end"])) for c in schedule["chores"] for s in c["schedule"]["slots"]]
+            assert not any(s < existing[1] and e > existing[0] for s, e in slots)
+            assert schedule["conflicting_chores"] == [f"Dishes for {existing[0]:%Y-%m-%d}"]
+
+    @patch('app.get_current_user')
+    @patch.object(busy_cache, 'enabled', True)  # A single process, as BUSY_CACHE_SINGLE_PROCESS=1 declares
+    def test_schedule_reuses_busy_time_until_it_changes(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.side_effect = [[], [], [], [], [], []]
+        mock_connection.fetchval.return_value = 1
+        start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+        meeting = MeetingInRequest(name="Review", start_end_times=[[start, start + timedelta(hours=1)]])
+        assignments = [AssignmentInRequest(name="Essay", effort=60, due=start + timedelta(days=2))]
+        headers = {"Authorization": "Bearer mock_token"}
+
+        def schedule(seed):
+            request_data = ScheduleRequest(meetings=[meeting], assignments=assignments, chores=[], seed=seed)
+            response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+            assert response.status_code == 200
+            return response.json()
+
+        assert schedule(1)["conflicting_meetings"] == []
+        assert mock_connection.fetch.call_count == 3
+        # Served from the cached busy time, which now holds the meeting the first request stored
+        assert schedule(2)["conflicting_meetings"] == ["Review"]
+        assert mock_connection.fetch.call_count == 3
+        # Deleting an occurrence drops the cached busy time
+        response = self.client.post("/delete", json={"occurence_id": 1, "remove_all_future": False}, headers=headers)
+        assert response.status_code == 200
+        assert schedule(3)["conflicting_meetings"] == []
+        assert mock_connection.fetch.call_count == 6
+
+    @patch('app.get_current_user')
+    def test_busy_cache_is_off_without_redis_or_a_single_process(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.return_value = []
+        mock_connection.fetchval.return_value = 1
+        start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+        assignments = [AssignmentInRequest(name="Essay", effort=60, due=start + timedelta(days=2))]
+        headers = {"Authorization": "Bearer mock_token"}
+        assert not busy_cache.enabled
+        for seed in (1, 2):
+            request_data = ScheduleRequest(meetings=[], assignments=assignments, chores=[], seed=seed)
+            response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+            assert response.status_code == 200
+        # Both requests read the occurrence tables, another worker could have changed them
+        assert mock_connection.fetch.call_count == 6
+
+    @patch('app.get_current_user')
+    def test_schedule_compiles_the_availability_template_once(self, mock_get_current_user, mock_user, sample_meetings, sample_assignments, sample_chores):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        template = AvailabilityTemplate(available=[WeeklyTimeBlock(weekday=w, start="18:00", end="21:00") for w in range(7)])
+        mock_connection.fetch.side_effect = [[], [], [], [], [], []]
+        mock_connection.fetchval.side_effect = lambda query, *args: template.model_dump_json() if "availability_templates" in query else 1
+        availability_cache.clear()
+        request_data = ScheduleRequest(meetings=sample_meetings, assignments=sample_assignments, chores=sample_chores, tz_offset_minutes=0)
+        headers = {"Authorization": "Bearer mock_token"}
+        with patch('app.run_schedule_tasks', wraps=__import__('app').run_schedule_tasks) as mock_run:
+            # Different seeds, so the second request isn't served from the schedule cache
+            for seed in (1, 2):
+                request_data.seed = seed
+                response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+                assert response.status_code == 200
+        template_lookups = [c for c in mock_connection.fetchval.call_args_list if "availability_templates" in c.args[0]]
+        assert len(template_lookups) == 1
+        first, second = (c.kwargs["availability"] for c in mock_run.call_args_list)
+        assert first is second and first.runs.tolist() == [[1080, 1260]] * 7
+
+    @patch('app.get_current_user')
+    def test_set_availability_stores_the_template(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        template = AvailabilityTemplate(
+            available=[WeeklyTimeBlock(weekday=0, start="09:00", end="17:00")],
+            blackouts=[WeeklyTimeBlock(weekday=0, start="12:00", end="13:00")],
+        )
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/setAvailability", json=template.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        query, user_id, stored = self.mock_conn.execute.call_args.args
+        assert "availability_templates" in query and user_id == 123
+        assert AvailabilityTemplate.model_validate_json(stored) == template
+        # Later schedules use the new template without looking it up again
+        assert availability_cache[123].runs.tolist() == [[540, 720], [780, 1020]]
+
+    @patch('app.get_current_user')
+    def test_set_availability_rejects_a_block_ending_before_it_starts(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        headers = {"Authorization": "Bearer mock_token"}
+        body = {"available": [{"weekday": 2, "start": "17:00", "end": "09:00"}]}
+        response = self.client.post("/setAvailability", json=body, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        self.mock_conn.execute.assert_not_called()
+
+    @patch('app.get_current_user')
+    def test_get_availability_defaults_to_the_usual_hours(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        self.mock_conn.fetchval.return_value = None
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.get("/getAvailability", headers=headers)
+        assert response.status_code == 200
+        available = response.json()["available"]
+        assert len(available) == 7 and all(b["start"] == "07:00:00" and b["end"] == "23:00:00" for b in available)
+
+    @patch('app.get_current_user')
+    def test_free_time_counts_free_minutes_per_window(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        day = datetime(2030, 1, 7, tzinfo=timezone.utc)
+        meeting = {"start_time": day.replace(hour=8, minute=30), "end_time": day.replace(hour=9)}
+        mock_connection.fetch.side_effect = [[meeting], [], []]
+        windows = [
+            [day.replace(hour=8), day.replace(hour=10)],
+            [day.replace(hour=9), day.replace(hour=11)],
+            [day.replace(hour=1), day.replace(hour=3)],
+        ]
+        headers = {"Authorization": "Bearer mock_token"}
+        request_data = FreeTimeRequest(windows=windows).model_dump(mode='json')
+        response = self.client.post("/freeTime", json=request_data, headers=headers)
+        assert response.status_code == 200
+        # The night is outside the default 7AM-11PM, and the overlap of the first two windows counts once
+        assert response.json() == {"free_minutes": [90, 120, 0], "total_free_minutes": 150}
+        query, user_id, lo, hi = mock_connection.fetch.call_args_list[0].args
+        assert (user_id, lo, hi) == (123, day.replace(hour=1), day.replace(hour=11))
+
+    @patch('app.get_current_user')
+    def test_free_time_rejects_a_window_ending_before_it_starts(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        day = datetime(2030, 1, 7, tzinfo=timezone.utc)
+        request_data = FreeTimeRequest(windows=[[day.replace(hour=10), day.replace(hour=9)]]).model_dump(mode='json')
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/freeTime", json=request_data, headers=headers)
+        assert response.status_code == 400
+
+    @patch('app.get_current_user')
+    def test_schedule_only_fetches_occurrences_in_the_request_window(self, mock_get_current_user, mock_user, sample_meetings, sample_assignments, sample_chores):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.side_effect = [[], [], []]
+        mock_connection.fetchval.return_value = 1
+        request_data = ScheduleRequest(meetings=sample_meetings, assignments=sample_assignments, chores=sample_chores, tz_offset_minutes=0)
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        # The sample meetings and chores are in the past, so the window starts at the first of them,
+        # the grocery chore's window
+        first_start = datetime(2024, 8, 7, 8, 0, tzinfo=timezone.utc)
+        last_due = datetime(2024, 8, 10, 17, 0, tzinfo=timezone.utc)
+        for call in mock_connection.fetch.call_args_list[:3]:
+            query, user_id, lo, hi = call.args
+            assert "end_time > $2 AND start_time < $3" in query
+            assert (user_id, lo, hi) == (123, first_start, last_due)
+
+    @patch('app.get_current_user')
+    def test_schedule_with_edf_strategy(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.side_effect = [[], [], []]
+        due = datetime.now(timezone.utc) + timedelta(days=2)
+        assignments = [AssignmentInRequest(name=f"A{i}", effort=90, due=due + timedelta(hours=i)) for i in range(3)]
+        request_data = ScheduleRequest(meetings=[], assignments=assignments, chores=[], strategy="edf")
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        for schedule in response.json()["schedules"]:
+            assert [a["schedule"]["status"] for a in schedule["assignments"]] == ["fully_scheduled"] * 3
+            assert validate_schedule_no_overlaps(schedule)
+
+    @patch('app.get_current_user')
+    def test_schedule_with_min_session_reports_fragment_counts(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.side_effect = [[], [], []]
+        start = datetime.now(timezone.utc).replace(second=0, microsecond=0) + timedelta(hours=1)
+        # 10 minute meetings every 35 minutes leave 25 minute gaps
+        meetings = [MeetingInRequest(name="Standup", start_end_times=[[start + timedelta(minutes=35 * i), start + timedelta(minutes=35 * i + 10)] for i in range(60)])]
+        assignments = [AssignmentInRequest(name=f"A{i}", effort=80, due=start + timedelta(days=1)) for i in range(3)]
+        request_data = ScheduleRequest(meetings=meetings, assignments=assignments, chores=[], min_session_minutes=20)
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        for schedule in response.json()["schedules"]:
+            slots = [slot for a in schedule["assignments"] for slot in a["schedule"]["slots"]]
+            assert schedule["fragment_count"] == len(slots)
+            for a in schedule["assignments"]:
+                if len(a["schedule"]["slots"]) > 1:
+                    shortest = min(20, a["schedule"]["effort_assigned"])
+                    lengths = [datetime.fromisoformat(s["end"]) - datetime.fromisoformat(s["start"]) for s in a["schedule"]["slots"]]
+                    assert min(lengths) >= timedelta(minutes=shortest)
+
+    @patch('app.get_current_user')
+    def test_schedule_rejects_unknown_timezone_name(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        request_data = ScheduleRequest(meetings=[], assignments=[], chores=[]).model_dump(mode='json')
+        request_data["tz_name"] = "Mars/Olympus_Mons"
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule", json=request_data, headers=headers)
+        assert response.status_code == 422
+
+    @patch('app.get_current_user')
+    def test_schedule_rejects_offsets_of_a_day_or_more(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        request_data = ScheduleRequest(meetings=[], assignments=[], chores=[]).model_dump(mode='json')
+        headers = {"Authorization": "Bearer mock_token"}
+        for offset in (24 * 60, -24 * 60, 100000):
+            request_data["tz_offset_minutes"] = offset
+            response = self.client.post("/schedule", json=request_data, headers=headers)
+            assert response.status_code == 422
+
+    @patch('app.get_current_user')
+    def test_schedule_collapses_duplicate_candidates(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.side_effect = [[], [], []]
+        # A 20 minute task fits before any skip can happen, so every candidate places it the same way
+        due = datetime.now(timezone.utc) + timedelta(days=3)
+        request_data = ScheduleRequest(meetings=[], assignments=[AssignmentInRequest(name="Quiz", effort=20, due=due)], chores=[], tz_offset_minutes=0)
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        response_data = response.json()
+        fingerprints = [schedule["fingerprint"] for schedule in response_data["schedules"]]
+        assert response_data["distinct_schedules"] == len(fingerprints) == len(set(fingerprints))
+        assert len(fingerprints) < 11
+
+    @patch('app.get_current_user')
+    def test_schedule_stream_sends_meetings_then_each_schedule(self, mock_get_current_user, mock_user, sample_meetings, sample_assignments, sample_chores):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.side_effect = [[], [], []]
+        mock_connection.fetchval.return_value = 1
+        request_data = ScheduleRequest(meetings=sample_meetings, assignments=sample_assignments, chores=sample_chores, tz_offset_minutes=0)
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule?stream=true", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["type"] == "meetings"
+        assert len(lines[0]["meetings"]) == len(sample_meetings) and lines[0]["conflicting_meetings"] == []
+        count = lines[-1]["count"]
+        assert [line["type"] for line in lines[1:]] == ["schedule"] * count + ["done"]
+        assert [line["index"] for line in lines[1:-1]] == list(range(count))
+        for line in lines[1:-1]:
+            assert validate_schedule_no_overlaps(line["schedule"])
+        assert len({line["schedule"]["fingerprint"] for line in lines[1:-1]}) == count
+
+    @patch('app.scheduling_executor')
+    @patch('app.get_current_user')
+    def test_schedule_stream_queue_full_returns_503(self, mock_get_current_user, mock_executor, mock_user, sample_assignments):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.side_effect = [[], [], []]
+        mock_executor.stream = MagicMock(side_effect=SchedulerBusyError(retry_after=5))
+        request_data = ScheduleRequest(meetings=[], assignments=sample_assignments, chores=[], tz_offset_minutes=0)
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule?stream=true", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+        mock_connection.fetchval.assert_not_called()
+
+    @patch('app.scheduling_executor')
+    @patch('app.get_current_user')
+    def test_schedule_queue_full_returns_503(self, mock_get_current_user, mock_executor, mock_user, sample_assignments):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetch.side_effect = [[], [], []]
+        mock_executor.run = AsyncMock(side_effect=SchedulerBusyError(retry_after=5))
+        request_data = ScheduleRequest(meetings=[], assignments=sample_assignments, chores=[], tz_offset_minutes=0)
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/schedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+
     @patch('app.get_current_user')
     def test_setSchedule_successful_first_time(self, mock_get_current_user, mock_user, sample_meetings, sample_assignments, sample_chores):
         mock_get_current_user.return_value = mock_user
@@ -781,6 +1205,7 @@ class TestEndpoints:
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -814,11 +1239,40 @@ class TestEndpoints:
         for schedule in response_data["schedules"]:
             assert validate_schedule_no_overlaps(schedule), f"Schedule contains overlapping occurrences: {schedule}"
 
+    @patch('app.get_current_user')
+    def test_reschedule_only_fetches_blocked_time_up_to_the_new_deadline(self, mock_get_current_user, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetchrow.return_value = {
+            "assignment_id": 1,
+            "assignment_name": "Math Homework",
+            "effort": 120,
+            "deadline": datetime(2024, 8, 9, 23, 59, tzinfo=timezone.utc)
+        }
+        mock_connection.fetch.side_effect = [[], [], [], []]
+        mock_connection.execute.return_value = None
+        new_due = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=2)
+        request_data = RescheduleRequestDataModel(event_type="assignment", id=1, allow_overlaps=True, new_window_end=new_due)
+        headers = {"Authorization": "Bearer mock_token"}
+        before = datetime.now(timezone.utc)
+        response = self.client.post("/reschedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 200
+        for call in mock_connection.fetch.call_args_list[1:]:
+            query, user_id, lo, hi = call.args
+            assert "end_time > $2 AND start_time < $3" in query
+            assert user_id == 123 and before <= lo <= datetime.now(timezone.utc) and hi == new_due
+
     @patch('app.get_current_user')
     def test_reschedule_no_existing_schedule(self, mock_get_current_user, mock_user):
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -839,6 +1293,7 @@ class TestEndpoints:
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -859,6 +1314,7 @@ class TestEndpoints:
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -897,6 +1353,7 @@ class TestEndpoints:
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -924,12 +1381,16 @@ class TestEndpoints:
         headers = {"Authorization": "Bearer mock_token"}
         response = self.client.post("/reschedule", json=request_data.model_dump(mode='json'), headers=headers)
         assert response.status_code == 200
+        # The future occurrence is deleted in a transaction, once the new schedules exist
+        mock_connection.transaction.assert_called_once()
+        assert "DELETE FROM assignment_occurences" in mock_connection.execute.call_args.args[0]
 
     @patch('app.get_current_user')
     def test_reschedule_assignment_with_updates(self, mock_get_current_user, mock_user):
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -964,6 +1425,7 @@ class TestEndpoints:
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -1000,6 +1462,7 @@ class TestEndpoints:
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -1037,11 +1500,47 @@ class TestEndpoints:
         response = self.client.post("/reschedule", json=request_data.model_dump(mode='json'), headers=headers)
         assert response.status_code == 200
 
+    @patch('app.scheduling_executor')
+    @patch('app.get_current_user')
+    def test_reschedule_queue_full_leaves_the_task_unchanged(self, mock_get_current_user, mock_executor, mock_user):
+        mock_get_current_user.return_value = mock_user
+        mock_context = AsyncMock()
+        mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
+        mock_context.__aenter__.return_value = mock_connection
+        mock_context.__aexit__.return_value = None
+        self.mock_pool.acquire.return_value = mock_context
+        mock_connection.fetchrow.return_value = {
+            "assignment_id": 1,
+            "assignment_name": "Math Homework",
+            "effort": 120,
+            "deadline": datetime.now(timezone.utc) + timedelta(days=2)
+        }
+        future_occurrence = datetime.now(timezone.utc) + timedelta(hours=2)
+        mock_connection.fetch.side_effect = [
+            [{"start_time": future_occurrence - timedelta(hours=1), "end_time": future_occurrence, "occurence_id": 1}],
+            [],
+            [{"start_time": future_occurrence - timedelta(hours=1), "end_time": future_occurrence}],
+            []
+        ]
+        mock_executor.run = AsyncMock(side_effect=SchedulerBusyError(retry_after=5))
+        request_data = RescheduleRequestDataModel(event_type="assignment", id=1, allow_overlaps=True, new_effort=150)
+        headers = {"Authorization": "Bearer mock_token"}
+        response = self.client.post("/reschedule", json=request_data.model_dump(mode='json'), headers=headers)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+        # Neither the future occurrence nor the parent record was touched, and the busy cache still has the occurrence
+        mock_connection.execute.assert_not_called()
+        mock_connection.transaction.assert_not_called()
+        # The occurrence being rescheduled didn't block its own task
+        assert mock_executor.run.call_args.kwargs["blocked_times"].intervals == []
+
     @patch('app.get_current_user')
     def test_reschedule_database_error(self, mock_get_current_user, mock_user):
         mock_get_current_user.return_value = mock_user
         mock_context = AsyncMock()
         mock_connection = AsyncMock()
+        mock_connection.transaction = MagicMock()
         mock_context.__aenter__.return_value = mock_connection
         mock_context.__aexit__.return_value = None
         self.mock_pool.acquire.return_value = mock_context
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+from busy_cache import BusyTimelineCache, MemoryVersionStore
+
+now = datetime(2025, 8, 10, 10, 0, 0, tzinfo=timezone.utc)
+
+
+def hours(start, end):
+    return (now + timedelta(hours=start), now + timedelta(hours=end))
+
+
+def test_entry_serves_ranges_it_covers_and_filters_to_them():
+    async def run():
+        cache = BusyTimelineCache()
+        assert await cache.get(1, *hours(0, 24)) is None
+        await cache.put(
+            1,
+            *hours(0, 24),
+            [hours(1, 2), hours(5, 6), hours(5, 6), hours(20, 21)],
+            await cache.version(1),
+        )
+        assert await cache.get(1, *hours(4, 12)) == [hours(5, 6), hours(5, 6)]
+        # Touching an interval isn't overlapping it, like the occurrence lookups
+        assert await cache.get(1, *hours(2, 5)) == []
+        assert await cache.get(1, *hours(12, 30)) is None
+        assert await cache.get(2, *hours(4, 12)) is None
+        assert cache.stats() == {"hits": 2, "misses": 3}
+
+    asyncio.run(run())
+
+
+def test_patches_keep_the_entry_current():
+    async def run():
+        cache = BusyTimelineCache()
+        await cache.put(
+            1, *hours(0, 24), [hours(1, 2), hours(5, 6)], await cache.version(1)
+        )
+        pst = timezone(timedelta(hours=-8))
+        await cache.add(
+            1, [(hours(8, 9)[0].astimezone(pst), hours(8, 9)[1].astimezone(pst))]
+        )
+        await cache.remove(1, [hours(1, 2)])
+        assert await cache.get(1, *hours(0, 24)) == [hours(5, 6), hours(8, 9)]
+        await cache.invalidate(1)
+        assert await cache.get(1, *hours(0, 24)) is None
+
+    asyncio.run(run())
+
+
+def test_batch_applies_a_request_s_changes_once_even_when_it_fails():
+    async def run():
+        versions = MemoryVersionStore()
+        cache = BusyTimelineCache(versions=versions)
+        await cache.put(
+            1, *hours(0, 24), [hours(1, 2), hours(5, 6)], await cache.version(1)
+        )
+        async with cache.batch(1) as (added, removed):
+            added.extend([hours(8, 9), hours(10, 11)])
+            removed.append(hours(1, 2))
+        assert await versions.get(1) == 1
+        assert await cache.get(1, *hours(0, 24)) == [
+            hours(5, 6),
+            hours(8, 9),
+            hours(10, 11),
+        ]
+        # The rows written before the failure are still in the cache
+        try:
+            async with cache.batch(1) as (added, removed):
+                added.append(hours(12, 13))
+                raise RuntimeError("connection lost")
+        except RuntimeError:
+            pass
+        assert await versions.get(1) == 2
+        assert hours(12, 13) in await cache.get(1, *hours(0, 24))
+        async with cache.batch(1):
+            pass
+        assert await versions.get(1) == 2
+
+    asyncio.run(run())
+
+
+def test_lookups_that_started_before_a_change_are_not_cached():
+    async def run():
+        cache = BusyTimelineCache()
+        version = await cache.version(1)
+        # A /setSchedule lands while a /schedule is still reading the occurrence tables
+        await cache.add(1, [hours(3, 4)])
+        await cache.put(1, *hours(0, 24), [hours(1, 2)], version)
+        assert await cache.get(1, *hours(0, 24)) is None
+        await cache.put(
+            1, *hours(0, 24), [hours(1, 2), hours(3, 4)], await cache.version(1)
+        )
+        assert await cache.get(1, *hours(0, 24)) == [hours(1, 2), hours(3, 4)]
+
+    asyncio.run(run())
+
+
+def test_changes_through_one_worker_outdate_the_entries_of_others():
+    async def run():
+        # Two worker processes, sharing their versions like they would through redis
+        versions = MemoryVersionStore()
+        first = BusyTimelineCache(versions=versions)
+        second = BusyTimelineCache(versions=versions)
+        for cache in (first, second):
+            await cache.put(1, *hours(0, 24), [hours(1, 2)], await cache.version(1))
+        await second.add(1, [hours(3, 4)])
+        assert await second.get(1, *hours(0, 24)) == [hours(1, 2), hours(3, 4)]
+        assert await first.get(1, *hours(0, 24)) is None
+        # A later change through the first worker can't patch its outdated entry back to current
+        await first.add(1, [hours(5, 6)])
+        assert await first.get(1, *hours(0, 24)) is None
+
+    asyncio.run(run())
+
+
+def test_disabled_cache_always_misses():
+    async def run():
+        cache = BusyTimelineCache(enabled=False)
+        await cache.put(1, *hours(0, 24), [hours(1, 2)], await cache.version(1))
+        assert await cache.get(1, *hours(0, 24)) is None
+
+    asyncio.run(run())
+
+
+def test_entries_expire():
+    async def run():
+        clock = [0.0]
+        cache = BusyTimelineCache(ttl=60, timer=lambda: clock[0])
+        await cache.put(1, *hours(0, 24), [hours(1, 2)], await cache.version(1))
+        clock[0] = 59
+        assert await cache.get(1, *hours(0, 24)) == [hours(1, 2)]
+        clock[0] = 61
+        assert await cache.get(1, *hours(0, 24)) is None
+
+    asyncio.run(run())
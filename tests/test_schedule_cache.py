@@ -0,0 +1,124 @@
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+from schedule_cache import (
+    ScheduleCache,
+    MemoryCacheBackend,
+    busy_version,
+    schedule_cache_key,
+)
+from data_models import ScheduleRequest, AssignmentInRequest, MeetingInRequest, Schedule
+
+now = datetime(2025, 8, 10, 10, 0, 0, tzinfo=timezone.utc)
+request = ScheduleRequest(
+    assignments=[
+        AssignmentInRequest(name="Essay", effort=120, due=now + timedelta(days=2))
+    ],
+    meetings=[],
+    chores=[],
+)
+empty_schedule = Schedule(
+    assignments=[],
+    chores=[],
+    conflicting_assignments=[],
+    conflicting_chores=[],
+    not_enough_time_assignments=[],
+    not_enough_time_chores=[],
+)
+
+
+def test_busy_version_ignores_order_duplicates_and_timezone():
+    a = (now, now + timedelta(hours=1))
+    b = (now + timedelta(hours=3), now + timedelta(hours=4))
+    pst = timezone(timedelta(hours=-8))
+    b_pst = (b[0].astimezone(pst), b[1].astimezone(pst))
+    assert busy_version([a, b]) == busy_version([b_pst, a, a])
+    assert busy_version([a, b]) != busy_version([a])
+
+
+def test_key_depends_on_request_user_tz_and_time_bucket():
+    busy = busy_version([])
+    key = schedule_cache_key(1, request, busy, now, 300)
+    assert key == schedule_cache_key(
+        1, request.model_copy(deep=True), busy, now + timedelta(seconds=299), 300
+    )
+    assert key != schedule_cache_key(
+        1, request, busy, now + timedelta(seconds=300), 300
+    )
+    assert key != schedule_cache_key(2, request, busy, now, 300)
+    assert key != schedule_cache_key(
+        1, request.model_copy(update={"tz_offset_minutes": 60}), busy, now, 300
+    )
+    assert key != schedule_cache_key(
+        1, request, busy_version([(now, now + timedelta(hours=1))]), now, 300
+    )
+    assert key != schedule_cache_key(
+        1, request, busy, now, 300, availability="template-version"
+    )
+
+
+def test_origin_is_the_bucket_boundary_every_request_of_the_bucket_shares():
+    cache = ScheduleCache(MemoryCacheBackend(), bucket_seconds=300)
+    busy = busy_version([])
+    pst = timezone(timedelta(hours=-8))
+    assert cache.origin(now) == now
+    for seconds in (0.5, 120, 299.999):
+        moment = (now + timedelta(seconds=seconds)).astimezone(pst)
+        assert cache.origin(moment) == now + timedelta(seconds=300)
+        assert cache.key(1, request, busy, cache.origin(moment)) == cache.key(
+            1, request, busy, now + timedelta(seconds=300)
+        )
+
+
+def test_key_ignores_meeting_details_beyond_busy_time():
+    meeting = MeetingInRequest(
+        name="Standup", start_end_times=[[now, now + timedelta(minutes=15)]]
+    )
+    with_meeting = request.model_copy(update={"meetings": [meeting]})
+    busy = busy_version([])
+    assert schedule_cache_key(1, request, busy, now, 300) == schedule_cache_key(
+        1, with_meeting, busy, now, 300
+    )
+
+
+def test_memory_backend_counts_hits_and_evicts_least_recently_used():
+    cache = ScheduleCache(MemoryCacheBackend(maxsize=2, ttl=60))
+
+    async def main():
+        assert await cache.get("a") is None
+        await cache.set("a", [empty_schedule])
+        await cache.set("b", [empty_schedule])
+        assert await cache.get("a") == [empty_schedule]
+        await cache.set("c", [empty_schedule])  # b is the least recently used entry
+        return await cache.get("b"), await cache.get("a")
+
+    evicted, kept = asyncio.run(main())
+    assert evicted is None and kept == [empty_schedule]
+    assert cache.stats() == {"hits": 2, "misses": 2}
+
+
+def test_memory_backend_expires_entries():
+    clock = [0.0]
+    cache = ScheduleCache(MemoryCacheBackend(maxsize=2, ttl=60, timer=lambda: clock[0]))
+    asyncio.run(cache.set("a", [empty_schedule]))
+    clock[0] = 59
+    assert asyncio.run(cache.get("a")) == [empty_schedule]
+    clock[0] = 61
+    assert asyncio.run(cache.get("a")) is None
+
+
+def test_failing_backend_is_a_miss():
+    class Broken:
+        async def get(self, key):
+            raise ConnectionError("down")
+
+        async def set(self, key, schedules):
+            raise ConnectionError("down")
+
+    cache = ScheduleCache(Broken())
+    asyncio.run(cache.set("a", [empty_schedule]))
+    assert asyncio.run(cache.get("a")) is None
+    assert cache.stats() == {"hits": 0, "misses": 1}
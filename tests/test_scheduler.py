@@ -1,11 +1,20 @@
 # test_scheduler.py
 
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
+import random
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
-from scheduler import schedule_tasks
-from data_models import AssignmentInRequest, ChoreInRequest, MeetingInRequest
+from scheduler import (
+    schedule_tasks, generate_available_slots, generate_free_intervals, merge_contiguous_slots,
+    Timeline, find_time_blocks, IntervalIndex, place_effort, place_in_window, regenerate_schedule,
+    place_in_units, granular_units, slot_runs, iter_schedules, WeeklyAvailability, DEFAULT_AVAILABILITY,
+    calc_xp_for_slot, calc_xp_for_slots, merge_intervals, subtract_intervals, place_candidate, improve_placement,
+    schedule_from_placement, _candidate_inputs,
+)
+import numpy as np
+from data_models import AssignmentInRequest, ChoreInRequest, MeetingInRequest, AvailabilityTemplate, WeeklyTimeBlock, Schedule
 import pytest
 
 now = datetime(2025, 8, 10, 10, 0, 0, tzinfo=timezone.utc)
@@ -268,3 +277,565 @@ def test_late_evening_boundary():
     assignments = [AssignmentInRequest(name="Night Owl", effort=30, due=late_now + timedelta(minutes=30))]
     schedule = schedule_tasks([], assignments, [], num_schedules=1, now=late_now)[0]
     assert schedule.assignments[0].schedule.status == "partially_scheduled"
+
+
+def reference_available_slots(meetings, from_time, to_time, tz_offset_minutes=0):
+    # The original minute-by-minute implementation, kept to check the interval engine against
+    step = timedelta(minutes=1)
+    slots = []
+    t = from_time
+    while t + step <= to_time:
+        local_start = t + timedelta(minutes=tz_offset_minutes)
+        if 7 <= local_start.hour < 23 and not any(
+            not (t + step <= m_start or t >= m_end) for m_start, m_end in meetings
+        ):
+            slots.append((t, t + step))
+        t += step
+    return slots
+
+@pytest.mark.parametrize("tz_offset", [0, -480, 330, 600])
+@pytest.mark.parametrize("seconds", [0, 17])
+def test_available_slots_match_reference(tz_offset, seconds):
+    rng = random.Random(tz_offset * 100 + seconds)
+    start = now.replace(second=seconds, microsecond=1234 if seconds else 0)
+    meetings = []
+    for _ in range(40):
+        m_start = start + timedelta(minutes=rng.randint(-120, 3 * 24 * 60), seconds=rng.randint(0, 59))
+        meetings.append((m_start, m_start + timedelta(minutes=rng.randint(0, 180), seconds=rng.randint(0, 59))))
+    end = start + timedelta(days=3, minutes=7)
+    assert generate_available_slots(meetings, start, end, tz_offset) == reference_available_slots(meetings, start, end, tz_offset)
+
+def test_free_intervals_are_merged_runs_of_slots():
+    meetings = [(now + timedelta(minutes=30), now + timedelta(minutes=90)), (now + timedelta(minutes=60), now + timedelta(minutes=120))]
+    free = generate_free_intervals(meetings, now, now + timedelta(hours=4))
+    assert free == [(now, now + timedelta(minutes=30)), (now + timedelta(minutes=120), now + timedelta(hours=4))]
+    assert merge_contiguous_slots(generate_available_slots(meetings, now, now + timedelta(hours=4))) == free
+
+def test_free_intervals_skip_night():
+    evening = datetime(2025, 8, 10, 22, 0, 0, tzinfo=timezone.utc)
+    free = generate_free_intervals([], evening, evening + timedelta(hours=10))
+    assert free == [(evening, evening + timedelta(hours=1)), (evening + timedelta(hours=9), evening + timedelta(hours=10))]
+
+def test_free_intervals_follow_dst_with_a_zone_name():
+    # The clocks in New York go forward on 2025-03-09, the 7AM-11PM band moves an hour earlier in UTC
+    start = datetime(2025, 3, 8, 0, 0, tzinfo=timezone.utc)
+    free = generate_free_intervals([], start, start + timedelta(days=3), tz_name="America/New_York")
+    assert free[1:] == [
+        (datetime(2025, 3, 8, 12, tzinfo=timezone.utc), datetime(2025, 3, 9, 4, tzinfo=timezone.utc)),
+        (datetime(2025, 3, 9, 11, tzinfo=timezone.utc), datetime(2025, 3, 10, 3, tzinfo=timezone.utc)),
+        (datetime(2025, 3, 10, 11, tzinfo=timezone.utc), datetime(2025, 3, 11, 0, tzinfo=timezone.utc)),
+    ]
+    # A fixed offset keeps winter time
+    fixed = generate_free_intervals([], start, start + timedelta(days=3), tz_offset_minutes=-300)
+    assert fixed[2] == (datetime(2025, 3, 9, 12, tzinfo=timezone.utc), datetime(2025, 3, 10, 4, tzinfo=timezone.utc))
+
+def test_schedules_with_a_fixed_offset_zone_name_match_the_offset():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=200, due=now + timedelta(days=2 + i)) for i in range(3)]
+    by_offset = schedule_tasks([], assignments, [], now=now, seed=4, tz_offset_minutes=-300)
+    by_name = schedule_tasks([], assignments, [], now=now, seed=4, tz_name="Etc/GMT+5")
+    assert [s.model_dump() for s in by_name] == [s.model_dump() for s in by_offset]
+
+@pytest.mark.parametrize("zone", [dict(tz_offset_minutes=330), dict(tz_name="America/New_York")])
+def test_default_availability_template_matches_the_default_hours(zone):
+    start = datetime(2025, 3, 1, 8, 30, 17, tzinfo=timezone.utc)
+    meetings = [(start + timedelta(hours=5), start + timedelta(hours=7))]
+    end = start + timedelta(days=90)
+    default = WeeklyAvailability(DEFAULT_AVAILABILITY)
+    assert generate_free_intervals(meetings, start, end, availability=default, **zone) == generate_free_intervals(meetings, start, end, **zone)
+
+def test_availability_template_hours_and_blackouts():
+    # Monday 9-12 and Tuesday 22:00 to Wednesday 2:00, except for Monday 10-11
+    template = AvailabilityTemplate(
+        available=[
+            WeeklyTimeBlock(weekday=0, start="09:00", end="12:00"),
+            WeeklyTimeBlock(weekday=1, start="22:00", end="00:00"),
+            WeeklyTimeBlock(weekday=2, start="00:00", end="02:00"),
+        ],
+        blackouts=[WeeklyTimeBlock(weekday=0, start="10:00", end="11:00")],
+    )
+    monday = datetime(2025, 8, 11, tzinfo=timezone.utc)
+    free = generate_free_intervals([], monday, monday + timedelta(days=7), availability=WeeklyAvailability(template))
+    assert free == [
+        (monday + timedelta(hours=9), monday + timedelta(hours=10)),
+        (monday + timedelta(hours=11), monday + timedelta(hours=12)),
+        (monday + timedelta(days=1, hours=22), monday + timedelta(days=2, hours=2)),
+    ]
+
+def test_availability_compiles_to_the_same_runs_however_many_rules():
+    one = AvailabilityTemplate(available=[WeeklyTimeBlock(weekday=3, start="08:00", end="18:00")])
+    many = AvailabilityTemplate(
+        available=[WeeklyTimeBlock(weekday=3, start=f"{h:02d}:00", end=f"{h + 1:02d}:30") for h in range(8, 17)]
+        + [WeeklyTimeBlock(weekday=3, start="12:00", end="18:00"), WeeklyTimeBlock(weekday=4, start="08:00", end="09:00")],
+        blackouts=[WeeklyTimeBlock(weekday=4, start="07:00", end="10:00")],
+    )
+    compiled_one, compiled_many = WeeklyAvailability(one), WeeklyAvailability(many)
+    assert compiled_one.version == compiled_many.version
+    assert compiled_many.runs.tolist() == [[480, 1080]]
+
+def test_schedules_only_use_available_hours():
+    template = AvailabilityTemplate(available=[WeeklyTimeBlock(weekday=w, start="18:00", end="21:00") for w in range(7)])
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=150, due=now + timedelta(days=3)) for i in range(2)]
+    for schedule in schedule_tasks([], assignments, [], now=now, seed=2, availability=WeeklyAvailability(template)):
+        assert all(a.schedule.status == "fully_scheduled" for a in schedule.assignments)
+        for a in schedule.assignments:
+            for slot in a.schedule.slots:
+                assert 18 <= slot.start.hour and slot.end <= slot.start.replace(hour=21, minute=0, second=0)
+
+def test_timeline_bitmap_matches_available_slots():
+    meetings = [(now + timedelta(minutes=45), now + timedelta(minutes=75))]
+    start = now.replace(second=30)
+    timeline = Timeline(meetings, start, start + timedelta(days=2), tz_offset_minutes=-300)
+    slots = generate_available_slots(meetings, start, start + timedelta(days=2), tz_offset_minutes=-300)
+    assert timeline.free.dtype == bool and timeline.free.sum() == len(slots)
+    assert [(timeline.slot_start(k), timeline.slot_start(k + 1)) for k in timeline.available] == slots
+
+def test_timeline_slot_range_is_inside_window():
+    timeline = Timeline([], now, now + timedelta(hours=5))
+    lo, hi = timeline.slot_range(now + timedelta(seconds=30), now + timedelta(minutes=90, seconds=30))
+    assert timeline.slot_start(lo) >= now + timedelta(seconds=30)
+    assert timeline.slot_start(hi) <= now + timedelta(minutes=90, seconds=30)
+    assert (lo, hi) == (1, 90)
+
+def reference_find_time_blocks(effort_minutes, available_slots, used_slots, skip_prob=0.0):
+    # The original minute-by-minute placement loop, kept to check the vectorized version against
+    scheduled, i, n, last_skip_idx = [], 0, len(available_slots), -9999
+    while i < n and len(scheduled) < effort_minutes:
+        slot = available_slots[i]
+        if slot in used_slots:
+            i += 1
+            continue
+        if skip_prob > 0.0 and slot[0].minute % 30 == 0 and i - last_skip_idx >= 30 and random.random() < skip_prob:
+            skip_time = slot[0].replace(second=0, microsecond=0) + timedelta(hours=2)
+            next_idx = next((j for j in range(i + 1, n) if (available_slots[j][0].hour, available_slots[j][0].minute) >= (skip_time.hour, skip_time.minute) and available_slots[j] not in used_slots), None)
+            if next_idx is not None:
+                last_skip_idx = i = next_idx
+                continue
+        scheduled.append(slot)
+        i += 1
+    if len(scheduled) < effort_minutes and skip_prob > 0.0:
+        return reference_find_time_blocks(effort_minutes, available_slots, used_slots, 0.0)
+    return scheduled
+
+@pytest.mark.parametrize("seed", range(25))
+def test_find_time_blocks_matches_reference(seed):
+    rng = random.Random(seed)
+    start = now.replace(hour=rng.randint(0, 23), minute=rng.randint(0, 59), second=rng.choice([0, 42]))
+    slots = generate_available_slots([], start, start + timedelta(days=rng.randint(1, 3)), rng.choice([0, -300, 330]))
+    used = set(rng.sample(slots, k=len(slots) // 4))
+    effort, skip_prob = rng.randint(1, 1200), rng.choice([0.0, 0.3, 0.9, 1.0])
+    random.seed(seed)
+    expected = reference_find_time_blocks(effort, slots, used, skip_prob)
+    random.seed(seed)
+    assert find_time_blocks(effort, slots, used, skip_prob) == expected
+
+@pytest.mark.parametrize("seed", range(20))
+def test_place_in_window_matches_eager_filtering(seed):
+    rng = random.Random(seed)
+    timeline = Timeline([], now, now + timedelta(days=rng.randint(2, 8)), rng.choice([0, -300, 330]))
+    used = np.zeros(len(timeline), dtype=bool)
+    used[rng.sample(range(len(timeline)), k=len(timeline) // rng.choice([2, 4, 10]))] = True
+    lo, hi = sorted(rng.sample(range(len(timeline) + 1), k=2))
+    effort, skip_prob = rng.randint(1, 3000), rng.choice([0.0, 0.3, 0.9, 1.0])
+    window = timeline.available[(timeline.available >= lo) & (timeline.available < hi)]
+    window = window[~used[window]]
+    expected = window[place_effort(effort, timeline.wall_minutes(window), skip_prob, rng=random.Random(seed))]
+    got = place_in_window(effort, timeline, lo, hi, used, skip_prob, rng=random.Random(seed))
+    assert got.tolist() == expected.tolist()
+
+def test_timeline_pages_match_the_bitmap():
+    rng = random.Random(3)
+    meetings = [create_slot(rng.randint(0, 40000), rng.randint(5, 300)) for _ in range(60)]
+    eager = np.flatnonzero(Timeline(meetings, now, now + timedelta(days=30), -300).free)
+    timeline = Timeline(meetings, now, now + timedelta(days=30), -300)
+    for _ in range(50):
+        lo, hi = sorted(rng.sample(range(len(timeline) + 1), k=2))
+        assert timeline.available_in(lo, hi).tolist() == eager[(eager >= lo) & (eager < hi)].tolist()
+
+def test_place_in_window_pages_in_only_what_it_needs():
+    timeline = Timeline([], now, now + timedelta(days=365))
+    used = np.zeros(len(timeline), dtype=bool)
+    got = place_in_window(120, timeline, 0, len(timeline), used)
+    assert len(got) == 120
+    assert timeline._paged_to < len(timeline) // 10
+
+def test_blockers_past_the_last_deadline_do_not_change_schedules():
+    assignments = [AssignmentInRequest(name="Essay", effort=200, due=now + timedelta(days=3))]
+    later = [MeetingInRequest(name="Trip", start_end_times=[create_slot(5000 + 600 * i, 120) for i in range(50)])]
+    expected = schedule_tasks([], assignments, [], now=now, seed=6)
+    assert [s.model_dump() for s in schedule_tasks(later, assignments, [], now=now, seed=6)] == [s.model_dump() for s in expected]
+
+def test_granular_units_split_at_clock_multiples():
+    # Run from minute 7 to 52 past an hour whose start is wall minute 600: units start on the clock, the last one
+    # ends with the run
+    lo, hi = granular_units(np.array([[7, 52], [60, 90]]), np.array([607, 660]), 15)
+    assert list(zip(lo.tolist(), hi.tolist())) == [(15, 30), (30, 45), (45, 52), (60, 75), (75, 90)]
+
+@pytest.mark.parametrize("seed", range(15))
+def test_place_in_units_at_one_minute_matches_place_in_window(seed):
+    rng = random.Random(seed)
+    meetings = [create_slot(m, rng.randint(5, 90)) for m in rng.sample(range(4 * 1440), k=rng.randint(0, 20))]
+    timeline = Timeline(meetings, now, now + timedelta(days=4), rng.choice([0, -300, 330]))
+    used, taken = np.zeros(len(timeline), dtype=bool), []
+    for _ in range(5):
+        lo, hi = sorted(rng.sample(range(len(timeline) + 1), k=2))
+        effort, skip_prob, stream = rng.randint(1, 1500), rng.choice([0.0, 0.4, 1.0]), rng.getrandbits(32)
+        expected = place_in_window(effort, timeline, lo, hi, used, skip_prob, rng=random.Random(stream))
+        got = place_in_units(effort, timeline, lo, hi, taken, 1, skip_prob, rng=random.Random(stream))
+        assert got.tolist() == expected.tolist()
+        used[expected] = True
+        taken = sorted(taken + slot_runs(expected))
+
+@pytest.mark.parametrize("seed", range(10))
+def test_place_in_units_matches_placing_on_the_units_of_the_runs_left_free(seed):
+    rng = random.Random(seed)
+    meetings = [create_slot(m, rng.randint(5, 90)) for m in rng.sample(range(4 * 1440), k=rng.randint(0, 20))]
+    timeline = Timeline(meetings, now, now + timedelta(days=4), rng.choice([0, -300, 330]))
+    granularity, taken = rng.choice([5, 15, 30]), []
+    for _ in range(6):
+        lo, hi = sorted(rng.sample(range(len(timeline) + 1), k=2))
+        effort, skip_prob, stream = rng.randint(1, 900), rng.choice([0.0, 0.4, 1.0]), rng.getrandbits(32)
+        # What the unit index saves: splitting the window's free runs, minus the taken slots, on every call
+        runs = np.array(subtract_intervals([tuple(r) for r in timeline.free_runs(lo, hi).tolist()], taken)).reshape(-1, 2)
+        expected = []
+        if len(runs):
+            unit_lo, unit_hi = granular_units(runs, timeline.local_minutes(runs[:, 0]), granularity)
+            chosen = place_effort(effort, timeline.wall_minutes(unit_lo), skip_prob, rng=random.Random(stream), weights=unit_hi - unit_lo)
+            expected = [k for u in chosen for k in range(unit_lo[u], unit_hi[u])][:effort]
+        got = place_in_units(effort, timeline, lo, hi, taken, granularity, skip_prob, rng=random.Random(stream))
+        assert got.tolist() == expected
+        taken = merge_intervals(taken + slot_runs(got))
+
+@pytest.mark.parametrize("granularity", [5, 15, 30])
+def test_coarse_granularity_places_clock_aligned_blocks(granularity):
+    meetings = [MeetingInRequest(name="Sync", start_end_times=[[now + timedelta(minutes=7), now + timedelta(minutes=52)]])]
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=100 + 7 * i, due=now + timedelta(hours=10)) for i in range(3)]
+    meeting_end = now + timedelta(minutes=52)
+    for schedule in schedule_tasks(meetings, assignments, [], now=now, granularity=granularity, seed=3):
+        edges = {now, meeting_end} | {slot.end for a in schedule.assignments for slot in a.schedule.slots}
+        for a in schedule.assignments:
+            assert a.schedule.effort_assigned == a.effort
+            assert sum((slot.end - slot.start).seconds // 60 for slot in a.schedule.slots) == a.effort
+            for slot in a.schedule.slots:
+                assert not (slot.start < meeting_end and slot.end > now + timedelta(minutes=7))
+                # Blocks start on the clock grid, unless they start where free time does
+                assert slot.start.minute % granularity == 0 or slot.start in edges
+
+@pytest.mark.parametrize("strategy", ["greedy", "edf"])
+def test_coarse_blocks_start_on_the_local_clock(strategy):
+    # Nepal is UTC+5:45, and the request comes in mid-minute, 17 minutes off the user's half-hour grid
+    start = now + timedelta(minutes=2, seconds=17)
+    meetings = [MeetingInRequest(name="Sync", start_end_times=[[start + timedelta(minutes=41), start + timedelta(minutes=88)]])]
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=100 + 7 * i, due=start + timedelta(hours=30)) for i in range(3)]
+    chores = [ChoreInRequest(name="Laundry", effort=40, window=[start, start + timedelta(hours=20)])]
+    for schedule in schedule_tasks(meetings, assignments, chores, now=start, granularity=30, seed=3, tz_offset_minutes=345, strategy=strategy):
+        for task in schedule.assignments + schedule.chores:
+            for slot in task.schedule.slots:
+                local = slot.start + timedelta(minutes=345)
+                assert (local.minute % 30, local.second) == (0, 0)
+
+def test_schedules_are_reproducible_with_fixed_seed():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=45, due=now + timedelta(hours=6 + i)) for i in range(4)]
+    chores = [ChoreInRequest(name="Laundry", effort=30, window=create_slot(60, 300))]
+    random.seed(7)
+    first = schedule_tasks([], assignments, chores, now=now)
+    random.seed(7)
+    second = schedule_tasks([], assignments, chores, now=now)
+    assert [s.model_dump() for s in first] == [s.model_dump() for s in second]
+
+def test_process_pool_matches_sequential_in_order():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=90, due=now + timedelta(hours=8 + i)) for i in range(3)]
+    meetings = [MeetingInRequest(name="Sync", start_end_times=[create_slot(120, 60)])]
+    random.seed(3)
+    sequential = schedule_tasks(meetings, assignments, [], now=now)
+    random.seed(3)
+    parallel = schedule_tasks(meetings, assignments, [], now=now, max_workers=3)
+    assert len(parallel) == 11
+    assert [s.model_dump() for s in parallel] == [s.model_dump() for s in sequential]
+
+def test_long_lived_pool_matches_sequential_across_requests():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=90, due=now + timedelta(hours=8 + i)) for i in range(3)]
+    meetings = [MeetingInRequest(name="Sync", start_end_times=[create_slot(120, 60)])]
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        for seed in (3, 4):
+            kwargs = dict(now=now, seed=seed, dedupe=True, extra_candidates=4)
+            sequential = schedule_tasks(meetings, assignments, [], **kwargs)
+            parallel = schedule_tasks(meetings, assignments, [], **kwargs, max_workers=2, pool=pool)
+            assert [s.model_dump() for s in parallel] == [s.model_dump() for s in sequential]
+        # Leaving early doesn't take the pool down with it
+        next(iter_schedules(meetings, assignments, [], now=now, seed=5, max_workers=2, pool=pool))
+        assert len(schedule_tasks(meetings, assignments, [], now=now, seed=5, max_workers=2, pool=pool)) == 11
+
+def test_request_seed_fixes_schedules_without_global_state():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=60, due=now + timedelta(hours=5 + i)) for i in range(5)]
+    random.seed(1)
+    first = schedule_tasks([], assignments, [], now=now, seed=42)
+    random.seed(2)
+    second = schedule_tasks([], assignments, [], now=now, seed=42)
+    assert [s.model_dump() for s in first] == [s.model_dump() for s in second]
+    assert len({s.seed for s in first}) == 11
+    assert [s.skip_prob for s in first] == [i / 10 for i in range(11)]
+    assert all(s.seed < 2 ** 53 for s in first)
+
+def test_regenerate_schedule_rebuilds_one_candidate():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=75, due=now + timedelta(hours=9 + i)) for i in range(3)]
+    chores = [ChoreInRequest(name="Dishes", effort=20, window=create_slot(30, 240))]
+    meetings = [MeetingInRequest(name="Sync", start_end_times=[create_slot(90, 45)])]
+    schedules = schedule_tasks(meetings, assignments, chores, now=now, seed=5)
+    for schedule in (schedules[3], schedules[8]):
+        rebuilt = regenerate_schedule(meetings, assignments, chores, schedule.seed, schedule.skip_prob, now)
+        assert rebuilt.model_dump() == schedule.model_dump()
+
+def test_iter_schedules_yields_the_same_schedules_lazily():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=60, due=now + timedelta(hours=5 + i)) for i in range(3)]
+    schedules = iter_schedules([], assignments, [], now=now, seed=11)
+    first = next(schedules)
+    rest = list(schedules)
+    expected = schedule_tasks([], assignments, [], now=now, seed=11)
+    assert [s.model_dump() for s in [first] + rest] == [s.model_dump() for s in expected]
+
+def test_dedupe_drops_candidates_with_the_same_layout():
+    assignments = [AssignmentInRequest(name="Quiz", effort=20, due=now + timedelta(days=2))]
+    everything = schedule_tasks([], assignments, [], now=now, seed=4)
+    distinct = schedule_tasks([], assignments, [], now=now, seed=4, dedupe=True)
+    assert len(everything) == 11
+    assert [s.fingerprint for s in distinct] == list(dict.fromkeys(s.fingerprint for s in everything))
+    assert [s.model_dump() for s in distinct] == [s.model_dump() for s in everything if s.seed in {d.seed for d in distinct}]
+
+def test_extra_candidates_make_up_for_duplicates():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=150, due=now + timedelta(days=3)) for i in range(2)]
+    base = schedule_tasks([], assignments, [], now=now, seed=8, dedupe=True)
+    topped_up = schedule_tasks([], assignments, [], now=now, seed=8, dedupe=True, extra_candidates=30)
+    assert len(base) < 11
+    assert len(base) < len(topped_up) <= 11
+    assert len({s.fingerprint for s in topped_up}) == len(topped_up)
+    assert [s.fingerprint for s in topped_up[:len(base)]] == [s.fingerprint for s in base]
+
+def test_schedules_match_a_validated_round_trip():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=70, due=now + timedelta(hours=8 + i)) for i in range(3)]
+    chores = [ChoreInRequest(name="Laundry", effort=30, window=create_slot(60, 300))]
+    for schedule in schedule_tasks([], assignments, chores, now=now, seed=9):
+        assert Schedule.model_validate_json(schedule.model_dump_json()) == schedule
+        assert all(type(slot.xp_potential) is int for a in schedule.assignments for slot in a.schedule.slots)
+
+def test_vectorized_xp_matches_calc_xp_for_slot():
+    rng = random.Random(21)
+    start = now.replace(second=17, microsecond=250)
+    slots, dues = [], []
+    for _ in range(3000):
+        lo = start + timedelta(minutes=rng.randint(0, 3000), microseconds=rng.choice([0, rng.randint(0, 10**6)]))
+        slots.append((lo, lo + timedelta(minutes=rng.randint(0, 400))))
+        # Some due before now or before the slot ends, some at exactly twice the time to the slot's end (ties)
+        dues.append(rng.choice([
+            start + timedelta(minutes=rng.randint(-60, 4000)),
+            lo + timedelta(minutes=rng.randint(0, 5)),
+            start + 2 * (slots[-1][1] - start),
+        ]))
+    to_us = lambda t: (t - start) // timedelta(microseconds=1)
+    vectorized = calc_xp_for_slots(
+        np.array([to_us(lo) for lo, _ in slots]), np.array([to_us(hi) for _, hi in slots]), np.array([to_us(d) for d in dues]), 0
+    )
+    assert vectorized.tolist() == [calc_xp_for_slot(lo, hi, 60, due, start) for (lo, hi), due in zip(slots, dues)]
+
+def test_merge_contiguous_slots_matches_sorting_merge():
+    def reference(slots):
+        merged = []
+        for start, end in sorted(slots, key=lambda x: x[0]):
+            if merged and start == merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+    slots = generate_available_slots([(now + timedelta(minutes=30), now + timedelta(minutes=95))], now, now + timedelta(days=2))
+    shuffled = random.Random(3).sample(slots, k=len(slots))
+    assert merge_contiguous_slots(slots) == reference(slots)
+    assert merge_contiguous_slots(shuffled) == reference(shuffled) == reference(slots)
+
+@pytest.mark.parametrize("granularity", [1, 15])
+def test_schedule_xp_matches_per_slot_calculation(granularity):
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=45 + 40 * i, due=now + timedelta(hours=6 + 9 * i, seconds=13)) for i in range(4)]
+    chores = [ChoreInRequest(name="Laundry", effort=50, window=create_slot(90, 600))]
+    start = now.replace(second=41)
+    for schedule in schedule_tasks([], assignments, chores, now=start, seed=5, granularity=granularity, tz_offset_minutes=-300):
+        total = 0
+        for task in schedule.assignments + schedule.chores:
+            due = task.due if isinstance(task, AssignmentInRequest) else task.window[1]
+            for slot in task.schedule.slots:
+                assert slot.xp_potential == calc_xp_for_slot(slot.start, slot.end, task.effort, due, start)
+                total += slot.xp_potential
+        assert schedule.total_potential_xp == total
+
+def test_edf_packs_a_schedule_that_just_fits():
+    # 290 of the 300 free minutes are needed, in deadline order with the chore preempting the long task
+    assignments = [
+        AssignmentInRequest(name="Long", effort=200, due=now + timedelta(hours=5)),
+        AssignmentInRequest(name="Short", effort=60, due=now + timedelta(hours=2)),
+    ]
+    chores = [ChoreInRequest(name="Dishes", effort=30, window=create_slot(90, 60))]
+    for schedule in schedule_tasks([], assignments, chores, now=now, seed=2, strategy="edf"):
+        assert [a.schedule.status for a in schedule.assignments + schedule.chores] == ["fully_scheduled"] * 3
+        slots = sorted((slot.start, slot.end) for t in schedule.assignments + schedule.chores for slot in t.schedule.slots)
+        assert all(a[1] <= b[0] for a, b in zip(slots, slots[1:]))
+        assert schedule.chores[0].schedule.slots[0].start >= now + timedelta(minutes=90)
+
+def test_edf_reports_what_does_not_fit():
+    meetings = [MeetingInRequest(name="Exam", start_end_times=[create_slot(0, 60)])]
+    assignments = [
+        AssignmentInRequest(name="Blocked", effort=30, due=now + timedelta(minutes=60)),
+        AssignmentInRequest(name="Tight", effort=120, due=now + timedelta(minutes=150)),
+    ]
+    schedule = schedule_tasks(meetings, assignments, [], now=now, seed=2, strategy="edf", num_schedules=1)[0]
+    assert schedule.conflicting_assignments == ["Blocked"]
+    assert schedule.not_enough_time_assignments == ["Tight"]
+    assert schedule.assignments[1].schedule.effort_assigned == 90
+
+@pytest.mark.parametrize("granularity", [1, 15])
+def test_edf_matches_across_pool_and_regeneration(granularity):
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=70 + 13 * i, due=now + timedelta(hours=6 + 3 * i)) for i in range(4)]
+    chores = [ChoreInRequest(name="Laundry", effort=45, window=create_slot(200, 240))]
+    meetings = [MeetingInRequest(name="Sync", start_end_times=[create_slot(37, 50), create_slot(400, 25)])]
+    sequential = schedule_tasks(meetings, assignments, chores, now=now, seed=5, strategy="edf", granularity=granularity)
+    parallel = schedule_tasks(meetings, assignments, chores, now=now, seed=5, strategy="edf", granularity=granularity, max_workers=3)
+    assert [s.model_dump() for s in parallel] == [s.model_dump() for s in sequential]
+    rebuilt = regenerate_schedule(meetings, assignments, chores, sequential[4].seed, sequential[4].skip_prob, now, granularity=granularity, strategy="edf")
+    assert rebuilt.model_dump() == sequential[4].model_dump()
+
+@pytest.mark.parametrize("seed", [12, 14])
+@pytest.mark.parametrize("granularity", [1, 15])
+def test_xp_search_keeps_schedules_valid_and_never_loses_xp(granularity, seed):
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=60 + 25 * i, due=now + timedelta(hours=9 + 5 * i)) for i in range(4)]
+    chores = [ChoreInRequest(name="Laundry", effort=40, window=create_slot(120, 300))]
+    meetings = [MeetingInRequest(name="Sync", start_end_times=[create_slot(47, 50), create_slot(500, 40)])]
+    busy = [(s, e) for m in meetings for s, e in m.start_end_times]
+    plain = schedule_tasks(meetings, assignments, chores, now=now, seed=seed, granularity=granularity, dedupe=True)
+    searched = schedule_tasks(meetings, assignments, chores, now=now, seed=seed, granularity=granularity, dedupe=True, search_ms=60)
+    xps = [s.total_potential_xp for s in searched]
+    assert xps == sorted(xps, reverse=True) and xps[0] >= max(s.total_potential_xp for s in plain)
+    assert len({s.fingerprint for s in searched}) == len(searched)
+    # The search moves work around but never changes how much of it each task got
+    efforts = {frozenset((t.name, t.schedule.effort_assigned) for t in s.assignments + s.chores) for s in plain}
+    for schedule in searched:
+        assert frozenset((t.name, t.schedule.effort_assigned) for t in schedule.assignments + schedule.chores) in efforts
+        slots = sorted((slot.start, slot.end) for t in schedule.assignments + schedule.chores for slot in t.schedule.slots)
+        assert all(a[1] <= b[0] for a, b in zip(slots, slots[1:]))
+        assert not any(s < be and e > bs for s, e in slots for bs, be in busy)
+        for a in schedule.assignments:
+            assert all(now <= slot.start and slot.end <= a.due for slot in a.schedule.slots)
+        if granularity > 1:
+            edges = {now} | {e for _, e in busy} | {e for _, e in slots}
+            assert all(s.minute % granularity == 0 or s in edges for s, _ in slots)
+
+def test_xp_search_keeps_an_exact_running_total():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=45 + 30 * i, due=now + timedelta(hours=6 + 4 * i)) for i in range(5)]
+    inputs = _candidate_inputs([], assignments, [], now)
+    placement = place_candidate(0.7, 3, **inputs)
+    start = schedule_from_placement(placement, 0.7, 3, inputs["timeline"], assignments, [], now)
+    better, xp = improve_placement(placement, **inputs, budget_seconds=0.05, rng=random.Random(1))
+    rebuilt = schedule_from_placement(better, None, None, inputs["timeline"], assignments, [], now)
+    assert xp == rebuilt.total_potential_xp >= start.total_potential_xp
+
+def test_interval_index_reports_each_clash():
+    blocks = IntervalIndex([create_slot(0, 60), create_slot(120, 30), create_slot(300, 10)])
+    queries = [create_slot(30, 100), create_slot(60, 60), create_slot(150, 0), create_slot(305, 0), create_slot(400, 5)]
+    # Touching intervals and zero-length occurrences on a boundary don't clash
+    assert sorted(blocks.overlaps(queries)) == [(0, 0), (0, 1), (3, 2)]
+
+def test_interval_index_matches_pairwise_check():
+    rng = random.Random(5)
+    blocks = [create_slot(rng.randint(0, 2000), rng.randint(0, 90)) for _ in range(150)]
+    queries = [create_slot(rng.randint(0, 2000), rng.randint(0, 90)) for _ in range(80)]
+    expected = {
+        (q, b) for q, (qs, qe) in enumerate(queries) for b, (bs, be) in enumerate(blocks)
+        if not (qe <= bs or qs >= be)
+    }
+    assert set(IntervalIndex(blocks).overlaps(queries)) == expected
+
+def test_blocked_times_are_treated_like_meetings():
+    assignments = [AssignmentInRequest(name="A", effort=60, due=now + timedelta(hours=3))]
+    blocked = [create_slot(0, 45), create_slot(90, 30)]
+    random.seed(1)
+    with_index = schedule_tasks([], assignments, [], now=now, blocked_times=IntervalIndex(blocked))
+    random.seed(1)
+    as_meeting = schedule_tasks([MeetingInRequest(name="busy", start_end_times=blocked)], assignments, [], now=now)
+    assert [s.model_dump() for s in with_index] == [s.model_dump() for s in as_meeting]
+
+def test_candidates_share_the_timeline_as_meeting_baseline():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=90, due=now + timedelta(hours=8)) for i in range(3)]
+    meetings = [MeetingInRequest(name="busy", start_end_times=[create_slot(30, 45)])]
+    inputs = _candidate_inputs(meetings, assignments, [], now, blocked_times=IntervalIndex([create_slot(200, 20)]))
+    timeline = inputs["timeline"]
+    assert set(inputs) == {"timeline", "assignments", "chores", "now", "granularity"}
+    before = timeline.free.copy()
+    for i in range(3):
+        placement = place_candidate(i / 2, i, **inputs)
+        assert sum(hi - lo for p in placement for lo, hi in p.runs) == 270
+        # Nothing lands on the meeting or the blocked time, which only the timeline leaves out
+        assert all(timeline.free[lo:hi].all() for p in placement for lo, hi in p.runs)
+    assert np.array_equal(timeline.free, before)
+
+@pytest.mark.parametrize("granularity", [1, 15])
+def test_min_session_coalesces_short_fragments(granularity):
+    rng = random.Random(3)
+    # Short meetings at any minute chop the day into small gaps
+    busy = [create_slot(m, rng.randint(5, 20)) for m in sorted(rng.sample(range(0, 2000), 60))]
+    meetings = [MeetingInRequest(name=f"M{i}", start_end_times=[slot]) for i, slot in enumerate(busy)]
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=60 + 35 * i, due=now + timedelta(hours=20 + 4 * i)) for i in range(5)]
+    chores = [ChoreInRequest(name="Laundry", effort=50, window=create_slot(300, 600))]
+    kwargs = dict(now=now, seed=7, granularity=granularity)
+    plain = schedule_tasks(meetings, assignments, chores, **kwargs)
+    coalesced = schedule_tasks(meetings, assignments, chores, **kwargs, min_session_minutes=25)
+    assert sum(s.fragment_count for s in coalesced) < sum(s.fragment_count for s in plain)
+    for before, schedule in zip(plain, coalesced):
+        tasks = schedule.assignments + schedule.chores
+        slots = sorted((slot.start, slot.end) for t in tasks for slot in t.schedule.slots)
+        assert schedule.fragment_count == len(slots)
+        assert all(a[1] <= b[0] for a, b in zip(slots, slots[1:]))
+        assert not any(s < be and e > bs for s, e in slots for bs, be in busy)
+        # Minutes that can't be merged anywhere are dropped, never added
+        for old, new in zip(before.assignments + before.chores, tasks):
+            assert new.schedule.effort_assigned <= old.schedule.effort_assigned
+        for t in tasks:
+            window = (now, t.due) if hasattr(t, "due") else tuple(t.window)
+            assert all(window[0] <= slot.start and slot.end <= window[1] for slot in t.schedule.slots)
+            if granularity == 1 and len(t.schedule.slots) > 1:
+                shortest = min(25, t.schedule.effort_assigned)
+                assert all(slot.end - slot.start >= timedelta(minutes=shortest) for slot in t.schedule.slots)
+        if granularity > 1:
+            edges = {now} | {e for _, e in busy} | {e for _, e in slots}
+            assert all(s.minute % granularity == 0 or s in edges for s, _ in slots)
+
+def test_min_session_matches_across_pool_and_regeneration():
+    assignments = [AssignmentInRequest(name=f"A{i}", effort=50 + 20 * i, due=now + timedelta(hours=5 + 2 * i)) for i in range(4)]
+    meetings = [MeetingInRequest(name="Sync", start_end_times=[create_slot(17 + 45 * i, 10) for i in range(8)])]
+    kwargs = dict(now=now, seed=4, min_session_minutes=30)
+    sequential = schedule_tasks(meetings, assignments, [], **kwargs)
+    parallel = schedule_tasks(meetings, assignments, [], **kwargs, max_workers=3)
+    assert [s.model_dump() for s in parallel] == [s.model_dump() for s in sequential]
+    rebuilt = regenerate_schedule(meetings, assignments, [], sequential[3].seed, sequential[3].skip_prob, now, min_session_minutes=30)
+    assert rebuilt.model_dump() == sequential[3].model_dump()
+
+def test_free_capacity_index_matches_the_free_bitmap():
+    rng = random.Random(8)
+    busy = [create_slot(rng.randint(0, 4000), rng.randint(5, 120)) for _ in range(40)]
+    timeline = Timeline(busy, now, now + timedelta(days=4), tz_offset_minutes=-300)
+    free_before = np.concatenate(([0], np.cumsum(timeline.free)))
+    for _ in range(300):
+        lo, hi = sorted(rng.randint(0, len(timeline)) for _ in range(2))
+        assert timeline.free_count(lo, hi) == free_before[hi] - free_before[lo]
+        count = rng.randint(1, 600)
+        end = timeline.slot_after_free(lo, count, hi)
+        if free_before[hi] - free_before[lo] < count:
+            assert end == hi
+        else:
+            # The first slot at which count free slots have been passed
+            assert free_before[end] - free_before[lo] == count and timeline.free[end - 1]
+    assert timeline.free_minutes(now - timedelta(hours=1), now + timedelta(days=5)) == int(timeline.free.sum())
+
+def test_windows_without_free_time_are_skipped():
+    assignments = [
+        AssignmentInRequest(name="Overnight", effort=30, due=now.replace(hour=23, minute=50) + timedelta(hours=7)),
+        AssignmentInRequest(name="Soon", effort=30, due=now + timedelta(minutes=20)),
+    ]
+    # Due before any free time once the meeting and the night are left out
+    meetings = [MeetingInRequest(name="Exam", start_end_times=[create_slot(0, 13 * 60)])]
+    for schedule in schedule_tasks(meetings, assignments, [], now=now, seed=3):
+        assert [a.schedule.status for a in schedule.assignments] == ["unschedulable"] * 2
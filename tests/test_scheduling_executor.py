@@ -0,0 +1,138 @@
+import asyncio
+import sys
+import os
+import threading
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+from scheduling_executor import (
+    SchedulingExecutor,
+    SchedulerBusyError,
+    SchedulingTimeoutError,
+)
+
+
+def test_run_returns_result_from_worker_thread():
+    executor = SchedulingExecutor(workers=1, queue_size=0)
+    thread_name = asyncio.run(executor.run(lambda: threading.current_thread().name))
+    assert thread_name.startswith("scheduler")
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+def test_event_loop_keeps_running_during_job():
+    executor = SchedulingExecutor(workers=1, queue_size=0)
+
+    async def main():
+        ticks = 0
+        job = asyncio.ensure_future(executor.run(time.sleep, 0.2))
+        while not job.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        return ticks
+
+    assert asyncio.run(main()) > 5
+    executor.shutdown()
+
+
+def test_full_queue_is_rejected():
+    executor = SchedulingExecutor(workers=1, queue_size=1, retry_after=7)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(SchedulerBusyError) as busy:
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(running, queued)
+        return busy.value.retry_after
+
+    assert asyncio.run(main()) == 7
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+def test_timeout_keeps_slot_until_job_finishes():
+    executor = SchedulingExecutor(workers=1, queue_size=0, timeout=0.05)
+    release = threading.Event()
+
+    async def main():
+        with pytest.raises(SchedulingTimeoutError):
+            await executor.run(release.wait)
+        # The abandoned job is still running, so there is no room for another one
+        with pytest.raises(SchedulerBusyError):
+            await executor.run(lambda: None)
+        release.set()
+        await asyncio.sleep(0.05)
+        return await executor.run(lambda: "done")
+
+    assert asyncio.run(main()) == "done"
+    executor.shutdown()
+
+
+def test_stream_delivers_items_before_job_finishes():
+    executor = SchedulingExecutor(workers=1, queue_size=0)
+    release = threading.Event()
+
+    def produce():
+        yield 1
+        release.wait()
+        yield 2
+
+    async def main():
+        items = executor.stream(produce)
+        first = await items.__anext__()
+        release.set()
+        return [first] + [item async for item in items]
+
+    assert asyncio.run(main()) == [1, 2]
+    executor.shutdown()
+
+
+def test_stream_rejects_when_busy_and_reraises_job_errors():
+    executor = SchedulingExecutor(workers=1, queue_size=0)
+    release = threading.Event()
+
+    def failing():
+        yield "partial"
+        release.wait()
+        raise ValueError("bad input")
+
+    async def main():
+        items = executor.stream(failing)
+        with pytest.raises(SchedulerBusyError):
+            executor.stream(failing)
+        release.set()
+        received = []
+        with pytest.raises(ValueError):
+            async for item in items:
+                received.append(item)
+        return received
+
+    assert asyncio.run(main()) == ["partial"]
+    executor.shutdown()
+
+
+def test_stream_stops_job_when_consumer_leaves():
+    executor = SchedulingExecutor(workers=1, queue_size=0)
+    produced = []
+
+    def produce():
+        for i in range(1000):
+            produced.append(i)
+            time.sleep(0.001)
+            yield i
+
+    async def main():
+        items = executor.stream(produce)
+        await items.__anext__()
+        await items.aclose()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert len(produced) < 1000
+    assert executor.pending == 0
+    executor.shutdown()
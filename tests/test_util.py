@@ -4,7 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 's
 from util import *
 from data_models import AssignmentInRequest, ChoreInRequest, MeetingInRequest
 import pytest
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from unittest.mock import patch
 
 
@@ -224,6 +224,30 @@ class TestEnforceTimestampUtc:
         assert result.hour == 20
 
 
+# Tests for get_timezone and local_day_bounds
+class TestLocalDayBounds:
+
+    def test_offset_without_zone_name(self):
+        """Without a zone name the fixed offset is used"""
+        assert get_timezone(None, -300) == timezone(timedelta(hours=-5))
+
+    def test_days_across_dst_changes(self):
+        """Local days are 23 and 25 hours long on the days the clocks change"""
+        new_york = get_timezone("America/New_York")
+        start, end = local_day_bounds(new_york, date(2025, 3, 9))
+        assert end - start == timedelta(hours=23)
+        start, end = local_day_bounds(new_york, date(2025, 11, 2))
+        assert end - start == timedelta(hours=25)
+
+    def test_band_follows_dst(self):
+        """7AM local is 12:00 UTC in winter and 11:00 UTC in summer"""
+        new_york = get_timezone("America/New_York")
+        winter = local_day_bounds(new_york, date(2025, 3, 8), 7, 23)
+        summer = local_day_bounds(new_york, date(2025, 3, 10), 7, 23)
+        assert winter == (datetime(2025, 3, 8, 12, tzinfo=timezone.utc), datetime(2025, 3, 9, 4, tzinfo=timezone.utc))
+        assert summer == (datetime(2025, 3, 10, 11, tzinfo=timezone.utc), datetime(2025, 3, 11, 3, tzinfo=timezone.utc))
+
+
 # Tests for get_latest_time function
 class TestGetLatestTime:
     